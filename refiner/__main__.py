@@ -5,13 +5,15 @@ import sys
 import traceback
 import zipfile
 
+from refiner.models.output import Output
 from refiner.refine import Refiner
 from refiner.config import settings
+from refiner.profiling import create_profiler
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
 
-def run() -> None:
+def run() -> Output:
     """Transform all input files into the database."""
     input_files_exist = os.path.isdir(settings.INPUT_DIR) and bool(os.listdir(settings.INPUT_DIR))
 
@@ -19,13 +21,17 @@ def run() -> None:
         raise FileNotFoundError(f"No input files found in {settings.INPUT_DIR}")
     extract_input()
 
-    refiner = Refiner()
+    profiler = create_profiler()
+    refiner = Refiner(profiler)
     output = refiner.transform()
+    if profiler.enabled:
+        output.metrics["profile"] = profiler.dump(settings.OUTPUT_DIR)
     
     output_path = os.path.join(settings.OUTPUT_DIR, "output.json")
     with open(output_path, 'w') as f:
         json.dump(output.model_dump(), f, indent=2)    
     logging.info(f"Data transformation complete: {output}")
+    return output
 
 
 def extract_input() -> None:
@@ -0,0 +1,171 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from refiner.config import Settings, settings
+from refiner.utils.ipfs import limit_uploads
+
+# Manifest keys other than these are settings overrides (e.g. "SHARD_BY")
+JOB_KEYS = ("id", "INPUT_DIR", "OUTPUT_DIR")
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """
+    Read a JSONL manifest with one job per line.
+
+    Every job has an "id", an "INPUT_DIR" and an "OUTPUT_DIR"; any other key must be a setting
+    (e.g. "REFINEMENT_ENCRYPTION_KEY") and overrides it for that job only. Relative directories are
+    resolved against the manifest's directory.
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs, ids, output_dirs = [], set(), set()
+    with open(manifest_path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            missing = [key for key in JOB_KEYS if not job.get(key)]
+            if missing:
+                raise ValueError(f"Manifest line {line_number}: missing {', '.join(missing)}")
+            unknown = [key for key in job if key not in JOB_KEYS and key not in Settings.model_fields]
+            if unknown:
+                raise ValueError(f"Manifest line {line_number}: unknown setting(s) {', '.join(unknown)}")
+            job["id"] = str(job["id"])
+            if job["id"] in ids:
+                raise ValueError(f"Manifest line {line_number}: duplicate job id {job['id']}")
+            for key in ("INPUT_DIR", "OUTPUT_DIR"):
+                job[key] = os.path.join(base_dir, job[key])
+            # Jobs writing to the same directory would overwrite each other's database
+            if job["OUTPUT_DIR"] in output_dirs:
+                raise ValueError(f"Manifest line {line_number}: OUTPUT_DIR {job['OUTPUT_DIR']} is used by another job")
+            ids.add(job["id"])
+            output_dirs.add(job["OUTPUT_DIR"])
+            jobs.append(job)
+    return jobs
+
+
+def _init_worker(upload_slots) -> None:
+    limit_uploads(upload_slots)
+
+
+def _input_bytes(input_dir: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(input_dir) if entry.is_file())
+
+
+def run_job(job: Dict[str, Any], job_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run one refinement job in this (worker) process.
+
+    The process-wide settings are rebuilt from the environment plus the job's overrides before the
+    job runs, so nothing leaks from a previous job executed by the same worker. Unless the job sets
+    MAX_WORKERS itself, its worker pools are capped at job_workers, so concurrent jobs share the
+    CPUs instead of each sizing its pools for all of them.
+    """
+    # Imported here so the job's settings are in place before the pipeline reads them
+    from refiner.__main__ import run
+
+    result = {"id": job["id"], "output_dir": job["OUTPUT_DIR"], "status": "failed"}
+    start = time.perf_counter()
+    try:
+        job_settings = Settings(**{key: value for key, value in job.items() if key != "id"})
+        if job_workers and "MAX_WORKERS" not in job:
+            job_settings.MAX_WORKERS = min(job_settings.MAX_WORKERS or job_workers, job_workers)
+        for name in Settings.model_fields:
+            setattr(settings, name, getattr(job_settings, name))
+        os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+        result["input_bytes"] = _input_bytes(settings.INPUT_DIR) if os.path.isdir(settings.INPUT_DIR) else 0
+
+        output = run()
+        result["status"] = "succeeded"
+        result["refinement_url"] = output.refinement_url
+    except Exception as e:
+        logging.error(f"Job {job['id']} failed: {e}")
+        # Full details are in the traceback; the first line is enough for the aggregate report
+        result["error"] = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def run_batch(jobs: List[Dict[str, Any]], workers: int, upload_concurrency: int,
+              job_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run jobs across a process pool: at most `workers` jobs at once, and at most `upload_concurrency`
+    uploads at once over all jobs (shard uploads included). Each job uses at most `job_workers`
+    worker processes/threads of its own, unless its manifest line sets MAX_WORKERS.
+
+    Returns:
+        Aggregate report with a result per job, in manifest order
+    """
+    upload_slots = multiprocessing.Semaphore(upload_concurrency) if upload_concurrency > 0 else None
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(upload_slots,)) as pool:
+        futures = {pool.submit(run_job, job, job_workers): job["id"] for job in jobs}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["id"]] = result
+            logging.info(f"[{len(results)}/{len(jobs)}] Job {result['id']} {result['status']} in {result['seconds']:.2f}s")
+    seconds = time.perf_counter() - start
+
+    ordered = [results[job["id"]] for job in jobs]
+    succeeded = [result for result in ordered if result["status"] == "succeeded"]
+    input_bytes = sum(result.get("input_bytes", 0) for result in succeeded)
+    return {
+        "jobs": len(jobs),
+        "succeeded": len(succeeded),
+        "failed": len(jobs) - len(succeeded),
+        "workers": workers,
+        "job_workers": job_workers,
+        "upload_concurrency": upload_concurrency,
+        "seconds": round(seconds, 6),
+        "jobs_per_second": round(len(succeeded) / seconds, 3) if seconds else None,
+        "input_bytes": input_bytes,
+        "input_bytes_per_second": round(input_bytes / seconds) if seconds else None,
+        "failures": [
+            {"id": result["id"], "error": result["error"]} for result in ordered if result["status"] != "succeeded"
+        ],
+        "results": ordered,
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run many refinement jobs concurrently from a JSONL manifest")
+    parser.add_argument("manifest", help="JSONL file with one job per line")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Jobs run concurrently")
+    parser.add_argument("--job-workers", type=int, default=None,
+                        help="Worker processes/threads per job, unless the manifest sets MAX_WORKERS "
+                             "(defaults to the CPUs divided among --workers)")
+    parser.add_argument("--upload-concurrency", type=int, default=settings.UPLOAD_CONCURRENCY,
+                        help="Uploads run concurrently over all jobs (0 for no limit)")
+    parser.add_argument("--report", default=None,
+                        help="Aggregate report path (defaults to <manifest>.report.json)")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    report_path = args.report or f"{os.path.splitext(args.manifest)[0]}.report.json"
+
+    workers = max(1, args.workers)
+    job_workers = max(1, args.job_workers or (os.cpu_count() or 1) // workers)
+    report = run_batch(jobs, workers, args.upload_concurrency, job_workers)
+
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logging.info(
+        f"{report['succeeded']}/{report['jobs']} job(s) succeeded in {report['seconds']:.2f}s "
+        f"({report['jobs_per_second']} jobs/s), report written to {report_path}"
+    )
+    return 1 if report["failed"] else 0
+
+
+# Run with: python -m refiner.batch manifest.jsonl --workers 4 --upload-concurrency 8
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
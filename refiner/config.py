@@ -40,6 +40,17 @@ class Settings(BaseSettings):
         description="Dialect of the schema"
     )
     
+    # Pinning backend: 'pinata' (https://pinata.cloud) or 'kubo' (local IPFS node)
+    PINNING_BACKEND: str = Field(
+        default="pinata",
+        description="Where artifacts are pinned: 'pinata' (cloud pinning service) or 'kubo' (local IPFS node, one CAR import per job)"
+    )
+
+    KUBO_API_URL: str = Field(
+        default="http://127.0.0.1:5001",
+        description="HTTP RPC API of the local IPFS (Kubo) node, used when PINNING_BACKEND is 'kubo'"
+    )
+
     # Optional, required if using https://pinata.cloud (IPFS pinning service)
     PINATA_API_KEY: Optional[str] = Field(
         default=None,
@@ -56,6 +67,222 @@ class Settings(BaseSettings):
         description="IPFS gateway URL for accessing uploaded files. Recommended to use own dedicated gateway to avoid congestion and rate limiting. Example: 'https://ipfs.my-dao.org/ipfs' (Note: won't work for third-party files)"
     )
     
+    # Resource planning
+    MEMORY_BUDGET_MB: Optional[int] = Field(
+        default=None,
+        description="Memory budget for the job in MB. When set, the planner sizes batches, workers, build mode and compression to fit it"
+    )
+
+    BATCH_SIZE: Optional[int] = Field(
+        default=None,
+        description="Number of models committed per database transaction. Overrides the planner's choice when set"
+    )
+
+    MAX_WORKERS: Optional[int] = Field(
+        default=None,
+        description="Upper bound on worker processes/threads used by the job. Defaults to the number of CPUs"
+    )
+    
+    # Column normalization
+    KEEP_RAW_COLUMNS: bool = Field(
+        default=True,
+        description="Keep the raw strings of columns parsed into typed columns (money amounts, counts, timestamps). When false, the raw columns are left NULL"
+    )
+
+    # Normalized JSON columns
+    FLATTEN_JSON_COLUMNS: bool = Field(
+        default=False,
+        description="Write JSON list/object columns (watched items, social links, LinkedIn user data) as one row per item into child tables"
+    )
+
+    KEEP_JSON_COLUMNS: bool = Field(
+        default=True,
+        description="Keep the JSON columns for compatibility when FLATTEN_JSON_COLUMNS is enabled. When false, they are left NULL"
+    )
+
+    # PII redaction
+    PII_REDACTION: bool = Field(
+        default=False,
+        description="Redact PII columns (addresses, names, LinkedIn URLs, user IDs, bios) before they are written"
+    )
+
+    PII_HMAC_KEY: Optional[str] = Field(
+        default=None,
+        description="Secret key for HMAC pseudonyms. Use the same key across refinements to keep pseudonyms joinable. Defaults to REFINEMENT_ENCRYPTION_KEY"
+    )
+
+    PII_POLICIES: Optional[str] = Field(
+        default=None,
+        description="Per-column policy overrides, e.g. 'uber_trips.pickup_address=drop,linkedin_connections.url=keep'. Policies: hmac, mask, scrub, drop, keep"
+    )
+
+    PII_CACHE_SIZE: int = Field(
+        default=65536,
+        description="Number of memoized values per redaction policy"
+    )
+
+    # Compact storage
+    DICTIONARY_ENCODING: bool = Field(
+        default=False,
+        description="Store low-cardinality string columns (data_type, witnesses, statuses, labels, ...) as integer <column>_code columns referencing dict_* lookup tables, with <table>_view views exposing the original values"
+    )
+
+    # Full-text search
+    FULL_TEXT_SEARCH: bool = Field(
+        default=False,
+        description="Build external-content FTS5 tables (<table>_fts) over free-text columns (dishes, post titles, headlines, favorites, track names) after the load"
+    )
+
+    FTS_TOKENIZER: str = Field(
+        default="unicode61 remove_diacritics 2",
+        description="FTS5 tokenizer of the full-text tables, e.g. 'porter unicode61' for English stemming or 'trigram' for substring matching"
+    )
+
+    # Columnar side-output
+    COLUMNAR_EXPORT: bool = Field(
+        default=False,
+        description="Also write every refined table as an encrypted Parquet file, listed under columnar_urls in output.json. Requires pyarrow"
+    )
+
+    COLUMNAR_COMPRESSION: str = Field(
+        default="zstd",
+        description="Parquet compression codec (zstd, snappy, gzip, lz4 or none)"
+    )
+
+    COLUMNAR_ROW_GROUP_ROWS: int = Field(
+        default=65536,
+        description="Rows buffered per table before a Parquet row group is written"
+    )
+
+    # Intra-file parallelism
+    PARALLEL_TRANSFORM: bool = Field(
+        default=False,
+        description="Validate and transform the contributions of large .json files in worker processes, in chunks of PARALLEL_CHUNK_CONTRIBUTIONS"
+    )
+
+    PARALLEL_CHUNK_CONTRIBUTIONS: int = Field(
+        default=64,
+        description="Contributions per worker task; files with no more contributions than this are processed in the main process"
+    )
+
+    # Staged pipeline
+    PIPELINE: bool = Field(
+        default=False,
+        description="Run reading, parsing, validation and transforms in threads connected by bounded queues, overlapping them with the database writes"
+    )
+
+    PIPELINE_QUEUE_SIZE: int = Field(
+        default=4,
+        description="Items buffered between two pipeline stages before the earlier stage blocks"
+    )
+
+    # JSON Lines input
+    JSONL_CHUNK_BYTES: int = Field(
+        default=8 * 1024 * 1024,
+        description="Bytes of .jsonl/.ndjson(.gz) input parsed and validated per worker task"
+    )
+
+    # Rollup tables
+    ROLLUP_TABLES: bool = Field(
+        default=False,
+        description="Maintain rollup_* summary tables (orders and spend per Zomato account, trips and fares per Uber account, tracks per Spotify playlist, games per Steam account, posts per Reddit account) while rows are written"
+    )
+
+    # Sharded output
+    SHARD_BY: Optional[str] = Field(
+        default=None,
+        description="Split the refined database into shards: 'provider' (one or more shards per provider) or 'rows' (packed up to SHARD_MAX_ROWS). Disabled when unset"
+    )
+
+    SHARD_MAX_ROWS: int = Field(
+        default=500000,
+        description="Target maximum number of rows per shard. A single account and its rows are never split across shards"
+    )
+
+    UPLOAD_CONCURRENCY: int = Field(
+        default=4,
+        description="Number of shards uploaded concurrently"
+    )
+
+    UPLOAD_RETRIES: int = Field(
+        default=3,
+        description="Number of times a failed shard upload is retried"
+    )
+
+    # Resumable uploads
+    RESUMABLE_UPLOAD_URL: Optional[str] = Field(
+        default=None,
+        description="tus (https://tus.io) upload endpoint, e.g. 'http://127.0.0.1:1080/files/'. Artifacts of at least RESUMABLE_UPLOAD_THRESHOLD bytes are uploaded there in resumable chunks; the server reports the CID in an Upload-Cid header. Disabled when unset"
+    )
+
+    RESUMABLE_UPLOAD_TOKEN: Optional[str] = Field(
+        default=None,
+        description="Bearer token sent to RESUMABLE_UPLOAD_URL"
+    )
+
+    RESUMABLE_UPLOAD_THRESHOLD: int = Field(
+        default=64 * 1024 * 1024,
+        description="Size in bytes from which artifacts use the resumable upload; smaller ones are uploaded in a single request"
+    )
+
+    RESUMABLE_CHUNK_SIZE: int = Field(
+        default=8 * 1024 * 1024,
+        description="Bytes sent per resumable upload request. Progress is saved to <artifact>.upload.json after every chunk"
+    )
+
+    RESUMABLE_PARALLEL_PARTS: int = Field(
+        default=4,
+        description="Number of parts of an artifact uploaded concurrently and joined by the server (tus concatenation extension)"
+    )
+
+    # Output verification
+    VERIFY_OUTPUT: bool = Field(
+        default=True,
+        description="Decrypt every encrypted artifact as a stream and compare it against the plaintext digest before it is uploaded"
+    )
+
+    VERIFY_QUICK_CHECK: bool = Field(
+        default=True,
+        description="Also open the decrypted database in memory and run PRAGMA quick_check during verification"
+    )
+
+    # Deterministic builds
+    DETERMINISTIC_BUILD: bool = Field(
+        default=False,
+        description="Produce identical database bytes for identical inputs: one fixed job timestamp and a canonical page layout (VACUUM INTO)"
+    )
+
+    SOURCE_DATE_EPOCH: Optional[int] = Field(
+        default=None,
+        description="Job timestamp (Unix seconds) recorded in created_at. Deterministic builds default to 0 when unset, other builds to the job start time"
+    )
+
+    REFINEMENT_CACHE_PATH: Optional[str] = Field(
+        default=None,
+        description="JSON file of previously pinned refinements. With DETERMINISTIC_BUILD, a job whose database matches a recorded one reuses its URLs instead of encrypting and uploading again"
+    )
+
+    # Profiling
+    PROFILE: bool = Field(
+        default=False,
+        description="Profile each phase (parse, validate, transform, write, schema, encrypt, upload) with cProfile and tracemalloc, writing profile-<phase>.prof and profile-<phase>-alloc.txt to OUTPUT_DIR"
+    )
+
+    PROFILE_SAMPLE_RATE: float = Field(
+        default=1.0,
+        description="Fraction of jobs profiled when PROFILE is enabled, to profile in production without paying the cost on every job"
+    )
+
+    PROFILE_TOP_ALLOCATIONS: int = Field(
+        default=25,
+        description="Number of source lines listed per phase in the allocation reports"
+    )
+
+    SQL_TRACE: bool = Field(
+        default=False,
+        description="Count statements, rows and time per table and statement type, reported under metrics.sql. Always on for profiled jobs, which also get profile-sql.txt"
+    )
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
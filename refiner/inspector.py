@@ -0,0 +1,204 @@
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SAMPLE_SIZE = 1000
+# Tables up to this size are sampled with ORDER BY random(), larger ones by random rowid
+RANDOM_ORDER_MAX_ROWS = 100_000
+# Upper bound on the rowids drawn per sampled row when the rowid range has gaps
+MAX_SAMPLE_DRAWS = 10
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def open_database(path: str, encryption_key: Optional[str] = None) -> sqlite3.Connection:
+    """
+    Open a refined database read-only, decrypting .pgp artifacts in memory.
+
+    Args:
+        path: Path to a plaintext database or an encrypted .pgp artifact
+        encryption_key: Passphrase for encrypted artifacts (defaults to REFINEMENT_ENCRYPTION_KEY)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(16)
+
+    # An empty file is an empty SQLite database
+    if not header or header.startswith(b"SQLite format 3"):
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+    # Anything else is treated as an OpenPGP message; settings are only needed from here on
+    from refiner.utils.encrypt import decrypt_bytes
+    from refiner.utils.verify import open_database_bytes
+    if encryption_key is None:
+        from refiner.config import settings
+        encryption_key = settings.REFINEMENT_ENCRYPTION_KEY
+    with open(path, 'rb') as f:
+        return open_database_bytes(decrypt_bytes(encryption_key, f.read()))
+
+
+def page_usage(conn: sqlite3.Connection) -> Dict[str, Dict[str, int]]:
+    """Pages and bytes used per table and index, from the dbstat virtual table when it is compiled in."""
+    try:
+        rows = conn.execute("SELECT name, pageno, pgsize FROM dbstat WHERE aggregate = TRUE").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {name: {"pages": pages, "bytes": size} for name, pages, size in rows}
+
+
+def row_count(conn: sqlite3.Connection, table: str, stats: Dict[str, int], exact: bool) -> Dict[str, Any]:
+    """
+    Row count of a table, without a full scan when the database was analyzed.
+
+    Uses sqlite_stat1 when it has the table, reported with "estimate": true because the statistics
+    may predate later writes. Otherwise, or when an exact count is requested, counts with COUNT(*).
+    The rowid range is no substitute: shards keep the rowids of the database they were split from.
+    """
+    if not exact and table in stats:
+        return {"rows": stats[table], "method": "sqlite_stat1", "estimate": True}
+    (count,) = conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()
+    return {"rows": count, "method": "count", "estimate": False}
+
+
+def sample_rows(conn: sqlite3.Connection, table: str, rows: int, sample_size: int) -> List[tuple]:
+    """
+    Fetch up to sample_size rows spread over the table.
+
+    Tables of up to RANDOM_ORDER_MAX_ROWS rows (and tables without a rowid) are sampled with
+    ORDER BY random(). Larger tables are sampled by random rowid lookups between min(rowid) and
+    max(rowid), drawing more rowids than needed when the range has gaps (as in shards).
+    """
+    if rows <= sample_size:
+        return conn.execute(f"SELECT * FROM {_quote(table)}").fetchall()
+    try:
+        min_rowid, max_rowid = conn.execute(f"SELECT min(rowid), max(rowid) FROM {_quote(table)}").fetchone()
+    except sqlite3.OperationalError:
+        min_rowid = max_rowid = None
+    if min_rowid is None or rows <= RANDOM_ORDER_MAX_ROWS:
+        return conn.execute(f"SELECT * FROM {_quote(table)} ORDER BY random() LIMIT ?", (sample_size,)).fetchall()
+
+    span = max_rowid - min_rowid + 1
+    draws = min(span, math.ceil(sample_size * max(1.0, span / rows)), sample_size * MAX_SAMPLE_DRAWS)
+    rowids = random.sample(range(min_rowid, max_rowid + 1), draws)
+    sample = conn.execute(
+        f"SELECT * FROM {_quote(table)} WHERE rowid IN (SELECT value FROM json_each(?))", (json.dumps(rowids),)
+    ).fetchall()
+    return random.sample(sample, sample_size) if len(sample) > sample_size else sample
+
+
+def estimate_distinct(values: List[Any], rows: int) -> int:
+    """
+    Estimate the number of distinct values in a column from a uniform sample (GEE estimator):
+    values seen once in the sample are scaled by sqrt(rows / sample size), repeated values count once.
+    """
+    if not values:
+        return 0
+    frequencies = Counter(values)
+    if len(values) >= rows:
+        return len(frequencies)
+    singletons = sum(1 for count in frequencies.values() if count == 1)
+    estimate = math.sqrt(rows / len(values)) * singletons + (len(frequencies) - singletons)
+    return min(rows, round(estimate))
+
+
+def inspect_database(conn: sqlite3.Connection, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                     exact: bool = False) -> Dict[str, Any]:
+    """
+    Report row counts, page usage, index coverage and column statistics of a refined database.
+
+    Args:
+        conn: Connection to the database
+        sample_size: Number of rows sampled per table for null and distinct estimates
+        exact: Count rows with COUNT(*) instead of using sqlite_stat1 estimates
+
+    Returns:
+        JSON-serializable report
+    """
+    (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+    (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+    usage = page_usage(conn)
+
+    stats = {}
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        for table, index, stat in conn.execute("SELECT tbl, idx, stat FROM sqlite_stat1"):
+            stats.setdefault(table, int(stat.split()[0]))
+
+    tables = {}
+    for (table,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    ).fetchall():
+        report = row_count(conn, table, stats, exact)
+        report.update(usage.get(table, {}))
+
+        table_info = conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+        columns = [row[1] for row in table_info]
+
+        # Index coverage: which columns lead an index, and which foreign keys have none
+        indexes = []
+        leading_columns = set()
+        for _, index, unique, origin, _ in conn.execute(f"PRAGMA index_list({_quote(table)})").fetchall():
+            indexed = [row[2] for row in conn.execute(f"PRAGMA index_info({_quote(index)})")]
+            if indexed:
+                leading_columns.add(indexed[0])
+            indexes.append({"name": index, "columns": indexed, "unique": bool(unique), **usage.get(index, {})})
+        primary_key = [row[1] for row in table_info if row[5]]
+        if len(primary_key) == 1:
+            leading_columns.add(primary_key[0])
+        foreign_keys = sorted({row[3] for row in conn.execute(f"PRAGMA foreign_key_list({_quote(table)})")})
+        report["indexes"] = indexes
+        report["unindexed_foreign_keys"] = [column for column in foreign_keys if column not in leading_columns]
+
+        # Column statistics from a sample of rows
+        sample = sample_rows(conn, table, report["rows"], sample_size) if report["rows"] else []
+        report["sampled_rows"] = len(sample)
+        column_stats = {}
+        for position, column in enumerate(columns):
+            values = [row[position] for row in sample]
+            non_null = [value for value in values if value is not None]
+            column_stats[column] = {
+                "null_fraction": round(1 - len(non_null) / len(values), 4) if values else None,
+                "distinct_estimate": estimate_distinct(non_null, round(report["rows"] * len(non_null) / len(values)))
+                if values else None,
+            }
+        report["columns"] = column_stats
+        tables[table] = report
+
+    return {
+        "page_size": page_size,
+        "page_count": page_count,
+        "bytes": page_size * page_count,
+        "tables": tables,
+        "views": [name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'view' ORDER BY name")],
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect refined databases (plaintext or encrypted .pgp) as JSON")
+    parser.add_argument("paths", nargs="*", default=[os.path.join("output", "db.libsql")],
+                        help="Databases or .pgp artifacts to inspect")
+    parser.add_argument("--key", default=None, help="Passphrase for .pgp artifacts (defaults to REFINEMENT_ENCRYPTION_KEY)")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE_SIZE, help="Rows sampled per table")
+    parser.add_argument("--exact", action="store_true", help="Count rows with COUNT(*) instead of sqlite_stat1 estimates")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        conn = open_database(path, args.key)
+        try:
+            report = {"path": path, **inspect_database(conn, args.sample, args.exact)}
+        finally:
+            conn.close()
+        # One JSON document per line, so many refinements can be audited in one run
+        json.dump(report, sys.stdout)
+        sys.stdout.write("\n")
+
+
+# Run with: python -m refiner.inspector output/db.libsql output/db.libsql.pgp
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+from typing import Any, Iterator, List, Tuple
+
+from refiner.transformer.multi_provider_transformer import validate_contributions
+from refiner.utils.pool import ordered_map
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+GZIP_EXTENSION = '.gz'
+
+
+def is_jsonl(path: str) -> bool:
+    """Whether a file is JSON Lines input (.jsonl or .ndjson, optionally gzip-compressed)."""
+    name = path.lower()
+    if name.endswith(GZIP_EXTENSION):
+        name = name[:-len(GZIP_EXTENSION)]
+    return name.endswith(JSONL_EXTENSIONS)
+
+
+def _records(data: bytes, label: str, offset: int) -> Iterator[Tuple[int, Any]]:
+    """Decode the non-empty lines of a block, with the byte offset of each line."""
+    position = offset
+    for line in data.splitlines(keepends=True):
+        if line.strip():
+            try:
+                yield position, json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{label}: invalid record at byte {position}: {e}") from e
+        position += len(line)
+
+
+def parse_records(data: bytes, label: str, offset: int = 0) -> List[Any]:
+    """Decode the records of a block of complete lines, without validating them."""
+    return [record for _, record in _records(data, label, offset)]
+
+
+def parse_lines(data: bytes, label: str, offset: int = 0) -> List[Any]:
+    """
+    Parse and validate the records of a block of complete lines.
+
+    Args:
+        data: One or more newline-terminated JSON records
+        label: File name used in error messages
+        offset: Byte offset of the block in the (decompressed) file, for error messages
+
+    Returns:
+        The validated contributions of every record, in order
+    """
+    contributions = []
+    for position, record in _records(data, label, offset):
+        try:
+            contributions.extend(validate_contributions(record))
+        except ValueError as e:
+            raise ValueError(f"{label}: invalid record at byte {position}: {e}") from e
+    return contributions
+
+
+def _parse_range(path: str, start: int, end: int) -> List[Any]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return parse_lines(f.read(end - start), os.path.basename(path), start)
+
+
+def split_ranges(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Split a file into byte ranges of about chunk_bytes that start and end at line boundaries."""
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            # Extend the range to the end of the line it stops in
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_blocks(path: str, chunk_bytes: int) -> Iterator[Tuple[bytes, int]]:
+    """Read a JSON Lines file (decompressing gzip) in blocks of complete lines, with their offsets."""
+    offset = 0
+    opener = gzip.open if path.lower().endswith(GZIP_EXTENSION) else open
+    with opener(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                return
+            block += f.readline()
+            yield block, offset
+            offset += len(block)
+
+
+def read_jsonl(path: str, workers: int, chunk_bytes: int) -> Iterator[List[Any]]:
+    """
+    Parse and validate a JSON Lines file in parallel, one chunk of lines per task.
+
+    Plain files are split into byte ranges at line boundaries that every worker reads itself.
+    Gzip streams cannot be split, so they are decompressed here and the blocks of lines are sent to
+    the workers. Results are yielded in file order with at most two chunks per worker in flight,
+    so memory stays bounded and the output does not depend on the number of workers.
+
+    Returns:
+        Iterator over the validated contributions, one list per chunk
+    """
+    label = os.path.basename(path)
+    if path.lower().endswith(GZIP_EXTENSION):
+        return ordered_map(
+            parse_lines, ((block, label, offset) for block, offset in read_blocks(path, chunk_bytes)), workers
+        )
+    ranges = split_ranges(path, chunk_bytes)
+    return ordered_map(_parse_range, ((path, start, end) for start, end in ranges), min(workers, len(ranges)))
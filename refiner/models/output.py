@@ -1,8 +1,12 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 from refiner.models.offchain_schema import OffChainSchema
 
 class Output(BaseModel):
     refinement_url: Optional[str] = None
-    schema: Optional[OffChainSchema] = None
\ No newline at end of file
+    schema: Optional[OffChainSchema] = None
+    shard_urls: Optional[List[str]] = None
+    # Encrypted Parquet side-output per table, when COLUMNAR_EXPORT is enabled
+    columnar_urls: Optional[Dict[str, str]] = None
+    metrics: Optional[Dict[str, Any]] = None
\ No newline at end of file
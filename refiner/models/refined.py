@@ -4,34 +4,97 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
 # Base model for SQLAlchemy
+# Secondary indexes (index=True) are built in bulk once the load completes, see DataTransformer.build_indexes
+# Columns with info={'dictionary': <domain>} are stored as integer codes in compact storage mode
+# Columns with info={'normalize': <kind>} are parsed into typed sibling columns, see ColumnNormalizer
+# JSON columns with info={'flatten': <kind>} can be stored as rows of a child table, see JsonFlattener
+# Columns with info={'pii': <policy>} are redacted when PII redaction is enabled, see PiiRedactor
+# Text columns with info={'fts': True} get an FTS5 full-text index when enabled, see FullTextIndexer
+# Tables with info={'rollup': {...}} get a per-group summary table when rollups are enabled, see RollupBuilder
+# Tables keyed by natural string IDs are stored WITHOUT ROWID (sqlite_with_rowid=False), so the key is stored
+# once and looked up in a single B-tree, and with STRICT column types (sqlite_strict=True), see create_table
+# Tables with info={'dimension': True} are shared by the accounts of every provider; shards get the rows they reference
+# Tables with info={'natural_key': (...)} hold one row per distinct value of those columns, see DataTransformer.dimension_key
 Base = declarative_base()
 
+# created_at of every row: a single timestamp per job, see set_job_timestamp
+_job_timestamp = None
+
+
+def set_job_timestamp(timestamp: datetime = None) -> datetime:
+    """Set the timestamp recorded in created_at for the rows of the current job (now by default)."""
+    global _job_timestamp
+    _job_timestamp = timestamp or datetime.utcnow()
+    return _job_timestamp
+
+
+def job_timestamp() -> datetime:
+    """Default of the created_at columns: the job timestamp, or the current time outside a job."""
+    return _job_timestamp or datetime.utcnow()
+
+# Contributor dimension: who contributed each account, and in which claim
+class Contributor(Base):
+    __tablename__ = 'contributors'
+    __table_args__ = {'info': {'dimension': True, 'natural_key': ('wallet_address',)}}
+    
+    contributor_id = Column(Integer, primary_key=True, autoincrement=True)
+    wallet_address = Column(String, nullable=False, index=True, unique=True, info={'pii': 'hmac'})  # Lower-cased
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
+class Claim(Base):
+    __tablename__ = 'claims'
+    __table_args__ = {'info': {'dimension': True, 'natural_key': ('contributor_id', 'claim_date')}}
+    
+    claim_id = Column(Integer, primary_key=True, autoincrement=True)
+    contributor_id = Column(Integer, ForeignKey('contributors.contributor_id'), nullable=False, index=True)
+    claim_date = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
+class Contribution(Base):
+    __tablename__ = 'contributions'
+    __table_args__ = {'info': {'dimension': True}}
+    
+    contribution_id = Column(Integer, primary_key=True, autoincrement=True)
+    contributor_id = Column(Integer, ForeignKey('contributors.contributor_id'), nullable=False, index=True)
+    claim_id = Column(Integer, ForeignKey('claims.claim_id'), nullable=True, index=True)  # None outside a claim
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})
+    claimed_date = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
 # Zomato specific models
 class ZomatoAccount(Base):
     __tablename__ = 'zomato_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "ZOMATO"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "ZOMATO"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
-    user_id = Column(String, nullable=False)  # Zomato user ID
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    user_id = Column(String, nullable=False, info={'pii': 'hmac'})  # Zomato user ID
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     orders = relationship("ZomatoOrder", back_populates="account")
 
 class ZomatoOrder(Base):
     __tablename__ = 'zomato_orders'
+    __table_args__ = {'sqlite_with_rowid': False, 'sqlite_strict': True, 'info': {'rollup': {
+        'name': 'zomato_account_orders',
+        'group_by': ('account_id', 'total_cost_currency'),
+        'measures': {'order_count': ('count', None), 'total_cost_minor': ('sum', 'total_cost_minor')},
+    }}}
     
     order_id = Column(String, primary_key=True)
-    account_id = Column(Integer, ForeignKey('zomato_accounts.account_id'), nullable=False)
-    total_cost = Column(String, nullable=False)
-    dish_string = Column(Text, nullable=False)
+    account_id = Column(Integer, ForeignKey('zomato_accounts.account_id'), nullable=False, index=True)
+    total_cost = Column(String, nullable=True, info={'normalize': 'money'})  # Raw value, see KEEP_RAW_COLUMNS
+    total_cost_minor = Column(Integer, nullable=True)  # Amount in minor units (e.g. cents)
+    total_cost_currency = Column(String, nullable=True, info={'dictionary': 'currency'})
+    dish_string = Column(Text, nullable=False, info={'fts': True})
     restaurant_url = Column(String, nullable=False)
-    delivery_address = Column(Text, nullable=False)
-    delivery_status = Column(String, nullable=False)
+    delivery_address = Column(Text, nullable=False, info={'pii': 'hmac'})
+    delivery_status = Column(String, nullable=False, index=True, info={'dictionary': 'delivery_status'})
     delivery_message = Column(String, nullable=True)
-    delivery_label = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    delivery_label = Column(String, nullable=False, info={'dictionary': 'delivery_label'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("ZomatoAccount", back_populates="orders")
 
@@ -40,27 +103,42 @@ class UberAccount(Base):
     __tablename__ = 'uber_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "UBER"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "UBER"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
-    user_id = Column(String, nullable=False)
+    user_id = Column(String, nullable=False, info={'pii': 'hmac'})
     username = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     trips = relationship("UberTrip", back_populates="account")
 
 class UberTrip(Base):
     __tablename__ = 'uber_trips'
+    __table_args__ = {'info': {'rollup': {
+        'name': 'uber_account_trips',
+        'group_by': ('account_id', 'fare_currency'),
+        'measures': {
+            'trip_count': ('count', None),
+            'fare_minor': ('sum', 'fare_minor'),
+            'first_trip_epoch': ('min', 'begin_trip_time_epoch'),
+            'last_trip_epoch': ('max', 'begin_trip_time_epoch'),
+        },
+    }}}
     
     trip_id = Column(Integer, primary_key=True, autoincrement=True)
-    account_id = Column(Integer, ForeignKey('uber_accounts.account_id'), nullable=False)
-    begin_trip_time = Column(String, nullable=False)
-    dropoff_time = Column(String, nullable=False)
-    pickup_address = Column(Text, nullable=False)
-    dropoff_address = Column(Text, nullable=False)
-    fare = Column(String, nullable=False)
-    vehicle_type = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    account_id = Column(Integer, ForeignKey('uber_accounts.account_id'), nullable=False, index=True)
+    begin_trip_time = Column(String, nullable=True, info={'normalize': 'timestamp'})  # Raw value, see KEEP_RAW_COLUMNS
+    begin_trip_time_epoch = Column(Integer, nullable=True, index=True)  # Epoch seconds
+    dropoff_time = Column(String, nullable=True, info={'normalize': 'timestamp'})
+    dropoff_time_epoch = Column(Integer, nullable=True)
+    pickup_address = Column(Text, nullable=False, info={'pii': 'hmac'})
+    dropoff_address = Column(Text, nullable=False, info={'pii': 'hmac'})
+    fare = Column(String, nullable=True, info={'normalize': 'money'})
+    fare_minor = Column(Integer, nullable=True)
+    fare_currency = Column(String, nullable=True, info={'dictionary': 'currency'})
+    vehicle_type = Column(String, nullable=False, info={'dictionary': 'vehicle_type'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("UberAccount", back_populates="trips")
 
@@ -69,11 +147,12 @@ class LinkedinAccount(Base):
     __tablename__ = 'linkedin_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "LINKEDIN"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "LINKEDIN"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
-    linkedin_user_data = Column(Text, nullable=False)  # JSON string
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    linkedin_user_data = Column(Text, nullable=True, info={'flatten': 'object'})  # JSON string
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     connections = relationship("LinkedinConnection", back_populates="account")
 
@@ -81,48 +160,63 @@ class LinkedinConnection(Base):
     __tablename__ = 'linkedin_connections'
     
     connection_id = Column(Integer, primary_key=True, autoincrement=True)
-    account_id = Column(Integer, ForeignKey('linkedin_accounts.account_id'), nullable=False)
-    name = Column(String, nullable=False)
-    headline = Column(Text, nullable=True)
-    url = Column(String, nullable=True)
+    account_id = Column(Integer, ForeignKey('linkedin_accounts.account_id'), nullable=False, index=True)
+    name = Column(String, nullable=False, info={'pii': 'hmac'})
+    headline = Column(Text, nullable=True, info={'fts': True})
+    url = Column(String, nullable=True, info={'pii': 'mask'})
     pfp = Column(String, nullable=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("LinkedinAccount", back_populates="connections")
 
+class LinkedinUserField(Base):
+    __tablename__ = 'linkedin_user_fields'
+    __table_args__ = {'info': {'flattened_from': ('linkedin_accounts', 'linkedin_user_data')}}
+    
+    field_id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(Integer, ForeignKey('linkedin_accounts.account_id'), nullable=False, index=True)
+    field = Column(String, nullable=False)
+    value = Column(Text, nullable=True)  # Scalars as text, nested values as JSON
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
 # Spotify specific models
 class SpotifyAccount(Base):
     __tablename__ = 'spotify_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "SPOTIFY"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "SPOTIFY"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
     username = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     playlists = relationship("SpotifyPlaylist", back_populates="account")
     recently_played = relationship("SpotifyRecentlyPlayed", back_populates="account")
 
 class SpotifyPlaylist(Base):
     __tablename__ = 'spotify_playlists'
+    __table_args__ = {'sqlite_with_rowid': False, 'sqlite_strict': True}
     
     playlist_id = Column(String, primary_key=True)
-    account_id = Column(Integer, ForeignKey('spotify_accounts.account_id'), nullable=False)
+    account_id = Column(Integer, ForeignKey('spotify_accounts.account_id'), nullable=False, index=True)
     playlist_name = Column(String, nullable=False)
-    playlist_owner = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    playlist_owner = Column(String, nullable=False, info={'dictionary': 'playlist_owner'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("SpotifyAccount", back_populates="playlists")
     tracks = relationship("SpotifyTrack", back_populates="playlist")
 
 class SpotifyTrack(Base):
     __tablename__ = 'spotify_tracks'
+    __table_args__ = {'sqlite_with_rowid': False, 'sqlite_strict': True, 'info': {'rollup': {
+        'name': 'spotify_playlist_tracks', 'group_by': ('playlist_id',), 'measures': {'track_count': ('count', None)},
+    }}}
     
     track_id = Column(String, primary_key=True)
-    playlist_id = Column(String, ForeignKey('spotify_playlists.playlist_id'), nullable=False)
-    track_name = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    playlist_id = Column(String, ForeignKey('spotify_playlists.playlist_id'), nullable=False, index=True)
+    track_name = Column(String, nullable=False, info={'fts': True})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     playlist = relationship("SpotifyPlaylist", back_populates="tracks")
 
@@ -130,10 +224,10 @@ class SpotifyRecentlyPlayed(Base):
     __tablename__ = 'spotify_recently_played'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    account_id = Column(Integer, ForeignKey('spotify_accounts.account_id'), nullable=False)
+    account_id = Column(Integer, ForeignKey('spotify_accounts.account_id'), nullable=False, index=True)
     track_name = Column(String, nullable=False)
-    track_id = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    track_id = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("SpotifyAccount", back_populates="recently_played")
 
@@ -142,12 +236,13 @@ class NetflixAccount(Base):
     __tablename__ = 'netflix_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "NETFLIX"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "NETFLIX"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
-    profile_name = Column(String, nullable=False)
-    user_id = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    profile_name = Column(String, nullable=False, info={'pii': 'hmac'})
+    user_id = Column(String, nullable=False, info={'pii': 'hmac'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     favorites = relationship("NetflixFavorite", back_populates="account")
 
@@ -155,9 +250,9 @@ class NetflixFavorite(Base):
     __tablename__ = 'netflix_favorites'
     
     favorite_id = Column(Integer, primary_key=True, autoincrement=True)
-    account_id = Column(Integer, ForeignKey('netflix_accounts.account_id'), nullable=False)
-    favorite_item = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    account_id = Column(Integer, ForeignKey('netflix_accounts.account_id'), nullable=False, index=True)
+    favorite_item = Column(String, nullable=False, info={'fts': True})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("NetflixAccount", back_populates="favorites")
 
@@ -166,12 +261,13 @@ class PrimeVideoAccount(Base):
     __tablename__ = 'prime_video_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "AMAZON_PRIME"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "AMAZON_PRIME"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
-    profile_name = Column(String, nullable=False)
-    user_id = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    profile_name = Column(String, nullable=False, info={'pii': 'hmac'})
+    user_id = Column(String, nullable=False, info={'pii': 'hmac'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     watch_history = relationship("PrimeVideoWatchHistory", back_populates="account")
 
@@ -179,91 +275,134 @@ class PrimeVideoWatchHistory(Base):
     __tablename__ = 'prime_video_watch_history'
     
     watch_id = Column(Integer, primary_key=True, autoincrement=True)
-    account_id = Column(Integer, ForeignKey('prime_video_accounts.account_id'), nullable=False)
-    watch_date = Column(String, nullable=False)
-    watched_items = Column(JSON, nullable=False)  # List of watched items for that date
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    account_id = Column(Integer, ForeignKey('prime_video_accounts.account_id'), nullable=False, index=True)
+    watch_date = Column(String, nullable=False, index=True)
+    watched_items = Column(JSON(none_as_null=True), nullable=True, info={'flatten': 'list'})  # List of watched items for that date
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("PrimeVideoAccount", back_populates="watch_history")
 
+class PrimeVideoWatchedItem(Base):
+    __tablename__ = 'prime_video_watched_items'
+    __table_args__ = {'info': {'flattened_from': ('prime_video_watch_history', 'watched_items')}}
+    
+    item_id = Column(Integer, primary_key=True, autoincrement=True)
+    watch_id = Column(Integer, ForeignKey('prime_video_watch_history.watch_id'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    value = Column(String, nullable=False)  # Watched title
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
 # Twitch specific models
 class TwitchAccount(Base):
     __tablename__ = 'twitch_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "TWITCH"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "TWITCH"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
     username = Column(String, nullable=False)
     followers = Column(Integer, nullable=False)
     pfp_url = Column(String, nullable=True)
-    bio = Column(Text, nullable=True)
-    socials = Column(JSON, nullable=True)  # List of social links
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    bio = Column(Text, nullable=True, info={'pii': 'scrub'})
+    socials = Column(JSON(none_as_null=True), nullable=True, info={'flatten': 'list'})  # List of social links
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
+class TwitchSocialLink(Base):
+    __tablename__ = 'twitch_social_links'
+    __table_args__ = {'info': {'flattened_from': ('twitch_accounts', 'socials')}}
+    
+    link_id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(Integer, ForeignKey('twitch_accounts.account_id'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    value = Column(String, nullable=False)  # Social link URL
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
 
 # Twitter specific models
 class TwitterAccount(Base):
     __tablename__ = 'twitter_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "TWITTER"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "TWITTER"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
     user_name = Column(String, nullable=False)
-    followers = Column(String, nullable=False)
-    following = Column(String, nullable=False)
-    posts = Column(String, nullable=False)
-    user_description = Column(Text, nullable=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    followers = Column(String, nullable=True, info={'normalize': 'count'})  # Raw value, see KEEP_RAW_COLUMNS
+    followers_count = Column(Integer, nullable=True)
+    following = Column(String, nullable=True, info={'normalize': 'count'})
+    following_count = Column(Integer, nullable=True)
+    posts = Column(String, nullable=True, info={'normalize': 'count'})
+    posts_count = Column(Integer, nullable=True)
+    user_description = Column(Text, nullable=True, info={'pii': 'scrub'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
 
 # Reddit specific models
 class RedditAccount(Base):
     __tablename__ = 'reddit_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "REDDIT"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "REDDIT"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
     username = Column(String, nullable=False)
     pfp = Column(String, nullable=True)
-    user_id = Column(String, nullable=False)
-    bio = Column(Text, nullable=True)
-    social_links = Column(JSON, nullable=True)  # List of social links
+    user_id = Column(String, nullable=False, info={'pii': 'hmac'})
+    bio = Column(Text, nullable=True, info={'pii': 'scrub'})
+    social_links = Column(JSON(none_as_null=True), nullable=True, info={'flatten': 'list'})  # List of social links
     post_karma = Column(Integer, nullable=False)
     comment_karma = Column(Integer, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     posts = relationship("RedditPost", back_populates="account")
 
 class RedditPost(Base):
     __tablename__ = 'reddit_posts'
+    __table_args__ = {'sqlite_with_rowid': False, 'sqlite_strict': True, 'info': {'rollup': {
+        'name': 'reddit_account_posts', 'group_by': ('account_id',), 'measures': {'post_count': ('count', None)},
+    }}}
     
     post_id = Column(String, primary_key=True)
-    account_id = Column(Integer, ForeignKey('reddit_accounts.account_id'), nullable=False)
-    title = Column(Text, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    account_id = Column(Integer, ForeignKey('reddit_accounts.account_id'), nullable=False, index=True)
+    title = Column(Text, nullable=False, info={'fts': True})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("RedditAccount", back_populates="posts")
 
+class RedditSocialLink(Base):
+    __tablename__ = 'reddit_social_links'
+    __table_args__ = {'info': {'flattened_from': ('reddit_accounts', 'social_links')}}
+    
+    link_id = Column(Integer, primary_key=True, autoincrement=True)
+    account_id = Column(Integer, ForeignKey('reddit_accounts.account_id'), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    value = Column(String, nullable=False)  # Social link URL
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
+
 # Steam specific models
 class SteamAccount(Base):
     __tablename__ = 'steam_accounts'
     
     account_id = Column(Integer, primary_key=True, autoincrement=True)
-    data_type = Column(String, nullable=False)  # "STEAM"
-    witnesses = Column(String, nullable=False)
+    contribution_id = Column(Integer, ForeignKey('contributions.contribution_id'), nullable=False, index=True)
+    data_type = Column(String, nullable=False, info={'dictionary': 'data_type'})  # "STEAM"
+    witnesses = Column(String, nullable=False, info={'dictionary': 'witnesses'})
     account_username = Column(String, nullable=False)
-    user_id = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    user_id = Column(String, nullable=False, info={'pii': 'hmac'})
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     games = relationship("SteamGame", back_populates="account")
 
 class SteamGame(Base):
     __tablename__ = 'steam_games'
+    __table_args__ = {'info': {'rollup': {
+        'name': 'steam_account_games', 'group_by': ('account_id',), 'measures': {'game_count': ('count', None)},
+    }}}
     
     game_id = Column(Integer, primary_key=True, autoincrement=True)
-    account_id = Column(Integer, ForeignKey('steam_accounts.account_id'), nullable=False)
+    account_id = Column(Integer, ForeignKey('steam_accounts.account_id'), nullable=False, index=True)
     game_name = Column(String, nullable=False)
-    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=job_timestamp)
     
     account = relationship("SteamAccount", back_populates="games")
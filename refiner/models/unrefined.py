@@ -1,5 +1,5 @@
-from typing import List, Dict, Union, Optional
-from pydantic import BaseModel
+from typing import List, Dict, Union, Optional, Tuple
+from pydantic import BaseModel, PrivateAttr
 
 
 # Zomato specific models
@@ -138,6 +138,8 @@ class Contribution(BaseModel):
     walletAddress: str
     AccountUsername: str
     securedSharedData: SecuredSharedDataUnion
+    # (walletAddress, claimDate) of the input the contribution was claimed in, see validate_contributions
+    _claim: Optional[Tuple[str, str]] = PrivateAttr(default=None)
 
 # Main input data model
 class MultiProviderInputData(BaseModel):
@@ -157,6 +159,7 @@ class ZomatoContribution(BaseModel):
     walletAddress: str
     AccountUsername: str
     securedSharedData: ZomatoSecuredSharedData
+    _claim: Optional[Tuple[str, str]] = PrivateAttr(default=None)
 
 class ZomatoInputData(BaseModel):
     walletAddress: str
@@ -0,0 +1,253 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from refiner.jsonl import is_jsonl, parse_records, read_blocks
+from refiner.models.refined import Base
+from refiner.transformer.multi_provider_transformer import (
+    MultiProviderTransformer, chunk_documents, transform_chunk, validate_contributions, validate_document
+)
+from refiner.utils.pool import ordered_map
+
+# Kinds of input items
+JSON_INPUT = "json"
+JSONL_INPUT = "jsonl"
+
+# Marks the end of a stage's output
+_END = object()
+# Seconds between checks for a stopped pipeline while blocked on a queue
+_POLL_SECONDS = 0.1
+
+
+class _Failure:
+    """An exception raised by a stage, passed downstream to the writer."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Stopped(Exception):
+    """Raised in stage threads once the pipeline has stopped."""
+
+
+class Pipeline:
+    """
+    Stages connected by bounded queues, each running in its own thread.
+
+    A stage is a function from an iterator over the items of the previous stage to an iterator
+    over its own items, so stages can keep state across items, batch them or fan them out to a
+    process pool. The source stage takes no input and the final stage (the sink) runs in the
+    calling thread, which keeps SQLite writes on the thread that created the engine. Queues hold
+    at most queue_size items, so a fast stage blocks (backpressure) instead of buffering ahead, and
+    stages overlap wherever one of them waits on I/O or releases the GIL (file reads, SQLite,
+    worker processes). An exception in any stage stops the pipeline and is raised by run().
+
+    Per stage, the time spent producing items (busy), waiting for input and blocked on a full
+    output queue is recorded; busy time over the run time is the stage's utilization.
+    """
+
+    def __init__(self, queue_size: int = 4):
+        self.queue_size = queue_size
+        self.stages: List[Tuple[str, Callable]] = []
+        self.totals: Dict[str, Dict[str, float]] = {}
+        self.seconds = 0.0
+        self._stop = threading.Event()
+
+    def source(self, name: str, items: Iterable) -> 'Pipeline':
+        self.stages = [(name, lambda _: iter(items))]
+        return self
+
+    def stage(self, name: str, function: Callable[[Iterator], Iterator]) -> 'Pipeline':
+        self.stages.append((name, function))
+        return self
+
+    def _totals(self, name: str) -> Dict[str, float]:
+        return self.totals.setdefault(name, {"items": 0, "busy": 0.0, "waiting": 0.0, "blocked": 0.0})
+
+    def _drain(self, inbox: queue.Queue, totals: Dict[str, float]) -> Iterator:
+        while True:
+            start = time.perf_counter()
+            while True:
+                try:
+                    item = inbox.get(timeout=_POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    if self._stop.is_set():
+                        raise _Stopped()
+            totals["waiting"] += time.perf_counter() - start
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+    def _put(self, outbox: queue.Queue, item: Any, totals: Dict[str, float]) -> None:
+        start = time.perf_counter()
+        while True:
+            try:
+                outbox.put(item, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Stopped()
+        totals["blocked"] += time.perf_counter() - start
+
+    def _produce(self, items: Iterator, totals: Dict[str, float]) -> Iterator:
+        """Iterate over a stage's output, counting the time spent in the stage itself as busy."""
+        while True:
+            start = time.perf_counter()
+            waiting = totals["waiting"]
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                totals["busy"] += time.perf_counter() - start - (totals["waiting"] - waiting)
+            totals["items"] += 1
+            yield item
+
+    def _run_stage(self, name: str, function: Callable, inbox, outbox: queue.Queue) -> None:
+        totals = self._totals(name)
+        try:
+            items = function(self._drain(inbox, totals) if inbox is not None else None)
+            for item in self._produce(items, totals):
+                self._put(outbox, item, totals)
+            self._put(outbox, _END, totals)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            try:
+                self._put(outbox, _Failure(e), totals)
+            except _Stopped:
+                pass
+
+    def run(self, name: str, sink: Callable[[Iterator], None]) -> None:
+        """Start every stage and feed the output of the last one to sink in this thread."""
+        start = time.perf_counter()
+        threads = []
+        inbox = None
+        for stage_name, function in self.stages:
+            outbox = queue.Queue(maxsize=self.queue_size)
+            thread = threading.Thread(
+                target=self._run_stage, args=(stage_name, function, inbox, outbox),
+                name=f"pipeline-{stage_name}", daemon=True
+            )
+            threads.append(thread)
+            inbox = outbox
+
+        totals = self._totals(name)
+        for thread in threads:
+            thread.start()
+        try:
+            waiting = totals["waiting"]
+            sink_start = time.perf_counter()
+            sink(self._count(self._drain(inbox, totals), totals))
+            totals["busy"] += time.perf_counter() - sink_start - (totals["waiting"] - waiting)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.seconds = time.perf_counter() - start
+
+    @staticmethod
+    def _count(items: Iterator, totals: Dict[str, float]) -> Iterator:
+        for item in items:
+            totals["items"] += 1
+            yield item
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_size": self.queue_size,
+            "seconds": round(self.seconds, 6),
+            "stages": {
+                name: {
+                    "items": int(totals["items"]),
+                    "busy_seconds": round(totals["busy"], 6),
+                    "waiting_seconds": round(totals["waiting"], 6),
+                    "blocked_seconds": round(totals["blocked"], 6),
+                    "utilization": round(totals["busy"] / self.seconds, 4) if self.seconds else 0.0,
+                }
+                for name, totals in self.totals.items()
+            },
+        }
+
+
+def read_inputs(input_dir: str, chunk_bytes: int) -> Iterator[Tuple[str, str, bytes, int]]:
+    """
+    Read the input files in sorted order: whole .json files, and JSON Lines files in blocks of lines.
+
+    Yields:
+        (file name, kind, bytes, byte offset of the bytes in the file)
+    """
+    for input_filename in sorted(os.listdir(input_dir)):
+        input_file = os.path.join(input_dir, input_filename)
+        if os.path.splitext(input_file)[1].lower() == '.json':
+            with open(input_file, 'rb') as f:
+                yield input_filename, JSON_INPUT, f.read(), 0
+        elif is_jsonl(input_file):
+            for block, offset in read_blocks(input_file, chunk_bytes):
+                yield input_filename, JSONL_INPUT, block, offset
+
+
+def parse_inputs(items: Iterator[Tuple[str, str, bytes, int]]) -> Iterator[Tuple[str, str, List[Any]]]:
+    """
+    Decode the JSON of every item read.
+
+    Yields:
+        (file name, kind, documents): the document of a .json file, or the records of a block of lines
+    """
+    for input_filename, kind, data, offset in items:
+        if kind == JSON_INPUT:
+            yield input_filename, kind, [json.loads(data)]
+        else:
+            yield input_filename, kind, parse_records(data, input_filename, offset)
+
+
+def validate_inputs(items: Iterator[Tuple[str, str, List[Any]]]) -> Iterator[List[Any]]:
+    """
+    Validate parsed documents into their contributions.
+
+    Yields:
+        Lists of validated contributions, one list per item
+    """
+    for input_filename, kind, documents in items:
+        validate = validate_document if kind == JSON_INPUT else validate_contributions
+        try:
+            contributions = [contribution for document in documents for contribution in validate(document)]
+        except ValueError as e:
+            raise ValueError(f"{input_filename}: {e}") from e
+        yield contributions
+
+
+def transform_inputs(transformer: MultiProviderTransformer) -> Callable[[Iterator], Iterator]:
+    """Stage turning lists of validated contributions into batches of models."""
+    def transform(items: Iterator[List[Any]]) -> Iterator[List[Base]]:
+        for contributions in items:
+            yield from transformer.transform_batches(contributions)
+    return transform
+
+
+def transform_inputs_parallel(transformer: MultiProviderTransformer, workers: int,
+                              chunk_contributions: int) -> Callable[[Iterator], Iterator]:
+    """
+    Stage validating, transforming, normalizing and redacting parsed documents in a process pool
+    (see transform_chunk), in chunks of at most chunk_contributions contributions or one block of
+    lines, and remapping the keys of the results in order. Its batches are written with prepared=True.
+    """
+    stages = transformer.stages.row_stages()
+
+    def tasks(items: Iterator[Tuple[str, str, List[Any]]]) -> Iterator[tuple]:
+        for _, kind, documents in items:
+            if kind == JSON_INPUT:
+                for document in documents:
+                    for chunk in chunk_documents(document, chunk_contributions):
+                        yield [chunk], False, stages
+            else:
+                yield documents, True, stages
+
+    def transform(items: Iterator[Tuple[str, str, List[Any]]]) -> Iterator[List[Base]]:
+        return transformer.remap_batches(ordered_map(transform_chunk, tasks(items), workers))
+    return transform
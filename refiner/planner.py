@@ -0,0 +1,205 @@
+import logging
+import mmap
+import os
+import re
+import resource
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+# Matches the contribution type of every contribution (and of legacy single-contribution files)
+CONTRIBUTION_TYPE_PATTERN = re.compile(rb'"type"\s*:\s*"([A-Za-z_]+)"')
+
+# Rough sizing constants, measured on the sample inputs and rounded up
+INPUT_BYTES_PER_ROW = 150      # JSON bytes that end up as one refined row
+DB_BYTES_PER_ROW = 160         # SQLite bytes per refined row, including page overhead
+JSON_EXPANSION = 8             # Python object size of a parsed JSON document relative to its file size
+BYTES_PER_MODEL = 2048         # Memory held by one pending SQLAlchemy model instance
+ENCRYPT_EXPANSION = {          # Peak memory of encrypt_file relative to the database size
+    "ZLIB": 4.0,
+    "Uncompressed": 3.5,
+}
+BASE_OVERHEAD_BYTES = 64 * 1024 * 1024  # Interpreter, libraries and SQLite caches
+
+DEFAULT_BATCH_SIZE = 1000
+MIN_BATCH_SIZE = 50
+MAX_BATCH_SIZE = 20000
+
+
+class InputScan(BaseModel):
+    """Result of the cheap pre-scan over the input directory."""
+    file_count: int = 0
+    total_bytes: int = 0
+    largest_file_bytes: int = 0
+    contributions: Dict[str, int] = {}
+
+
+class JobPlan(BaseModel):
+    """Resource plan chosen for a refinement job."""
+    memory_budget_bytes: Optional[int] = None
+    estimated_rows: int = 0
+    estimated_db_bytes: int = 0
+    in_memory: bool = False
+    batch_size: int = DEFAULT_BATCH_SIZE
+    max_batch_size: int = MAX_BATCH_SIZE
+    workers: int = 1
+    compression: str = "ZLIB"
+    scan: InputScan = InputScan()
+
+
+def current_rss() -> int:
+    """Return the resident set size of the current process in bytes."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best we can do without procfs (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if peak > 1 << 32 else peak * 1024
+
+
+def gzip_size(path: str) -> int:
+    """Uncompressed size of a gzip file from its trailer (modulo 4 GiB, as gzip stores it)."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < 18:
+            return 0
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), 'little')
+
+
+def scan_inputs(input_dir: str) -> InputScan:
+    """
+    Collect file sizes and per-provider contribution counts without parsing the inputs.
+
+    Args:
+        input_dir: Directory containing the input files
+
+    Returns:
+        InputScan describing the inputs
+    """
+    from refiner.jsonl import GZIP_EXTENSION, is_jsonl
+
+    scan = InputScan(contributions={})
+    for input_filename in sorted(os.listdir(input_dir)):
+        input_file = os.path.join(input_dir, input_filename)
+        if os.path.splitext(input_file)[1].lower() != '.json' and not is_jsonl(input_file):
+            continue
+
+        compressed = input_file.lower().endswith(GZIP_EXTENSION)
+        size = gzip_size(input_file) if compressed else os.path.getsize(input_file)
+        scan.file_count += 1
+        scan.total_bytes += size
+        scan.largest_file_bytes = max(scan.largest_file_bytes, size)
+        # Counting contributions would mean decompressing the whole file; the size estimate covers it
+        if size == 0 or compressed:
+            continue
+
+        with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in CONTRIBUTION_TYPE_PATTERN.finditer(data):
+                provider = match.group(1).decode()
+                scan.contributions[provider] = scan.contributions.get(provider, 0) + 1
+
+    return scan
+
+
+def plan_job(scan: InputScan, memory_budget_mb: Optional[int] = None,
+             batch_size: Optional[int] = None, max_workers: Optional[int] = None) -> JobPlan:
+    """
+    Pick build mode, batch size, worker count and compression for the scanned inputs.
+
+    Args:
+        scan: Result of scan_inputs
+        memory_budget_mb: Memory budget in MB, or None for no limit
+        batch_size: Explicit batch size overriding the planner's choice
+        max_workers: Upper bound on workers (defaults to the CPU count)
+
+    Returns:
+        JobPlan for the job
+    """
+    cpus = max_workers or os.cpu_count() or 1
+    estimated_rows = scan.total_bytes // INPUT_BYTES_PER_ROW + sum(scan.contributions.values())
+    estimated_db_bytes = estimated_rows * DB_BYTES_PER_ROW
+
+    plan = JobPlan(
+        estimated_rows=estimated_rows,
+        estimated_db_bytes=estimated_db_bytes,
+        workers=cpus,
+        scan=scan
+    )
+
+    if memory_budget_mb:
+        budget = memory_budget_mb * 1024 * 1024
+        available = max(budget - BASE_OVERHEAD_BYTES, 0)
+        parsed_file_bytes = scan.largest_file_bytes * JSON_EXPANSION
+        plan.memory_budget_bytes = budget
+
+        # Keep the database in memory only if it and its on-disk copy fit in half the budget
+        plan.in_memory = estimated_db_bytes * 2 <= available // 2
+
+        # A quarter of what is left after parsing the largest file goes to pending models
+        model_bytes = max(available - parsed_file_bytes, 0) // 4
+        plan.max_batch_size = max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, model_bytes // BYTES_PER_MODEL))
+        plan.batch_size = min(DEFAULT_BATCH_SIZE, plan.max_batch_size)
+
+        # Every worker holds one parsed file
+        per_worker = parsed_file_bytes + BASE_OVERHEAD_BYTES
+        plan.workers = max(1, min(cpus, available // per_worker))
+
+        if estimated_db_bytes * ENCRYPT_EXPANSION["ZLIB"] > available:
+            plan.compression = "Uncompressed"
+
+    if batch_size:
+        plan.batch_size = batch_size
+        plan.max_batch_size = max(plan.max_batch_size, batch_size)
+
+    return plan
+
+
+def create_plan(input_dir: str = None) -> JobPlan:
+    """Scan the input directory and plan the job from the configured settings."""
+    from refiner.config import settings
+
+    scan = scan_inputs(input_dir or settings.INPUT_DIR)
+    plan = plan_job(scan, settings.MEMORY_BUDGET_MB, settings.BATCH_SIZE, settings.MAX_WORKERS)
+    logging.info(
+        f"Job plan: {scan.file_count} file(s), {scan.total_bytes} bytes, contributions {scan.contributions}; "
+        f"~{plan.estimated_rows} rows / ~{plan.estimated_db_bytes} bytes; "
+        f"{'in-memory' if plan.in_memory else 'on-disk'} build, batch size {plan.batch_size}, "
+        f"{plan.workers} worker(s), {plan.compression} compression"
+    )
+    return plan
+
+
+class BatchSizer:
+    """
+    Adjusts the batch size at runtime from the observed RSS.
+    Shrinks batches when memory use approaches the budget and grows them back when there is headroom.
+    """
+
+    HIGH_WATER = 0.85
+    LOW_WATER = 0.5
+
+    def __init__(self, plan: JobPlan):
+        self.size = plan.batch_size
+        self.max_size = plan.max_batch_size
+        self.budget = plan.memory_budget_bytes
+        self.peak_rss = 0
+        self.adjustments = 0
+
+    def observe(self) -> int:
+        """Sample the RSS after a batch and return the size to use for the next one."""
+        rss = current_rss()
+        self.peak_rss = max(self.peak_rss, rss)
+        if not self.budget:
+            return self.size
+
+        if rss > self.budget * self.HIGH_WATER and self.size > MIN_BATCH_SIZE:
+            self.size = max(MIN_BATCH_SIZE, self.size // 2)
+            self.adjustments += 1
+            logging.info(f"RSS {rss} bytes near budget, batch size reduced to {self.size}")
+        elif rss < self.budget * self.LOW_WATER and self.size < self.max_size:
+            self.size = min(self.max_size, self.size * 3 // 2)
+            self.adjustments += 1
+
+        return self.size
@@ -0,0 +1,125 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+# Phases of Refiner.transform, in order
+PHASES = ("parse", "validate", "transform", "write", "schema", "encrypt", "upload")
+# Allocations of the profiler itself and of the import machinery
+IGNORED_ALLOCATION_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>")
+
+
+class Profiler:
+    """
+    Opt-in per-phase profiling of a job.
+
+    Every phase gets its own cProfile profile, time and peak traced memory, accumulated over all
+    the times the phase runs. Allocations are attributed to source lines by tracemalloc snapshots
+    around the first run of a phase outside any other phase only: snapshots walk every traced block,
+    and phases such as transform and write run once per batch. Phases may nest (validate runs
+    inside transform): the outer phase's profile is paused while the inner one runs, while its time
+    and allocations include the inner phase. When disabled, phase()
+    costs a single attribute check. Only the thread that created the profiler is profiled; stages
+    running in pipeline threads report their own utilization instead.
+    """
+
+    def __init__(self, enabled: bool = False, top_allocations: int = 25):
+        self.enabled = enabled
+        self.thread = threading.current_thread()
+        self.top_allocations = top_allocations
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.seconds: Dict[str, float] = {}
+        self.calls: Counter = Counter()
+        self.peaks: Dict[str, int] = {}
+        self.allocations: Dict[str, Counter] = {}
+        # Active phases: (name, highest traced memory seen before an inner phase reset the peak)
+        self._stack: List[list] = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Profile the enclosed block as (another run of) the given phase."""
+        if not self.enabled or threading.current_thread() is not self.thread:
+            yield
+            return
+
+        if self._stack:
+            outer = self._stack[-1]
+            self.profiles[outer[0]].disable()
+            outer[1] = max(outer[1], tracemalloc.get_traced_memory()[1])
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        allocations = self.allocations.setdefault(name, Counter())
+        before = self._snapshot() if not self._stack and not self.calls[name] else None
+        self._stack.append([name, 0])
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] += 1
+            _, peak = self._stack.pop()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            self.peaks[name] = max(self.peaks.get(name, 0), peak)
+
+            if before is not None:
+                # Filtered per line rather than with Snapshot.filter_traces, which walks every trace
+                for stat in self._snapshot().compare_to(before, 'lineno'):
+                    if stat.size_diff and stat.traceback[0].filename not in IGNORED_ALLOCATION_FILES:
+                        allocations[str(stat.traceback)] += stat.size_diff
+
+            if self._stack:
+                outer = self._stack[-1]
+                outer[1] = max(outer[1], peak)
+                self.profiles[outer[0]].enable()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot()
+
+    def dump(self, output_dir: str) -> Dict[str, Any]:
+        """
+        Write profile-<phase>.prof (pstats format) and profile-<phase>-alloc.txt per phase.
+
+        Returns:
+            Summary per phase for the job metrics
+        """
+        summary = {}
+        for name in sorted(self.profiles, key=lambda phase: PHASES.index(phase) if phase in PHASES else len(PHASES)):
+            self.profiles[name].dump_stats(os.path.join(output_dir, f"profile-{name}.prof"))
+
+            top = self.allocations[name].most_common(self.top_allocations)
+            with open(os.path.join(output_dir, f"profile-{name}-alloc.txt"), 'w') as f:
+                f.write(f"Top {len(top)} net allocations by line in the first run of phase '{name}' (bytes)\n")
+                for location, size in top:
+                    f.write(f"{size:>14}  {location}\n")
+
+            summary[name] = {
+                "calls": self.calls[name],
+                "seconds": round(self.seconds[name], 6),
+                "peak_traced_bytes": self.peaks[name],
+                "net_allocated_bytes": sum(self.allocations[name].values()),
+            }
+
+        tracemalloc.stop()
+        logging.info(f"Wrote profiles for {len(summary)} phase(s) to {output_dir}")
+        return summary
+
+
+def create_profiler() -> Profiler:
+    """Enable profiling for this job when PROFILE is set, for a PROFILE_SAMPLE_RATE fraction of jobs."""
+    from refiner.config import settings
+
+    enabled = settings.PROFILE and random.random() < settings.PROFILE_SAMPLE_RATE
+    if enabled:
+        logging.info("Profiling enabled for this job")
+    return Profiler(enabled, settings.PROFILE_TOP_ALLOCATIONS)
@@ -1,59 +1,287 @@
 import json
 import logging
 import os
+from datetime import datetime, timezone
+from functools import partial
+from typing import Optional
+
+from pgpy.constants import CompressionAlgorithm
 
 from refiner.models.offchain_schema import OffChainSchema
 from refiner.models.output import Output
+from refiner.models.refined import set_job_timestamp
+from refiner.transformer.columnar import COLUMNAR_EXTENSION, ColumnarExporter
+from refiner.transformer.dictionary import DictionaryEncoder
+from refiner.transformer.flatten import JsonFlattener
+from refiner.transformer.fts import FullTextIndexer
 from refiner.transformer.multi_provider_transformer import MultiProviderTransformer
+from refiner.transformer.normalize import ColumnNormalizer
+from refiner.transformer.redact import PiiRedactor, parse_policies
+from refiner.transformer.rollup import RollupBuilder
+from refiner.transformer.stages import BatchStages
 from refiner.config import settings
-from refiner.utils.encrypt import encrypt_file
-from refiner.utils.ipfs import upload_file_to_ipfs, upload_json_to_ipfs
+from refiner.jsonl import is_jsonl, read_jsonl
+from refiner.pipeline import (
+    Pipeline, parse_inputs, read_inputs, transform_inputs, transform_inputs_parallel, validate_inputs
+)
+from refiner.planner import BatchSizer, JobPlan, create_plan
+from refiner.profiling import Profiler
+from refiner.sharding import encrypt_and_upload_shards, split_database
+from refiner.tracing import StatementTracer
+from refiner.utils.encrypt import EncryptionContext
+from refiner.utils.ipfs import upload_artifacts_to_ipfs, upload_json_to_ipfs
+from refiner.utils.resumable import pending_upload
+from refiner.utils.refinement_cache import RefinementCache, content_key, file_digest
+from refiner.utils.verify import verify_encrypted_file
 
 class Refiner:
-    def __init__(self):
+    def __init__(self, profiler: Profiler = None):
         self.db_path = os.path.join(settings.OUTPUT_DIR, 'db.libsql')
+        self.profiler = profiler or Profiler()
+
+    def _create_stages(self, tracer: Optional[StatementTracer]) -> BatchStages:
+        """The batch stages enabled by the settings."""
+        redactor = None
+        if settings.PII_REDACTION:
+            redactor = PiiRedactor(
+                settings.PII_HMAC_KEY or settings.REFINEMENT_ENCRYPTION_KEY,
+                parse_policies(settings.PII_POLICIES),
+                settings.PII_CACHE_SIZE
+            )
+        return BatchStages(
+            normalizer=ColumnNormalizer(keep_raw=settings.KEEP_RAW_COLUMNS),
+            redactor=redactor,
+            rollups=RollupBuilder() if settings.ROLLUP_TABLES else None,
+            dictionary=DictionaryEncoder() if settings.DICTIONARY_ENCODING else None,
+            flattener=JsonFlattener(keep_json=settings.KEEP_JSON_COLUMNS) if settings.FLATTEN_JSON_COLUMNS else None,
+            full_text=FullTextIndexer(settings.FTS_TOKENIZER) if settings.FULL_TEXT_SEARCH else None,
+            columnar=ColumnarExporter(
+                settings.OUTPUT_DIR, settings.COLUMNAR_COMPRESSION, settings.COLUMNAR_ROW_GROUP_ROWS
+            ) if settings.COLUMNAR_EXPORT else None,
+            tracer=tracer
+        )
+
+    def _create_transformer(self, plan: JobPlan, batch_sizer: BatchSizer,
+                            tracer: Optional[StatementTracer]) -> MultiProviderTransformer:
+        return MultiProviderTransformer(
+            self.db_path, in_memory=plan.in_memory, batch_sizer=batch_sizer,
+            stages=self._create_stages(tracer), profiler=self.profiler,
+            deterministic=settings.DETERMINISTIC_BUILD
+        )
+
+    def _run_pipeline(self, transformer: MultiProviderTransformer, plan: JobPlan) -> Pipeline:
+        """Read, parse, validate and transform the inputs in pipeline stages, writing in this thread."""
+        pipeline = Pipeline(settings.PIPELINE_QUEUE_SIZE)
+        pipeline.source("read", read_inputs(settings.INPUT_DIR, settings.JSONL_CHUNK_BYTES))
+        pipeline.stage("parse", parse_inputs)
+        parallel = settings.PARALLEL_TRANSFORM and plan.workers > 1
+        if parallel:
+            # Validation, transforms, normalization and redaction run in worker processes
+            pipeline.stage("transform", transform_inputs_parallel(
+                transformer, plan.workers, settings.PARALLEL_CHUNK_CONTRIBUTIONS
+            ))
+        else:
+            pipeline.stage("validate", validate_inputs)
+            pipeline.stage("transform", transform_inputs(transformer))
+        pipeline.run("write", partial(transformer.write_batches, prepared=parallel))
+        logging.info(f"Transformed {plan.scan.file_count} input file(s) in a pipeline in {pipeline.seconds:.3f}s")
+        return pipeline
 
     def transform(self) -> Output:
         """Transform all input files into the database."""
         logging.info("Starting data transformation")
         output = Output()
         transformer = None
+        shard_metrics = None
+        verifications = None
+        plan = create_plan()
+        batch_sizer = BatchSizer(plan)
+        encryption = None
+        build_metrics = None
 
-        # Iterate through files and transform data
-        for input_filename in os.listdir(settings.INPUT_DIR):
-            input_file = os.path.join(settings.INPUT_DIR, input_filename)
-            if os.path.splitext(input_file)[1].lower() == '.json':
-                with open(input_file, 'r') as f:
-                    input_data = json.load(f)
-
-                    # Use MultiProviderTransformer for all data
-                    if transformer is None:
-                        transformer = MultiProviderTransformer(self.db_path)
-                    transformer.process(input_data)
-                    logging.info(f"Transformed multi-provider data from {input_filename}")
-                    
-        if transformer is not None:
-            # Create a schema based on the SQLAlchemy schema
-            schema = OffChainSchema(
-                name=settings.SCHEMA_NAME,
-                version=settings.SCHEMA_VERSION,
-                description=settings.SCHEMA_DESCRIPTION,
-                dialect=settings.SCHEMA_DIALECT,
-                schema=transformer.get_schema()
+        pipeline = None
+        parallel_metrics = {"workers": plan.workers, "files": 0, "contributions": 0, "chunks": 0}
+
+        # Statement statistics are part of every profiled job
+        tracer = StatementTracer() if settings.SQL_TRACE or self.profiler.enabled else None
+
+        # Every row of the job gets the same created_at; deterministic builds use a fixed one
+        if settings.SOURCE_DATE_EPOCH is not None or settings.DETERMINISTIC_BUILD:
+            set_job_timestamp(
+                datetime.fromtimestamp(settings.SOURCE_DATE_EPOCH or 0, timezone.utc).replace(tzinfo=None)
             )
-            output.schema = schema
-                
-            # Upload the schema to IPFS
-            schema_file = os.path.join(settings.OUTPUT_DIR, 'schema.json')
-            with open(schema_file, 'w') as f:
-                json.dump(schema.model_dump(), f, indent=4)
-                schema_ipfs_hash = upload_json_to_ipfs(schema.model_dump())
-                logging.info(f"Schema uploaded to IPFS with hash: {schema_ipfs_hash}")
+        else:
+            set_job_timestamp()
+
+        if settings.PIPELINE:
+            if plan.scan.file_count:
+                transformer = self._create_transformer(plan, batch_sizer, tracer)
+                pipeline = self._run_pipeline(transformer, plan)
+        else:
+            # Iterate through files in a stable order and transform data
+            for input_filename in sorted(os.listdir(settings.INPUT_DIR)):
+                input_file = os.path.join(settings.INPUT_DIR, input_filename)
+                if os.path.splitext(input_file)[1].lower() == '.json':
+                    with open(input_file, 'r') as f:
+                        with self.profiler.phase("parse"):
+                            input_data = json.load(f)
+
+                        # Use MultiProviderTransformer for all data
+                        transformer = transformer or self._create_transformer(plan, batch_sizer, tracer)
+                        contributions = input_data.get('contributions') or []
+                        if (settings.PARALLEL_TRANSFORM and plan.workers > 1
+                                and len(contributions) > settings.PARALLEL_CHUNK_CONTRIBUTIONS):
+                            # Validate and transform chunks of contributions in worker processes
+                            transformer.process_parallel(input_data, plan.workers, settings.PARALLEL_CHUNK_CONTRIBUTIONS)
+                            parallel_metrics["files"] += 1
+                            parallel_metrics["contributions"] += len(contributions)
+                            parallel_metrics["chunks"] += -(-len(contributions) // settings.PARALLEL_CHUNK_CONTRIBUTIONS)
+                        else:
+                            transformer.process(input_data)
+                        logging.info(f"Transformed multi-provider data from {input_filename}")
+                elif is_jsonl(input_file):
+                    # Records are parsed and validated in parallel, chunk by chunk, and written in file order
+                    transformer = transformer or self._create_transformer(plan, batch_sizer, tracer)
+                    chunks = read_jsonl(input_file, plan.workers, settings.JSONL_CHUNK_BYTES)
+                    while True:
+                        with self.profiler.phase("parse"):
+                            contributions = next(chunks, None)
+                        if contributions is None:
+                            break
+                        transformer.process(contributions)
+                    logging.info(f"Transformed JSON Lines data from {input_filename}")
+
+        if transformer is not None:
+            transformer.finalize()
             
-            # Encrypt and upload the database to IPFS
-            encrypted_path = encrypt_file(settings.REFINEMENT_ENCRYPTION_KEY, self.db_path)
-            ipfs_hash = upload_file_to_ipfs(encrypted_path)
-            output.refinement_url = f"{settings.IPFS_GATEWAY_URL}/{ipfs_hash}"
+            with self.profiler.phase("schema"):
+                # Create a schema based on the SQLAlchemy schema
+                schema = OffChainSchema(
+                    name=settings.SCHEMA_NAME,
+                    version=settings.SCHEMA_VERSION,
+                    description=settings.SCHEMA_DESCRIPTION,
+                    dialect=settings.SCHEMA_DIALECT,
+                    schema=transformer.get_schema()
+                )
+                output.schema = schema
+                
+                schema_file = os.path.join(settings.OUTPUT_DIR, 'schema.json')
+                with open(schema_file, 'w') as f:
+                    json.dump(schema.model_dump(), f, indent=4)
+
+            # Identical inputs give identical database bytes, so a previously pinned refinement can be reused
+            cache, cache_key, reused = None, None, None
+            if settings.DETERMINISTIC_BUILD:
+                content_digest = file_digest(self.db_path)
+                build_metrics = {"deterministic": True, "content_sha256": content_digest, "reused": False}
+                if settings.REFINEMENT_CACHE_PATH:
+                    cache = RefinementCache(settings.REFINEMENT_CACHE_PATH)
+                    variant = f"{settings.SHARD_BY}:{settings.SHARD_MAX_ROWS}" if settings.SHARD_BY else ""
+                    if settings.COLUMNAR_EXPORT:
+                        variant += ":columnar"
+                    cache_key = content_key(settings.REFINEMENT_ENCRYPTION_KEY, content_digest, variant)
+                    reused = cache.lookup(cache_key)
 
+            compression = CompressionAlgorithm[plan.compression]
+            if reused:
+                output.refinement_url = reused["refinement_url"]
+                output.shard_urls = reused.get("shard_urls")
+                output.columnar_urls = reused.get("columnar_urls")
+                build_metrics["reused"] = True
+                logging.info(f"Database matches a previously pinned refinement, reusing {output.refinement_url}")
+            elif settings.SHARD_BY:
+                # Upload the schema to IPFS
+                with self.profiler.phase("upload"):
+                    schema_ipfs_hash = upload_json_to_ipfs(schema.model_dump())
+                    logging.info(f"Schema uploaded to IPFS with hash: {schema_ipfs_hash}")
+                with self.profiler.phase("write"):
+                    # Split into shards sharing the schema
+                    shards = split_database(self.db_path, settings.SHARD_BY, settings.SHARD_MAX_ROWS, tracer)
+                with self.profiler.phase("encrypt"):
+                    # Derive the encryption key once for every artifact of this job
+                    encryption = EncryptionContext(settings.REFINEMENT_ENCRYPTION_KEY)
+                # Shards are encrypted in worker processes and uploaded as each one is ready
+                with self.profiler.phase("upload"):
+                    ipfs_hashes, verifications = encrypt_and_upload_shards(
+                        [shard_path for shard_path, _ in shards], encryption, compression,
+                        plan.workers, settings.UPLOAD_CONCURRENCY,
+                        settings.VERIFY_OUTPUT, settings.VERIFY_QUICK_CHECK
+                    )
+                output.shard_urls = [f"{settings.IPFS_GATEWAY_URL}/{ipfs_hash}" for ipfs_hash in ipfs_hashes]
+                # The first shard doubles as the refinement URL for consumers unaware of shards
+                output.refinement_url = output.shard_urls[0] if output.shard_urls else None
+                shard_metrics = [{"path": os.path.basename(path), "rows": rows} for path, rows in shards]
+            else:
+                with self.profiler.phase("encrypt"):
+                    # Derive the encryption key once for every artifact of this job
+                    encryption = EncryptionContext(settings.REFINEMENT_ENCRYPTION_KEY)
+                    encrypted_path = f"{self.db_path}.pgp"
+                    if (settings.RESUMABLE_UPLOAD_URL and pending_upload(encrypted_path)
+                            and encryption.adopt(self.db_path, encrypted_path)):
+                        # An interrupted job left the same database half uploaded: continue that upload
+                        logging.info(f"Resuming the upload of {encrypted_path} left by a previous run")
+                        if build_metrics is not None:
+                            build_metrics["resumed_upload"] = True
+                    else:
+                        encrypted_path = encryption.encrypt_file(self.db_path, compression=compression)
+                    if settings.VERIFY_OUTPUT:
+                        # Check the round trip before the database is pinned
+                        verifications = [
+                            verify_encrypted_file(encryption, encrypted_path, settings.VERIFY_QUICK_CHECK)
+                        ]
+
+                # Upload the schema and the database to IPFS, in a single import when the backend supports it
+                with self.profiler.phase("upload"):
+                    schema_ipfs_hash, (ipfs_hash,) = upload_artifacts_to_ipfs(schema.model_dump(), [encrypted_path])
+                    logging.info(f"Schema uploaded to IPFS with hash: {schema_ipfs_hash}")
+                output.refinement_url = f"{settings.IPFS_GATEWAY_URL}/{ipfs_hash}"
+
+            if transformer.columnar_paths and not reused:
+                # Parquet is already compressed, so the files are encrypted without compression
+                with self.profiler.phase("upload"):
+                    columnar_hashes, columnar_verifications = encrypt_and_upload_shards(
+                        transformer.columnar_paths, encryption, CompressionAlgorithm.Uncompressed,
+                        plan.workers, settings.UPLOAD_CONCURRENCY, settings.VERIFY_OUTPUT, check_database=False
+                    )
+                output.columnar_urls = {
+                    os.path.basename(path)[:-len(COLUMNAR_EXTENSION)]: f"{settings.IPFS_GATEWAY_URL}/{ipfs_hash}"
+                    for path, ipfs_hash in zip(transformer.columnar_paths, columnar_hashes)
+                }
+                verifications = (verifications or []) + columnar_verifications
+
+            if cache_key and not reused:
+                cache.store(cache_key, {
+                    "refinement_url": output.refinement_url,
+                    "shard_urls": output.shard_urls,
+                    "columnar_urls": output.columnar_urls,
+                    "schema_ipfs_hash": schema_ipfs_hash
+                })
+
+        output.metrics = {
+            "plan": plan.model_dump(),
+            "peak_rss_bytes": batch_sizer.peak_rss,
+            "batch_size_adjustments": batch_sizer.adjustments
+        }
+        if transformer is not None:
+            output.metrics.update(transformer.stages.metrics())
+        if build_metrics is not None:
+            output.metrics["build"] = build_metrics
+        if encryption is not None:
+            output.metrics["encryption"] = encryption.stats()
+        if verifications:
+            output.metrics["verification"] = {
+                "artifacts": verifications,
+                "seconds": round(sum(verification["seconds"] for verification in verifications), 6)
+            }
+        if shard_metrics is not None:
+            output.metrics["shards"] = shard_metrics
+        if pipeline is not None:
+            output.metrics["pipeline"] = pipeline.stats()
+        if parallel_metrics["files"]:
+            output.metrics["parallel_transform"] = parallel_metrics
+        if tracer is not None:
+            output.metrics["sql"] = tracer.stats()
+            if self.profiler.enabled:
+                tracer.write_report(settings.OUTPUT_DIR)
         logging.info("Data transformation completed successfully")
         return output
\ No newline at end of file
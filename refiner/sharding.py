@@ -0,0 +1,327 @@
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from pgpy.constants import CompressionAlgorithm
+from sqlalchemy import MetaData
+
+from refiner.config import settings
+from refiner.models.refined import Base
+from refiner.tracing import StatementTracer, connect
+from refiner.transformer.fts import full_text_tables, rebuild, shadow_tables
+from refiner.utils.encrypt import EncryptionContext
+from refiner.utils.ipfs import upload_file_to_ipfs
+from refiner.utils.verify import verify_encrypted_file
+
+SHARD_BY_PROVIDER = "provider"
+SHARD_BY_ROWS = "rows"
+
+
+class TableGroup:
+    """A root (account) table together with every table that descends from it through foreign keys."""
+
+    def __init__(self, root):
+        self.root = root
+        self.root_key = list(root.primary_key.columns)[0].name
+        # (table, path to the root as a list of (table, foreign key column, parent table, parent column))
+        self.descendants = []
+
+
+def is_dimension(table) -> bool:
+    """Whether a table is shared by the accounts of every provider (e.g. contributors); shards get the rows they reference."""
+    return bool(table.info.get('dimension'))
+
+
+def table_groups(metadata: MetaData = Base.metadata) -> List[TableGroup]:
+    """Group the tables of the refined schema by the root table they descend from, leaving out dimension tables."""
+    groups = {}
+    paths = {}
+    for table in metadata.sorted_tables:
+        if is_dimension(table):
+            continue
+        foreign_keys = [foreign_key for foreign_key in table.foreign_keys if not is_dimension(foreign_key.column.table)]
+        if not foreign_keys:
+            groups[table.name] = TableGroup(table)
+            paths[table.name] = []
+            continue
+
+        foreign_key = foreign_keys[0]
+        parent = foreign_key.column.table
+        path = [(table, foreign_key.parent.name, parent, foreign_key.column.name)] + paths[parent.name]
+        paths[table.name] = path
+        root = path[-1][2]
+        groups[root.name].descendants.append((table, path))
+
+    return list(groups.values())
+
+
+def _root_weights(conn: sqlite3.Connection, group: TableGroup) -> Dict[int, int]:
+    """Count the rows owned by every root row of a group, including all descendant rows."""
+    weights = {
+        key: 1 for (key,) in conn.execute(
+            f'SELECT "{group.root_key}" FROM "{group.root.name}" ORDER BY "{group.root_key}"'
+        )
+    }
+    for table, path in group.descendants:
+        # Join up the foreign key chain until the column referencing the root table
+        joins = []
+        for depth, (_, fk_column, parent, parent_column) in enumerate(path[:-1]):
+            joins.append(
+                f'JOIN "{parent.name}" t{depth + 1} ON t{depth}."{fk_column}" = t{depth + 1}."{parent_column}"'
+            )
+        root_fk = f't{len(path) - 1}."{path[-1][1]}"'
+        query = f'SELECT {root_fk}, COUNT(*) FROM "{table.name}" t0 {" ".join(joins)} GROUP BY {root_fk}'
+        for key, count in conn.execute(query):
+            if key in weights:
+                weights[key] += count
+    return weights
+
+
+def plan_shards(conn: sqlite3.Connection, shard_by: str, max_rows: int) -> List[Dict[str, List[int]]]:
+    """
+    Assign root rows to shards.
+
+    Args:
+        conn: Connection to the refined database
+        shard_by: "provider" for at least one shard per provider, "rows" to pack providers together
+        max_rows: Target maximum number of rows per shard (a single account is never split)
+
+    Returns:
+        List of shards, each mapping root table name to the root keys it holds
+    """
+    if shard_by not in (SHARD_BY_PROVIDER, SHARD_BY_ROWS):
+        raise ValueError(f"Unknown SHARD_BY value: {shard_by}")
+
+    shards = []
+    current, current_rows = {}, 0
+    for group in table_groups():
+        weights = _root_weights(conn, group)
+        if not weights:
+            continue
+        if shard_by == SHARD_BY_PROVIDER and current:
+            shards.append(current)
+            current, current_rows = {}, 0
+
+        for key, weight in weights.items():
+            if current and current_rows + weight > max_rows:
+                shards.append(current)
+                current, current_rows = {}, 0
+            current.setdefault(group.root.name, []).append(key)
+            current_rows += weight
+
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _copy_schema(shard: sqlite3.Connection, types: Tuple[str, ...]) -> None:
+    """Replay the source schema objects of the given types into the shard, except full-text tables."""
+    placeholders = ", ".join("?" for _ in types)
+    rows = shard.execute(
+        f"SELECT name, sql FROM source.sqlite_master WHERE type IN ({placeholders}) AND sql IS NOT NULL "
+        f"AND name NOT LIKE 'sqlite_%' ORDER BY rowid",
+        types
+    ).fetchall()
+    skipped = {name for name, _ in full_text_tables(shard, "source")} | shadow_tables(shard, "source")
+    for name, sql in rows:
+        if name not in skipped:
+            shard.execute(sql)
+
+
+def _copy_dimension_rows(shard: sqlite3.Connection, metadata: MetaData = Base.metadata) -> int:
+    """Copy the rows of the dimension tables that the rows already in the shard reference."""
+    rows = 0
+    dimensions = [table for table in metadata.sorted_tables if is_dimension(table)]
+    # Referencing tables first, e.g. contributions before the contributors they reference
+    for table in reversed(dimensions):
+        key = list(table.primary_key.columns)[0].name
+        references = " UNION ".join(
+            f'SELECT "{foreign_key.parent.name}" FROM main."{referencing.name}"'
+            for referencing in metadata.sorted_tables
+            for foreign_key in referencing.foreign_keys
+            if foreign_key.column.table is table
+        )
+        if references:
+            rows += shard.execute(
+                f'INSERT INTO main."{table.name}" SELECT * FROM source."{table.name}" WHERE "{key}" IN ({references})'
+            ).rowcount
+    return rows
+
+
+def write_shard(db_path: str, shard_path: str, roots: Dict[str, List[int]],
+                tracer: Optional[StatementTracer] = None) -> int:
+    """
+    Write one shard holding the given root rows and all of their descendants.
+
+    Args:
+        db_path: Path to the full refined database
+        shard_path: Path of the shard database to create
+        roots: Mapping of root table name to the root keys to copy
+        tracer: Records the statements that copy the rows
+
+    Returns:
+        Number of rows written to the shard
+    """
+    if os.path.exists(shard_path):
+        os.remove(shard_path)
+
+    shard = connect(shard_path, tracer)
+    try:
+        shard.execute("ATTACH DATABASE ? AS source", (db_path,))
+        _copy_schema(shard, ('table',))
+
+        rows = 0
+        shard.execute("CREATE TEMP TABLE shard_keys (key INTEGER PRIMARY KEY)")
+        for group in table_groups():
+            keys = roots.get(group.root.name)
+            if not keys:
+                continue
+
+            shard.execute("DELETE FROM shard_keys")
+            shard.executemany("INSERT INTO shard_keys (key) VALUES (?)", ((key,) for key in keys))
+            rows += shard.execute(
+                f'INSERT INTO main."{group.root.name}" SELECT * FROM source."{group.root.name}" '
+                f'WHERE "{group.root_key}" IN (SELECT key FROM shard_keys)'
+            ).rowcount
+
+            # Descendants are in dependency order, so every parent is already in the shard
+            for table, path in group.descendants:
+                _, fk_column, parent, parent_column = path[0]
+                rows += shard.execute(
+                    f'INSERT INTO main."{table.name}" SELECT * FROM source."{table.name}" '
+                    f'WHERE "{fk_column}" IN (SELECT "{parent_column}" FROM main."{parent.name}")'
+                ).rowcount
+
+        shard.execute("DROP TABLE shard_keys")
+        rows += _copy_dimension_rows(shard)
+
+        # Tables outside the refined models that reference a model table (e.g. rollup tables) follow their
+        # parent rows; the others (e.g. dictionary lookup tables) are copied whole into every shard
+        model_tables = set(Base.metadata.tables)
+        full_text = full_text_tables(shard, "source")
+        skipped = model_tables | {name for name, _ in full_text} | shadow_tables(shard, "source")
+        source_tables = shard.execute(
+            "SELECT name FROM source.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for (name,) in source_tables:
+            if name in skipped:
+                continue
+            foreign_keys = [
+                (row[2], row[3], row[4])
+                for row in shard.execute(f'PRAGMA source.foreign_key_list("{name}")')
+                if row[2] in model_tables
+            ]
+            if foreign_keys:
+                parent, fk_column, parent_column = foreign_keys[0]
+                rows += shard.execute(
+                    f'INSERT INTO main."{name}" SELECT * FROM source."{name}" '
+                    f'WHERE "{fk_column}" IN (SELECT "{parent_column}" FROM main."{parent}")'
+                ).rowcount
+            else:
+                shard.execute(f'INSERT INTO main."{name}" SELECT * FROM source."{name}"')
+
+        # Full-text indexes are rebuilt over the shard's rows, whose rowids differ from the source's
+        for name, sql in full_text:
+            shard.execute(sql)
+            rebuild(shard, name)
+
+        _copy_schema(shard, ('index', 'view', 'trigger'))
+        shard.commit()
+        shard.execute("DETACH DATABASE source")
+    finally:
+        shard.close()
+
+    return rows
+
+
+def split_database(db_path: str, shard_by: str, max_rows: int,
+                   tracer: Optional[StatementTracer] = None) -> List[Tuple[str, int]]:
+    """
+    Split a refined database into shards that share its schema.
+
+    Args:
+        db_path: Path to the full refined database
+        shard_by: "provider" or "rows"
+        max_rows: Target maximum number of rows per shard
+        tracer: Records the statements that write the shards
+
+    Returns:
+        List of (shard path, row count)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        shards = plan_shards(conn, shard_by, max_rows)
+    finally:
+        conn.close()
+
+    base, extension = os.path.splitext(db_path)
+    results = []
+    for index, roots in enumerate(shards):
+        shard_path = f"{base}-shard-{index:03d}{extension}"
+        rows = write_shard(db_path, shard_path, roots, tracer)
+        results.append((shard_path, rows))
+        logging.info(f"Wrote shard {shard_path} with {rows} rows")
+    return results
+
+
+def upload_with_retries(file_path: str, retries: int) -> str:
+    """Upload a single file to IPFS, retrying only this file on failure."""
+    for attempt in range(retries + 1):
+        try:
+            return upload_file_to_ipfs(file_path)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = 2 ** attempt
+            logging.warning(f"Upload of {file_path} failed ({e}), retrying in {delay}s")
+            time.sleep(delay)
+
+
+def encrypt_shard(encryption: EncryptionContext, shard_path: str, compression: CompressionAlgorithm,
+                  verify: bool, check_database: bool) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Encrypt one shard and, if requested, verify the encrypted shard in the same worker."""
+    encrypted_path = encryption.encrypt_file(shard_path, None, compression)
+    verification = verify_encrypted_file(encryption, encrypted_path, check_database) if verify else None
+    return encrypted_path, verification
+
+
+def encrypt_and_upload_shards(shard_paths: List[str], encryption: EncryptionContext,
+                              compression: CompressionAlgorithm, workers: int, upload_concurrency: int,
+                              verify: bool = True, check_database: bool = True
+                              ) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Encrypt (and verify) shards in a process pool and upload each one as soon as it is encrypted.
+
+    Args:
+        shard_paths: Paths of the shard databases
+        encryption: Job encryption context, shipped to the workers with its derived key
+        compression: Compression algorithm applied before encryption
+        workers: Number of encryption processes
+        upload_concurrency: Number of concurrent uploads
+        verify: Decrypt every encrypted shard and check it before upload
+        check_database: Also run PRAGMA quick_check over the decrypted shard
+
+    Returns:
+        IPFS hashes in shard order, and the verification results in shard order
+    """
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(shard_paths)))) as encrypt_pool, \
+            ThreadPoolExecutor(max_workers=max(1, upload_concurrency)) as upload_pool:
+        encryptions = [
+            encrypt_pool.submit(encrypt_shard, encryption, path, compression, verify, check_database)
+            for path in shard_paths
+        ]
+        uploads = [
+            upload_pool.submit(
+                lambda encrypted: upload_with_retries(encrypted.result()[0], settings.UPLOAD_RETRIES),
+                encrypted
+            )
+            for encrypted in encryptions
+        ]
+        ipfs_hashes = [upload.result() for upload in uploads]
+        verifications = [encrypted.result()[1] for encrypted in encryptions if verify]
+    # Workers encrypt with copies of the context, so count their artifacts here
+    encryption.artifacts += len(shard_paths)
+    return ipfs_hashes, verifications
@@ -0,0 +1,160 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+
+# Table a statement works on: the first name after INTO, UPDATE, FROM, TABLE, ON or VIEW, without its schema
+TABLE_PATTERN = re.compile(r'\b(?:INTO|UPDATE|FROM|TABLE|ON|VIEW)\s+(?:\w+\.)?"?(\w+)"?', re.IGNORECASE)
+# Row groups of a multi-row INSERT ... VALUES (...), (...)
+VALUES_SEPARATOR = re.compile(r'\)\s*,\s*\(')
+
+# Statements that don't work on a table (PRAGMA, VACUUM, BEGIN, ...) are recorded under this name
+NO_TABLE = "-"
+
+
+@lru_cache(maxsize=1024)
+def classify(statement: str) -> Tuple[str, str, bool]:
+    """
+    Classify a SQL statement.
+
+    Returns:
+        (table, statement type, whether it returns inserted keys), e.g. ("zomato_orders", "INSERT", True)
+    """
+    words = statement.lstrip().split(None, 1)
+    kind = words[0].upper() if words else ""
+    match = TABLE_PATTERN.search(statement)
+    returning = kind == "INSERT" and re.search(r'\bRETURNING\b', statement, re.IGNORECASE) is not None
+    return (match.group(1) if match else NO_TABLE), kind, returning
+
+
+class StatementTracer:
+    """
+    Statement counts, rows and time per table and statement type.
+
+    Attached to a SQLAlchemy engine, it records every statement the ORM and Core send to SQLite
+    through cursor execute events, and counts session flushes. Raw sqlite3 connections opened with
+    connect() (e.g. while writing shards) are recorded the same way. An INSERT ... RETURNING is a
+    round trip made to fetch autoincrement keys during a flush, which rows with their keys assigned
+    up front (see DataTransformer.next_key) avoid; those are counted separately as "returning".
+    Rows are the rows written; reads report no rows, since they are counted before being fetched.
+    """
+
+    def __init__(self):
+        # (table, type) -> [statements, rows, seconds, returning]
+        self.totals: Dict[Tuple[str, str], list] = {}
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self._flush_start: Optional[float] = None
+
+    def record(self, statement: str, rows: int, seconds: float, executemany: bool = False,
+               parameters: Any = None) -> None:
+        table, kind, returning = classify(statement)
+        if returning and rows <= 0:
+            # INSERT ... RETURNING reports its rows only once they are fetched
+            if executemany and isinstance(parameters, list):
+                rows = len(parameters)
+            else:
+                rows = len(VALUES_SEPARATOR.findall(statement)) + 1
+        totals = self.totals.get((table, kind))
+        if totals is None:
+            totals = self.totals[(table, kind)] = [0, 0, 0.0, 0]
+        totals[0] += 1
+        totals[1] += max(rows, 0)
+        totals[2] += seconds
+        totals[3] += returning
+
+    def attach(self, engine, session_factory=None) -> None:
+        """Record the statements of an engine and, if given, the flushes of a sessionmaker."""
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("trace_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            seconds = time.perf_counter() - conn.info["trace_start"].pop()
+            self.record(statement, cursor.rowcount, seconds, executemany, parameters)
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(context):
+            # The statement failed, so after_cursor_execute never runs for it
+            starts = context.connection.info.get("trace_start") if context.connection is not None else None
+            if starts:
+                starts.pop()
+
+        if session_factory is not None:
+            @event.listens_for(session_factory, "before_flush")
+            def before_flush(session, flush_context, instances):
+                self._flush_start = time.perf_counter()
+
+            @event.listens_for(session_factory, "after_flush_postexec")
+            def after_flush_postexec(session, flush_context):
+                if self._flush_start is not None:
+                    self.flushes += 1
+                    self.flush_seconds += time.perf_counter() - self._flush_start
+                    self._flush_start = None
+
+    def connect(self, path: str) -> sqlite3.Connection:
+        """Open a sqlite3 connection whose execute and executemany calls are recorded."""
+        connection = sqlite3.connect(path, factory=TracedConnection)
+        connection.tracer = self
+        return connection
+
+    def stats(self) -> Dict[str, Any]:
+        tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (table, kind), (statements, rows, seconds, returning) in sorted(self.totals.items()):
+            entry = {"statements": statements, "rows": rows, "seconds": round(seconds, 6)}
+            if returning:
+                entry["returning"] = returning
+            tables.setdefault(table, {})[kind] = entry
+        return {
+            "statements": sum(totals[0] for totals in self.totals.values()),
+            "rows": sum(totals[1] for totals in self.totals.values()),
+            "seconds": round(sum(totals[2] for totals in self.totals.values()), 6),
+            "flushes": self.flushes,
+            "flush_seconds": round(self.flush_seconds, 6),
+            "tables": tables,
+        }
+
+    def write_report(self, output_dir: str) -> str:
+        """Write profile-sql.txt, listing the statement totals per table and type, slowest first."""
+        path = os.path.join(output_dir, "profile-sql.txt")
+        with open(path, 'w') as f:
+            f.write(f"SQL statements by table and type, slowest first ({self.flushes} session flushes "
+                    f"in {self.flush_seconds:.3f}s)\n")
+            f.write(f"{'seconds':>12} {'statements':>11} {'rows':>11} {'returning':>10}  type      table\n")
+            for (table, kind), (statements, rows, seconds, returning) in sorted(
+                self.totals.items(), key=lambda item: -item[1][2]
+            ):
+                f.write(f"{seconds:>12.6f} {statements:>11} {rows:>11} {returning:>10}  {kind:<9} {table}\n")
+        logging.info(f"Wrote SQL statement report to {path}")
+        return path
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection recording its execute and executemany calls into a StatementTracer."""
+
+    tracer: Optional[StatementTracer] = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        cursor = super().execute(sql, parameters)
+        if self.tracer:
+            self.tracer.record(sql, cursor.rowcount, time.perf_counter() - start)
+        return cursor
+
+    def executemany(self, sql, parameters):
+        start = time.perf_counter()
+        cursor = super().executemany(sql, parameters)
+        if self.tracer:
+            self.tracer.record(sql, cursor.rowcount, time.perf_counter() - start, True)
+        return cursor
+
+
+def connect(path: str, tracer: Optional[StatementTracer] = None) -> sqlite3.Connection:
+    """Open a sqlite3 connection, recorded by the tracer when there is one."""
+    return tracer.connect(path) if tracer else sqlite3.connect(path)
@@ -1,22 +1,72 @@
-from typing import Dict, Any, List
+from itertools import islice
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from refiner.models.refined import Base
+from sqlalchemy.pool import StaticPool
+from refiner.models.refined import Base, Claim, Contribution, Contributor
+from refiner.planner import BatchSizer
+from refiner.profiling import Profiler
+from refiner.transformer.fts import shadow_tables
+from refiner.transformer.stages import BatchStages
+from refiner.transformer.storage import create_table
 import sqlite3
 import os
 import logging
+import time
+
+# Rows per streamed batch when no batch sizer is configured
+DEFAULT_STREAM_BATCH_SIZE = 1000
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most size items, lazily."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 class DataTransformer:
     """
     Base class for transforming JSON data into SQLAlchemy models.
     Users should extend this class and override the transform method
-    to customize the transformation process for their specific data.
+    to customize the transformation process for their specific data,
+    or override transform_batches to yield bounded batches lazily.
     """
     
-    def __init__(self, db_path: str):
-        """Initialize the transformer with a database path."""
+    def __init__(self, db_path: Optional[str], in_memory: bool = False, batch_sizer: Optional[BatchSizer] = None,
+                 stages: Optional[BatchStages] = None, profiler: Optional[Profiler] = None,
+                 deterministic: bool = False):
+        """
+        Initialize the transformer with a database path.
+        
+        Args:
+            db_path: Path of the database file to produce, or None for a transformer that only
+                transforms, e.g. in a worker process
+            in_memory: Build the database in memory and write it to db_path in finalize()
+            batch_sizer: Controls how many models are committed per transaction
+            stages: Stages run over every batch before and after it is committed (normalization,
+                PII redaction, rollups, dictionary encoding, JSON flattening, columnar export, tracing)
+                and full-text indexes built in finalize(); only normalization by default
+            profiler: Per-phase profiling of validate, transform and write
+            deterministic: Write the final database with VACUUM INTO, for a canonical page layout
+        """
         self.db_path = db_path
-        self._initialize_database()
+        self.in_memory = in_memory
+        self.batch_sizer = batch_sizer
+        self.stages = stages or BatchStages()
+        self.profiler = profiler or Profiler()
+        self.deterministic = deterministic
+        # Parquet files written by finalize()
+        self.columnar_paths: List[str] = []
+        # Last primary key handed out per table, see next_key
+        self.keys: Dict[str, int] = {}
+        # Key of every natural key value seen per dimension table, see dimension_key
+        self.dimension_keys: Dict[str, Dict[tuple, int]] = {}
+        if db_path is not None:
+            self._initialize_database()
     
     def _initialize_database(self) -> None:
         """
@@ -26,9 +76,25 @@ class DataTransformer:
             os.remove(self.db_path)
             logging.info(f"Deleted existing database at {self.db_path}")
         
-        self.engine = create_engine(f'sqlite:///{self.db_path}')
-        Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
+        if self.in_memory:
+            # A single shared connection keeps the in-memory database alive across sessions
+            self.engine = create_engine('sqlite://', poolclass=StaticPool)
+        else:
+            self.engine = create_engine(f'sqlite:///{self.db_path}')
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        if self.stages.tracer:
+            self.stages.tracer.attach(self.engine, self.Session)
+        
+        # Create tables only; secondary indexes are deferred to build_indexes()
+        stages = self.stages
+        metadata = stages.dictionary.metadata if stages.dictionary else Base.metadata
+        # External-content full-text indexes refer to their rows by rowid
+        rowid_tables = stages.full_text.content_tables if stages.full_text else set()
+        with self.engine.begin() as connection:
+            for table in metadata.sorted_tables:
+                connection.execute(create_table(table, keep_rowid=table.name in rowid_tables))
+            if stages.rollups:
+                stages.rollups.create_tables(connection)
     
     def transform(self, data: Dict[str, Any]) -> List[Base]:
         """
@@ -42,14 +108,168 @@ class DataTransformer:
         """
         raise NotImplementedError("Subclasses must implement transform method")
     
+    def transform_batches(self, data: Dict[str, Any]) -> Iterator[List[Base]]:
+        """
+        Transform JSON data into batches of SQLAlchemy model instances.
+        Defaults to a single batch with everything transform() returns. Subclasses can yield
+        bounded batches lazily instead, so only the batch being written is held in memory.
+        Batches may be buffered before they are written, so rows must reference rows of earlier
+        batches by key (see next_key) rather than through relationships.
+        
+        Args:
+            data: Dictionary containing the JSON data
+            
+        Yields:
+            Lists of SQLAlchemy model instances to be saved to the database
+        """
+        yield self.transform(data)
+    
+    @property
+    def stream_batch_size(self) -> int:
+        """Number of rows per streamed batch, following the batch sizer when there is one."""
+        return self.batch_sizer.size if self.batch_sizer else DEFAULT_STREAM_BATCH_SIZE
+    
+    def next_key(self, model: type) -> int:
+        """
+        Assign the next integer primary key of a model's table ahead of the write, so rows
+        in later batches can reference it without waiting for a flush.
+        """
+        table_name = model.__table__.name
+        key = self.keys.get(table_name, 0) + 1
+        self.keys[table_name] = key
+        return key
+    
+    def dimension_key(self, model: type, **values: Any) -> Tuple[int, bool]:
+        """
+        Key of the row of a dimension table holding the given natural key values (the columns
+        listed in its info['natural_key']), assigned with next_key the first time they are seen.
+        Keys are looked up in memory, so rows referencing a dimension never query the database.
+
+        Returns:
+            (key, whether the row is new and still has to be written)
+        """
+        table = model.__table__
+        keys = self.dimension_keys.setdefault(table.name, {})
+        natural_key = tuple(values[column] for column in table.info['natural_key'])
+        key = keys.get(natural_key)
+        if key is not None:
+            return key, False
+        key = keys[natural_key] = self.next_key(model)
+        return key, True
+
+    def contribution_rows(self, contribution, claim: Optional[Tuple[str, str]] = None) -> List[Base]:
+        """
+        The contributor, claim and contribution rows of a contribution, in the order they have to be
+        written. Contributors and claims seen before are referenced by key (see dimension_key) and not
+        returned again, so the last row is always the Contribution.
+
+        Args:
+            contribution: Contribution data with walletAddress, type and claimedDate
+            claim: (walletAddress, claimDate) of the claim the contribution belongs to, if any
+        """
+        rows = []
+
+        def contributor_key(wallet_address: str) -> int:
+            # Checksummed (EIP-55) addresses differ only in case from the plain address
+            wallet_address = wallet_address.lower()
+            contributor_id, new = self.dimension_key(Contributor, wallet_address=wallet_address)
+            if new:
+                rows.append(Contributor(contributor_id=contributor_id, wallet_address=wallet_address))
+            return contributor_id
+
+        contributor_id = contributor_key(contribution.walletAddress)
+        claim_id = None
+        if claim is not None:
+            wallet_address, claim_date = claim
+            claimant_id = contributor_key(wallet_address)
+            claim_id, new = self.dimension_key(Claim, contributor_id=claimant_id, claim_date=claim_date)
+            if new:
+                rows.append(Claim(claim_id=claim_id, contributor_id=claimant_id, claim_date=claim_date))
+        rows.append(Contribution(
+            contribution_id=self.next_key(Contribution),
+            contributor_id=contributor_id,
+            claim_id=claim_id,
+            data_type=contribution.type,
+            claimed_date=contribution.claimedDate
+        ))
+        return rows
+
+    def build_indexes(self) -> None:
+        """
+        Build all declared secondary indexes in bulk.
+        Creating them after the load avoids maintaining each index row by row during inserts.
+        """
+        start = time.perf_counter()
+        count = 0
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                for index in sorted(table.indexes, key=lambda index: index.name):
+                    index.create(connection, checkfirst=True)
+                    count += 1
+        logging.info(f"Built {count} indexes in {time.perf_counter() - start:.3f}s")
+
+    def finalize(self) -> None:
+        """
+        Complete the database once all data has been processed.
+        Builds the deferred indexes and, for in-memory or deterministic builds, writes the database to db_path.
+        """
+        stages = self.stages
+        with self.profiler.phase("write"):
+            if stages.dictionary:
+                with self.engine.begin() as connection:
+                    stages.dictionary.write_lookup_tables(connection)
+            if stages.rollups:
+                with self.engine.begin() as connection:
+                    stages.rollups.write(connection)
+        
+            if stages.columnar:
+                self.columnar_paths = stages.columnar.close()
+        
+            self.build_indexes()
+            if stages.dictionary:
+                # Indexes are declared on the models' column names, so code columns are renamed after them
+                with self.engine.begin() as connection:
+                    stages.dictionary.rename_code_columns(connection)
+                    stages.dictionary.create_views(connection)
+            if stages.full_text:
+                with self.engine.begin() as connection:
+                    stages.full_text.build(connection)
+        
+            if self.deterministic:
+                # VACUUM INTO rewrites every table and index in key order into fresh, densely packed pages,
+                # so the file bytes only depend on the rows, not on batch sizes or the build mode
+                vacuum_path = f"{self.db_path}.vacuum"
+                if os.path.exists(vacuum_path):
+                    os.remove(vacuum_path)
+                with self.engine.connect() as connection:
+                    connection.exec_driver_sql("VACUUM INTO ?", (vacuum_path,))
+                self.engine.dispose()
+                os.replace(vacuum_path, self.db_path)
+                logging.info(f"Wrote canonical database to {self.db_path}")
+            elif self.in_memory:
+                raw_connection = self.engine.raw_connection()
+                target = sqlite3.connect(self.db_path)
+                try:
+                    raw_connection.driver_connection.backup(target)
+                finally:
+                    target.close()
+                    raw_connection.close()
+                logging.info(f"Wrote in-memory database to {self.db_path}")
+
     def get_schema(self):
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # Get all table definitions in order
+        # Get all table and view definitions in order, each table followed by its indexes
+        # FTS5 shadow tables are left out: creating the full-text table creates them
+        shadows = shadow_tables(conn)
         schema = []
-        for table in cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' ORDER BY name"):
-            schema.append(table[0] + ";")
+        for name, sql in cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'index', 'view') AND sql IS NOT NULL "
+            "ORDER BY tbl_name, type DESC, name"
+        ):
+            if name not in shadows:
+                schema.append(sql + ";")
         
         conn.close()
         return "\n\n".join(schema)
@@ -57,20 +277,79 @@ class DataTransformer:
     def process(self, data: Dict[str, Any]) -> None:
         """
         Process the data transformation and save to database.
-        If the database already exists, it will be deleted and recreated.
+        Batches from transform_batches are buffered up to stream_batch_size rows and written
+        in chunks, so a streaming transformer never holds more than about one batch.
         
         Args:
             data: Dictionary containing the JSON data
         """
+        self.write_batches(self.transform_batches(data))
+    
+    def write_batches(self, batches: Iterator[List[Base]], prepared: bool = False) -> None:
+        """
+        Save batches of models to the database, buffered up to stream_batch_size rows.
+        
+        Args:
+            batches: Lists of SQLAlchemy model instances, e.g. from transform_batches
+            prepared: The models were already normalized and redacted (see BatchStages.prepare)
+        """
         session = self.Session()
         try:
-            # Transform data into model instances
-            models = self.transform(data)
-            for model in models:
-                session.add(model)
-            session.commit()
+            pending = []
+            for models in self._timed_batches(batches):
+                pending.extend(models)
+                if len(pending) >= self.stream_batch_size:
+                    self._write(session, pending, prepared)
+                    pending = []
+            if pending:
+                self._write(session, pending, prepared)
         except Exception as e:
             session.rollback()
             raise e
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+    
+    def _timed_batches(self, batches: Iterator[List[Base]]) -> Iterator[List[Base]]:
+        """Attribute the time spent producing each batch to the transform phase."""
+        while True:
+            with self.profiler.phase("transform"):
+                models = next(batches, None)
+            if models is None:
+                return
+            yield models
+    
+    def _write(self, session, models: List[Base], prepared: bool = False) -> None:
+        """Run the batch stages over the given models and commit them."""
+        stages = self.stages
+        with self.profiler.phase("transform"):
+            if not prepared:
+                stages.prepare(models)
+            if stages.rollups:
+                # Aggregate the decoded values, before dictionary encoding
+                stages.rollups.observe(models)
+            if stages.dictionary:
+                # Encode up front: adding an account cascades its children into the same flush
+                stages.dictionary.encode(models)
+            
+            pending = stages.flattener.collect(models) if stages.flattener else None
+        
+        with self.profiler.phase("write"):
+            # Commit in batches, letting the batch sizer react to memory pressure
+            batch_size = self.batch_sizer.size if self.batch_sizer else len(models)
+            start = 0
+            while start < len(models):
+                batch = models[start:start + batch_size]
+                session.add_all(batch)
+                child_rows = None
+                if stages.flattener:
+                    # Child rows need the primary keys assigned by the flush
+                    session.flush()
+                    child_rows = stages.flattener.write(session, batch, pending)
+                session.commit()
+                if stages.columnar:
+                    stages.columnar.append_models(batch)
+                    if child_rows:
+                        stages.columnar.append_rows(child_rows)
+                start += batch_size
+                if self.batch_sizer:
+                    batch_size = self.batch_sizer.observe()
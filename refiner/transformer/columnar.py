@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import DateTime, Float, Integer, JSON, MetaData, Table
+from refiner.models.refined import Base
+from refiner.transformer.dictionary import DictionaryEncoder
+
+COLUMNAR_EXTENSION = ".parquet"
+
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    return pa.string()
+
+
+class ColumnarExporter:
+    """
+    Parquet side-output of the refined tables.
+
+    Rows are taken from the batches as they are committed (including the child rows of flattened
+    JSON columns), so the database is never read back. Every table gets a <table>.parquet file
+    written by a streaming ParquetWriter, with rows buffered up to row_group_rows per row group.
+    Dictionary-encoded columns are written with their decoded values, since Parquet applies its
+    own dictionary encoding. Requires pyarrow, which is only imported when the export is enabled.
+    """
+
+    def __init__(self, output_dir: str, compression: str = "zstd", row_group_rows: int = 65536,
+                 metadata: MetaData = Base.metadata):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("Columnar export requires pyarrow, install it with: pip install pyarrow") from e
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.output_dir = output_dir
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        # Set by the transformer when dictionary encoding is enabled
+        self.dictionary: Optional[DictionaryEncoder] = None
+        self.tables: Dict[str, Table] = dict(metadata.tables)
+        self.schemas = {
+            name: pyarrow.schema([(column.name, _arrow_type(pyarrow, column)) for column in table.columns])
+            for name, table in self.tables.items()
+        }
+        self.buffers: Dict[str, Dict[str, list]] = {}
+        self.writers: Dict[str, Any] = {}
+        self.rows: Dict[str, int] = {}
+        self.seconds = 0.0
+
+    def path(self, table_name: str) -> str:
+        return os.path.join(self.output_dir, f"{table_name}{COLUMNAR_EXTENSION}")
+
+    def _value(self, column, value: Any, decoded: Optional[list]) -> Any:
+        if value is None:
+            return None
+        if decoded is not None:
+            return decoded[value - 1]
+        if isinstance(column.type, JSON) or isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _append(self, table: Table, rows: List[Dict[str, Any]]) -> None:
+        encoded = dict(self.dictionary.columns.get(table.name, [])) if self.dictionary else {}
+        buffer = self.buffers.setdefault(table.name, {column.name: [] for column in table.columns})
+        for column in table.columns:
+            decoded = self.dictionary.values[encoded[column.key]] if column.key in encoded else None
+            default = column.default.arg if column.default is not None and column.default.is_callable else None
+            values = buffer[column.name]
+            for row in rows:
+                value = row.get(column.key)
+                if value is None and default is not None:
+                    value = default(None)
+                values.append(self._value(column, value, decoded))
+        self.rows[table.name] = self.rows.get(table.name, 0) + len(rows)
+        if len(buffer[table.columns[0].name]) >= self.row_group_rows:
+            self._flush(table.name)
+
+    def append_models(self, models: List[Base]) -> None:
+        """Buffer the rows of committed models."""
+        start = time.perf_counter()
+        by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for model in models:
+            table = model.__table__
+            by_table.setdefault(table.name, []).append(
+                {column.key: getattr(model, column.key) for column in table.columns}
+            )
+        for name, rows in by_table.items():
+            self._append(self.tables[name], rows)
+        self.seconds += time.perf_counter() - start
+
+    def append_rows(self, rows_by_table: Dict[Table, List[Dict[str, Any]]]) -> None:
+        """Buffer rows inserted without models (e.g. flattened JSON child rows)."""
+        start = time.perf_counter()
+        for table, rows in rows_by_table.items():
+            if rows:
+                self._append(self.tables[table.name], rows)
+        self.seconds += time.perf_counter() - start
+
+    def _flush(self, name: str) -> None:
+        buffer = self.buffers.get(name)
+        if not buffer or not buffer[next(iter(buffer))]:
+            return
+        writer = self.writers.get(name)
+        if writer is None:
+            writer = self.writers[name] = self.pq.ParquetWriter(
+                self.path(name), self.schemas[name], compression=self.compression
+            )
+        writer.write_table(self.pa.Table.from_pydict(buffer, schema=self.schemas[name]))
+        for values in buffer.values():
+            values.clear()
+
+    def close(self) -> List[str]:
+        """
+        Write the remaining rows and close every file.
+
+        Returns:
+            Paths of the Parquet files, in table order
+        """
+        start = time.perf_counter()
+        paths = []
+        for name in sorted(self.tables):
+            self._flush(name)
+            writer = self.writers.pop(name, None)
+            if writer is not None:
+                writer.close()
+                paths.append(self.path(name))
+        self.seconds += time.perf_counter() - start
+        logging.info(f"Wrote {len(paths)} Parquet files in {self.seconds:.3f}s")
+        return paths
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "compression": self.compression,
+            "tables": {
+                name: {"rows": rows, "bytes": os.path.getsize(self.path(name))}
+                for name, rows in sorted(self.rows.items()) if os.path.exists(self.path(name))
+            },
+            "seconds": round(self.seconds, 6),
+        }
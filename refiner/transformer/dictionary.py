@@ -0,0 +1,131 @@
+from typing import Dict, List, Any
+from sqlalchemy import MetaData, Table, Column, Integer, String, insert, text
+from refiner.models.refined import Base
+
+DICTIONARY_TABLE_PREFIX = "dict_"
+DECODED_VIEW_SUFFIX = "_view"
+CODE_COLUMN_SUFFIX = "_code"
+
+
+def _copy_table(table: Table, metadata: MetaData) -> Table:
+    """Copy a table into another MetaData, keeping the order of its constraints."""
+    copy = table.to_metadata(metadata)
+    # to_metadata copies the constraints in set order, which changes with the hash seed; the DDL
+    # lists them in creation order, so restore the original one to keep CREATE TABLE stable
+    order = {(type(constraint), tuple(constraint.columns.keys())): constraint._creation_order
+             for constraint in table.constraints}
+    for constraint in copy.constraints:
+        key = (type(constraint), tuple(constraint.columns.keys()))
+        if key in order:
+            constraint._creation_order = order[key]
+    return copy
+
+
+class DictionaryEncoder:
+    """
+    Compact storage mode for low-cardinality string columns.
+
+    Columns marked with info={'dictionary': <domain>} are stored as small integer codes.
+    Values are interned in memory while models are written, the lookup tables
+    (dict_<domain>) are filled once at the end, and a <table>_view per encoded table
+    exposes the original column names and values for queries. Once the load is done, encoded
+    columns are renamed to <column>_code, so a query comparing the original column name with a
+    value fails instead of silently matching no codes.
+    """
+
+    def __init__(self, metadata: MetaData = Base.metadata):
+        self.source_metadata = metadata
+        self.codes: Dict[str, Dict[str, int]] = {}
+        # Values per domain in code order, for decoding
+        self.values: Dict[str, List[str]] = {}
+
+        # Encoded columns per table: list of (attribute key, domain)
+        self.columns: Dict[str, List[tuple]] = {}
+        for table in metadata.sorted_tables:
+            encoded = [(column.key, column.info['dictionary']) for column in table.columns
+                       if 'dictionary' in column.info]
+            if encoded:
+                self.columns[table.name] = encoded
+                for _, domain in encoded:
+                    self.codes.setdefault(domain, {})
+                    self.values.setdefault(domain, [])
+
+        # Physical schema: a copy of the models with encoded columns as INTEGER, plus the lookup tables
+        self.metadata = MetaData()
+        for table in metadata.sorted_tables:
+            compact_table = _copy_table(table, self.metadata)
+            for key, _ in self.columns.get(table.name, []):
+                compact_table.c[key].type = Integer()
+        self.lookup_tables = {
+            domain: Table(
+                f"{DICTIONARY_TABLE_PREFIX}{domain}", self.metadata,
+                Column('code', Integer, primary_key=True),
+                Column('value', String, nullable=False)
+            )
+            for domain in sorted(self.codes)
+        }
+
+    def intern(self, domain: str, value: Any) -> Any:
+        """Return the code for a value, assigning the next code on first sight."""
+        if value is None:
+            return None
+        codes = self.codes[domain]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes) + 1
+            self.values[domain].append(value)
+        return code
+
+    def encode(self, models: List[Base]) -> None:
+        """Replace the values of encoded columns on the given models with their codes."""
+        for model in models:
+            encoded = self.columns.get(model.__table__.name)
+            if not encoded:
+                continue
+            for key, domain in encoded:
+                setattr(model, key, self.intern(domain, getattr(model, key)))
+
+    def write_lookup_tables(self, connection) -> None:
+        """Bulk insert the interned values into the lookup tables."""
+        for domain, table in self.lookup_tables.items():
+            rows = [{'code': code, 'value': value} for value, code in self.codes[domain].items()]
+            if rows:
+                connection.execute(insert(table), rows)
+
+    def rename_code_columns(self, connection) -> None:
+        """Rename every encoded column to <column>_code, along with the indexes and views that use it."""
+        for table in self.source_metadata.sorted_tables:
+            for key, _ in self.columns.get(table.name, []):
+                name = table.c[key].name
+                connection.execute(text(
+                    f'ALTER TABLE "{table.name}" RENAME COLUMN "{name}" TO "{name}{CODE_COLUMN_SUFFIX}"'
+                ))
+
+    def create_views(self, connection) -> None:
+        """Create a view per encoded table that decodes every (renamed) encoded column."""
+        for table in self.source_metadata.sorted_tables:
+            encoded = dict(self.columns.get(table.name, []))
+            if not encoded:
+                continue
+
+            select_columns, joins = [], []
+            for column in table.columns:
+                domain = encoded.get(column.key)
+                if domain is None:
+                    select_columns.append(f't."{column.name}"')
+                    continue
+                alias = f"d_{column.name}"
+                select_columns.append(f'{alias}.value AS "{column.name}"')
+                joins.append(
+                    f'LEFT JOIN "{self.lookup_tables[domain].name}" {alias} '
+                    f'ON {alias}.code = t."{column.name}{CODE_COLUMN_SUFFIX}"'
+                )
+
+            connection.execute(text(
+                f'CREATE VIEW "{table.name}{DECODED_VIEW_SUFFIX}" AS SELECT {", ".join(select_columns)} '
+                f'FROM "{table.name}" t {" ".join(joins)}'
+            ))
+
+    def stats(self) -> Dict[str, int]:
+        """Number of distinct values per domain."""
+        return {domain: len(codes) for domain, codes in self.codes.items()}
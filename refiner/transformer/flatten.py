@@ -0,0 +1,121 @@
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import MetaData, insert
+from refiner.models.refined import Base
+
+
+class FlattenSpec:
+    """How one JSON column of a parent table maps onto the rows of its child table."""
+
+    def __init__(self, child, key: str, kind: str, foreign_key: str, parent_key: str):
+        self.child = child
+        self.key = key
+        self.kind = kind
+        self.foreign_key = foreign_key
+        self.parent_key = parent_key
+
+    def rows(self, parent_id: Any, value: Any) -> List[Dict[str, Any]]:
+        """Build the child rows for one parent value."""
+        if self.kind == 'object':
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    logging.warning(f"Could not parse {self.key} as JSON, keeping it as a single field")
+                    value = {self.key: value}
+            if not isinstance(value, dict):
+                value = {self.key: value}
+            return [
+                {
+                    self.foreign_key: parent_id,
+                    'field': field,
+                    'value': item if isinstance(item, str) or item is None else json.dumps(item)
+                }
+                for field, item in value.items()
+            ]
+
+        return [
+            {self.foreign_key: parent_id, 'position': position, 'value': item}
+            for position, item in enumerate(value)
+        ]
+
+
+class JsonFlattener:
+    """
+    Normalized layout for JSON columns.
+
+    JSON columns marked with info={'flatten': 'list' | 'object'} are written as one row per
+    list item (or object field) into the child table that declares
+    info={'flattened_from': (parent table, column)}. The child rows are bulk inserted once the
+    parents have their primary keys. The JSON column itself is kept or cleared depending on keep_json.
+    """
+
+    def __init__(self, keep_json: bool = True, metadata: MetaData = Base.metadata):
+        self.keep_json = keep_json
+        self.rows_written = 0
+        # Last primary key assigned per child table, so the written rows carry their keys
+        self.keys: Dict[str, int] = {}
+
+        # Flattened columns per parent table
+        self.specs: Dict[str, List[FlattenSpec]] = {}
+        for child in metadata.sorted_tables:
+            flattened_from = child.info.get('flattened_from')
+            if not flattened_from:
+                continue
+            parent_name, key = flattened_from
+            parent = metadata.tables[parent_name]
+            foreign_key = next(fk for fk in child.foreign_keys if fk.column.table is parent)
+            self.specs.setdefault(parent_name, []).append(FlattenSpec(
+                child, key, parent.c[key].info['flatten'], foreign_key.parent.name, foreign_key.column.key
+            ))
+
+    def collect(self, models: List[Base]) -> Dict[int, List[Tuple[FlattenSpec, Any]]]:
+        """
+        Take the JSON values off the given models before they are written.
+
+        Returns:
+            Mapping of id(model) to the (spec, value) pairs to write once the model has its key
+        """
+        pending = {}
+        for model in models:
+            specs = self.specs.get(model.__table__.name)
+            if not specs:
+                continue
+            values = []
+            for spec in specs:
+                value = getattr(model, spec.key)
+                if value is not None:
+                    values.append((spec, value))
+                if not self.keep_json:
+                    setattr(model, spec.key, None)
+            if values:
+                pending[id(model)] = values
+        return pending
+
+    def write(self, session, models: List[Base], pending: Dict[int, List[Tuple[FlattenSpec, Any]]]
+              ) -> Dict[Any, List[Dict[str, Any]]]:
+        """
+        Bulk insert the child rows of the given (flushed) models.
+
+        Returns:
+            The inserted rows per child table
+        """
+        rows_by_child = {}
+        for model in models:
+            for spec, value in pending.pop(id(model), ()):
+                parent_id = getattr(model, spec.parent_key)
+                rows_by_child.setdefault(spec.child, []).extend(spec.rows(parent_id, value))
+
+        for child, rows in rows_by_child.items():
+            # Same keys SQLite would assign, since only this stage writes the child tables
+            primary_key = list(child.primary_key.columns)[0].name
+            key = self.keys.get(child.name, 0)
+            for row in rows:
+                key += 1
+                row[primary_key] = key
+            self.keys[child.name] = key
+            if rows:
+                session.execute(insert(child), rows)
+                self.rows_written += len(rows)
+        return rows_by_child
@@ -0,0 +1,90 @@
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Set, Tuple
+from sqlalchemy import Integer, MetaData
+from refiner.models.refined import Base
+
+FTS_TABLE_SUFFIX = "_fts"
+# Tables FTS5 creates next to every full-text table (content only exists for internal content)
+FTS5_SHADOW_SUFFIXES = ("_data", "_idx", "_content", "_docsize", "_config")
+
+# unicode61 folds case and, with remove_diacritics 2, accents of every script, so "creme brulee"
+# matches "Crème Brûlée". Stemming (porter) is English-only and trigram triples the index size.
+DEFAULT_TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def full_text_tables(conn: sqlite3.Connection, schema: str = "main") -> List[Tuple[str, str]]:
+    """(name, sql) of the FTS5 tables of a database, in creation order."""
+    return conn.execute(
+        f"SELECT name, sql FROM {schema}.sqlite_master WHERE type = 'table' "
+        f"AND sql LIKE 'CREATE VIRTUAL TABLE%USING fts5%' ORDER BY rowid"
+    ).fetchall()
+
+
+def shadow_tables(conn: sqlite3.Connection, schema: str = "main") -> Set[str]:
+    """Names of the shadow tables backing the FTS5 tables; SQLite creates them with their FTS5 table."""
+    return {
+        f"{name}{suffix}" for name, _ in full_text_tables(conn, schema) for suffix in FTS5_SHADOW_SUFFIXES
+    }
+
+
+def rebuild(conn: sqlite3.Connection, name: str) -> None:
+    """Index every row of the content table of an external-content FTS5 table in one pass."""
+    conn.execute(f'INSERT INTO "{name}"("{name}") VALUES (\'rebuild\')')
+
+
+class FullTextIndexer:
+    """
+    Full-text search over free-text columns.
+
+    Columns marked with info={'fts': True} are indexed by an external-content FTS5 table
+    <table>_fts, which stores only the index and reads the text from the table itself. The
+    indexes are built in bulk once the load completes, with no per-row triggers, and are queried
+    with e.g. SELECT * FROM zomato_orders WHERE rowid IN
+    (SELECT rowid FROM zomato_orders_fts WHERE zomato_orders_fts MATCH 'paneer').
+    """
+
+    def __init__(self, tokenizer: str = DEFAULT_TOKENIZER, metadata: MetaData = Base.metadata):
+        self.tokenizer = tokenizer
+        self.rows_indexed: Dict[str, int] = {}
+        self.seconds = 0.0
+
+        # Indexed columns per table: (table, column names)
+        self.tables = []
+        for table in metadata.sorted_tables:
+            columns = [column.name for column in table.columns if column.info.get('fts')]
+            if columns:
+                self.tables.append((table, columns))
+
+    @property
+    def content_tables(self) -> Set[str]:
+        """Tables read by the full-text indexes, which must keep their rowid even if declared WITHOUT ROWID."""
+        return {table.name for table, _ in self.tables}
+
+    def create_statement(self, table, columns: List[str]) -> str:
+        options = [f"content='{table.name}'"]
+        primary_key = list(table.primary_key.columns)
+        # An INTEGER PRIMARY KEY is the rowid; other tables use their implicit rowid
+        if len(primary_key) == 1 and isinstance(primary_key[0].type, Integer):
+            options.append(f"content_rowid='{primary_key[0].name}'")
+        tokenizer = self.tokenizer.replace("'", "''")
+        options.append(f"tokenize='{tokenizer}'")
+        return (
+            f'CREATE VIRTUAL TABLE "{table.name}{FTS_TABLE_SUFFIX}" USING fts5('
+            f'{", ".join(columns)}, {", ".join(options)})'
+        )
+
+    def build(self, connection) -> None:
+        """Create and fill the FTS5 tables after the load."""
+        start = time.perf_counter()
+        for table, columns in self.tables:
+            name = f"{table.name}{FTS_TABLE_SUFFIX}"
+            connection.exec_driver_sql(self.create_statement(table, columns))
+            connection.exec_driver_sql(f'INSERT INTO "{name}"("{name}") VALUES (\'rebuild\')')
+            self.rows_indexed[name] = connection.exec_driver_sql(f'SELECT COUNT(*) FROM "{table.name}"').scalar()
+        self.seconds += time.perf_counter() - start
+        logging.info(f"Built {len(self.tables)} full-text indexes in {self.seconds:.3f}s")
+
+    def stats(self) -> Dict[str, object]:
+        return {"tokenizer": self.tokenizer, "rows_indexed": self.rows_indexed, "seconds": round(self.seconds, 6)}
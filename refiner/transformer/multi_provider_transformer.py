@@ -1,4 +1,5 @@
-from typing import Dict, Any, List
+from functools import partial
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime
 from refiner.models.refined import (
     Base, ZomatoAccount, ZomatoOrder, UberAccount, UberTrip,
@@ -7,20 +8,125 @@ from refiner.models.refined import (
     PrimeVideoAccount, PrimeVideoWatchHistory, TwitchAccount,
     TwitterAccount, RedditAccount, RedditPost, SteamAccount, SteamGame
 )
-from refiner.transformer.base_transformer import DataTransformer
+from refiner.transformer.base_transformer import DataTransformer, chunked
+from refiner.transformer.stages import BatchStages
 from refiner.models.unrefined import (
-    MultiProviderInputData, ZomatoInputData, ZomatoData,
+    MultiProviderInputData, ZomatoInputData, ZomatoData, Contribution,
     ZomatoSecuredSharedData, UberSecuredSharedData, LinkedInSecuredSharedData,
     SpotifySecuredSharedData, NetflixSecuredSharedData, PrimeVideoSecuredSharedData,
     TwitchSecuredSharedData, TwitterSecuredSharedData, RedditSecuredSharedData,
     SteamSecuredSharedData
 )
+from refiner.utils.pool import ordered_map
 import json
 
+# Model class of every refined table, to rebuild the rows sent back by worker processes
+MODELS = {mapper.local_table.name: mapper.class_ for mapper in Base.registry.mappers}
+
+# Rows of one batch as sent back by a worker: (table name, attribute keys, one value tuple per row)
+PackedBatch = Tuple[str, Tuple[str, ...], List[tuple]]
+
+# Result of a worker task: (number of keys assigned per table, packed batches, BatchStages.row_stats())
+ChunkResult = Tuple[Dict[str, int], List[PackedBatch], Dict[str, Any]]
+
+
+def is_legacy_zomato_structure(data: Dict[str, Any]) -> bool:
+    """Check if the data structure is the legacy Zomato-only format."""
+    if 'contributions' not in data:
+        return False
+
+    # Check if ALL contributions are Zomato type and have the legacy structure
+    zomato_count = 0
+    total_contributions = len(data['contributions'])
+
+    for contribution in data['contributions']:
+        if contribution.get('type') == 'ZOMATO':
+            if 'securedSharedData' in contribution:
+                secured_data = contribution['securedSharedData']
+                # Legacy Zomato structure has 'userid' and 'orders'
+                if 'userid' in secured_data and 'orders' in secured_data:
+                    zomato_count += 1
+
+    # Only consider it legacy if ALL contributions are Zomato
+    return zomato_count == total_contributions and total_contributions > 0
+
+
+def validate_contributions(data: Dict[str, Any]) -> List[Any]:
+    """
+    Validate one input document, or a single contribution (e.g. a JSON Lines record), into its contributions.
+    Runs without a transformer, so documents can be validated in worker processes.
+    """
+    if 'contributions' not in data:
+        return [Contribution.model_validate(data)]
+    if is_legacy_zomato_structure(data):
+        input_data = ZomatoInputData.model_validate(data)
+    else:
+        input_data = MultiProviderInputData.model_validate(data)
+    # The contributions are transformed on their own, so they carry the claim they came in
+    for contribution in input_data.contributions:
+        contribution._claim = (input_data.walletAddress, input_data.claimDate)
+    return input_data.contributions
+
+
+def validate_document(data: Dict[str, Any]) -> List[Any]:
+    """
+    Validate a .json input document into its contributions, like transform_batches does; a
+    document without 'contributions' is a legacy single Zomato contribution.
+    """
+    if 'contributions' not in data:
+        return [ZomatoData.model_validate(data)]
+    return validate_contributions(data)
+
+
+def chunk_documents(data: Dict[str, Any], chunk_contributions: int) -> Iterator[Dict[str, Any]]:
+    """Split a document into documents of at most chunk_contributions contributions each."""
+    if len(data.get('contributions') or ()) <= chunk_contributions:
+        yield data
+        return
+    fields = {key: value for key, value in data.items() if key != 'contributions'}
+    for contributions in chunked(data['contributions'], chunk_contributions):
+        yield {**fields, 'contributions': contributions}
+
+
+def transform_chunk(documents: List[Dict[str, Any]], records: bool = False,
+                    stages: Optional[BatchStages] = None) -> ChunkResult:
+    """
+    Validate, transform, normalize and redact documents in a worker process, without a database.
+
+    Keys handed out by next_key count from 1 in every call; the writer shifts them past its own
+    keys (see MultiProviderTransformer.remap_batches). Only the attributes the transform and the
+    row stages set are sent back, so column defaults still apply when the rows are written.
+    Rows of natural-key dimension tables are left unredacted: the writer matches them on their
+    raw natural key and prepares the new ones itself.
+
+    Args:
+        documents: .json input documents, or JSON Lines records when records is set
+        records: Validate the documents as JSON Lines records (see validate_contributions)
+        stages: The writer's BatchStages.row_stages(), run over every batch
+
+    Returns:
+        (number of keys assigned per table, packed batches in order, counters of the row stages)
+    """
+    validate = validate_contributions if records else validate_document
+    # Own copies, so the counters sent back only cover this chunk even when run in the writer's process
+    stages = (stages or BatchStages()).row_stages()
+    worker = _ChunkTransformer()
+    batches = []
+    for models in worker.transform_batches([c for document in documents for c in validate(document)]):
+        if models:
+            if 'natural_key' not in models[0].__table__.info:
+                stages.prepare(models)
+            keys = tuple(key for key in vars(models[0]) if not key.startswith('_sa_'))
+            rows = [tuple(getattr(model, key) for key in keys) for model in models]
+            batches.append((models[0].__table__.name, keys, rows))
+    return worker.keys, batches, stages.row_stats()
+
 
 class MultiProviderTransformer(DataTransformer):
     """
     Transformer for multi-provider data that can handle different types of contributions.
+    Rows are yielded lazily in bounded per-table batches. Account keys are assigned up front
+    (see next_key), so child rows reference their account by key rather than through relationships.
     """
     
     def transform(self, data: Dict[str, Any]) -> List[Base]:
@@ -33,262 +139,340 @@ class MultiProviderTransformer(DataTransformer):
         Returns:
             List of SQLAlchemy model instances
         """
-        models = []
+        return [model for batch in self.transform_batches(data) for model in batch]
+    
+    def transform_batches(self, data: Dict[str, Any]) -> Iterator[List[Base]]:
+        """
+        Transform raw multi-provider data into batches of SQLAlchemy model instances.
         
-        # Check if data has the new multi-provider structure
+        Args:
+            data: Dictionary containing multi-provider data, or a list of contributions
+                already validated with validate_contributions
+            
+        Yields:
+            Lists of at most stream_batch_size models of a single table
+        """
+        if isinstance(data, list):
+            for contribution in data:
+                yield from self._contribution_batches(contribution)
+            return
+        
+        # Multi-provider structure, or the legacy Zomato-only one
         if 'contributions' in data:
-            # Check if it's the legacy Zomato-only structure
-            if self._is_legacy_zomato_structure(data):
-                input_data = ZomatoInputData.model_validate(data)
-                for contribution in input_data.contributions:
-                    if contribution.type == "ZOMATO":
-                        models.extend(self._process_zomato_contribution(contribution))
-            else:
-                # New multi-provider structure
-                input_data = MultiProviderInputData.model_validate(data)
-                for contribution in input_data.contributions:
-                    models.extend(self._process_contribution_by_type(contribution))
+            with self.profiler.phase("validate"):
+                contributions = validate_contributions(data)
+            for contribution in contributions:
+                yield from self._contribution_batches(contribution)
         else:
             # Legacy single contribution structure
-            zomato_data = ZomatoData.model_validate(data)
-            models.extend(self._process_legacy_zomato_data(zomato_data))
-        
-        return models
+            with self.profiler.phase("validate"):
+                zomato_data = ZomatoData.model_validate(data)
+            yield from self._account_batches(
+                zomato_data, partial(self._zomato_batches, zomato_data, zomato_data.securedSharedData)
+            )
     
-    def _is_legacy_zomato_structure(self, data: Dict[str, Any]) -> bool:
-        """Check if the data structure is the legacy Zomato-only format."""
-        if 'contributions' not in data:
-            return False
-        
-        # Check if ALL contributions are Zomato type and have the legacy structure
-        zomato_count = 0
-        total_contributions = len(data['contributions'])
-        
-        for contribution in data['contributions']:
-            if contribution.get('type') == 'ZOMATO':
-                if 'securedSharedData' in contribution:
-                    secured_data = contribution['securedSharedData']
-                    # Legacy Zomato structure has 'userid' and 'orders'
-                    if 'userid' in secured_data and 'orders' in secured_data:
-                        zomato_count += 1
-        
-        # Only consider it legacy if ALL contributions are Zomato
-        return zomato_count == total_contributions and total_contributions > 0
+    def process_parallel(self, data: Dict[str, Any], workers: int, chunk_contributions: int) -> None:
+        """
+        Process a multi-provider document with its contributions split across worker processes.
+
+        Chunks of chunk_contributions contributions are validated, transformed, normalized and
+        redacted in a process pool and sent back as packed rows, with account keys assigned
+        locally. This process remaps them to final keys in chunk order and runs the remaining
+        batch stages and writes, so the database is the same as with process().
+
+        Args:
+            data: Dictionary containing multi-provider data with a 'contributions' list
+            workers: Number of worker processes
+            chunk_contributions: Number of contributions per worker task
+        """
+        stages = self.stages.row_stages()
+        documents = (([document], False, stages) for document in chunk_documents(data, chunk_contributions))
+        self.write_batches(self.remap_batches(ordered_map(transform_chunk, documents, workers)), prepared=True)
+    
+    def remap_batches(self, results: Iterator[ChunkResult]) -> Iterator[List[Base]]:
+        """
+        Rebuild the models of packed worker results, shifting their local keys past the keys assigned so far.
+        Rows of natural-key dimension tables take the key of the row already seen with the same natural
+        key instead (see dimension_key), and are only written when they are new; they are prepared
+        here, the other rows were prepared by the worker, so the batches are written with prepared=True.
+        """
+        for local_keys, batches, stats in results:
+            self.stages.merge(stats)
+            offsets = {
+                table_name: self.keys.get(table_name, 0) for table_name in local_keys
+                if 'natural_key' not in MODELS[table_name].__table__.info
+            }
+            for table_name in offsets:
+                self.keys[table_name] = offsets[table_name] + local_keys[table_name]
+            # Local key -> final key of the dimension rows of this result
+            mapped: Dict[str, Dict[int, int]] = {table_name: {} for table_name in local_keys if table_name not in offsets}
+            
+            for table_name, keys, rows in batches:
+                model = MODELS[table_name]
+                table = model.__table__
+                natural_key = table.info.get('natural_key')
+                # Keys of this table and references to the tables the worker assigned keys for
+                shifts, references = [], []
+                for position, key in enumerate(keys):
+                    column = table.columns[key]
+                    targets = [foreign_key.column.table.name for foreign_key in column.foreign_keys]
+                    if column.primary_key:
+                        targets.append(table_name)
+                    shifts.extend((position, offsets[target]) for target in targets if target in offsets)
+                    references.extend(
+                        (position, mapped[target]) for target in targets if target in mapped and not column.primary_key
+                    )
+                
+                models = []
+                for row in rows:
+                    if shifts or references:
+                        row = list(row)
+                        for position, offset in shifts:
+                            if row[position] is not None:
+                                row[position] += offset
+                        for position, keys_map in references:
+                            if row[position] is not None:
+                                row[position] = keys_map[row[position]]
+                    values = dict(zip(keys, row))
+                    if natural_key:
+                        primary_key = table.primary_key.columns[0].key
+                        key, new = self.dimension_key(model, **values)
+                        mapped[table_name][values[primary_key]] = key
+                        if not new:
+                            continue
+                        values[primary_key] = key
+                    models.append(model(**values))
+                if models:
+                    if natural_key:
+                        self.stages.prepare(models)
+                    yield models
     
-    def _process_contribution_by_type(self, contribution) -> List[Base]:
+    def _contribution_batches(self, contribution) -> Iterator[List[Base]]:
         """Process a contribution based on its type."""
         contribution_type = contribution.type
         
         if contribution_type == "ZOMATO":
-            return self._process_zomato_contribution_new(contribution)
+            secured_data = ZomatoSecuredSharedData.model_validate(contribution.securedSharedData)
+            batches = partial(self._zomato_batches, contribution, secured_data)
         elif contribution_type == "UBER":
-            return self._process_uber_contribution(contribution)
+            batches = partial(self._uber_batches, contribution)
         elif contribution_type == "LINKEDIN":
-            return self._process_linkedin_contribution(contribution)
+            batches = partial(self._linkedin_batches, contribution)
         elif contribution_type == "SPOTIFY":
-            return self._process_spotify_contribution(contribution)
+            batches = partial(self._spotify_batches, contribution)
         elif contribution_type == "NETFLIX":
-            return self._process_netflix_contribution(contribution)
+            batches = partial(self._netflix_batches, contribution)
         elif contribution_type == "AMAZON_PRIME":
-            return self._process_prime_video_contribution(contribution)
+            batches = partial(self._prime_video_batches, contribution)
         elif contribution_type == "TWITCH":
-            return self._process_twitch_contribution(contribution)
+            batches = partial(self._twitch_batches, contribution)
         elif contribution_type == "TWITTER":
-            return self._process_twitter_contribution(contribution)
+            batches = partial(self._twitter_batches, contribution)
         elif contribution_type == "REDDIT":
-            return self._process_reddit_contribution(contribution)
+            batches = partial(self._reddit_batches, contribution)
         elif contribution_type == "STEAM":
-            return self._process_steam_contribution(contribution)
+            batches = partial(self._steam_batches, contribution)
         else:
             # Unknown contribution type, skip
-            return []
+            return iter(())
+        return self._account_batches(contribution, batches)
     
-    def _process_zomato_contribution_new(self, contribution) -> List[Base]:
-        """Process Zomato contribution with new structure."""
-        models = []
-        secured_data = ZomatoSecuredSharedData.model_validate(contribution.securedSharedData)
-        
+    def _account_batches(self, contribution, batches) -> Iterator[List[Base]]:
+        """
+        The contributor, claim and contribution rows of a contribution (see contribution_rows), then the
+        account batches of batches(contribution_id).
+        """
+        rows = self.contribution_rows(contribution, getattr(contribution, '_claim', None))
+        yield from ([row] for row in rows)
+        yield from batches(rows[-1].contribution_id)
+    
+    def _zomato_batches(self, contribution, secured_data, contribution_id: int) -> Iterator[List[Base]]:
+        """Process a Zomato contribution (any of the new, legacy and single contribution structures)."""
         account = ZomatoAccount(
+            account_id=self.next_key(ZomatoAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             user_id=secured_data.userid
         )
-        models.append(account)
-        
-        for order_data in secured_data.orders:
-            order = ZomatoOrder(
-                order_id=order_data.orderId,
-                account_id=None,
-                total_cost=order_data.totalCost,
-                dish_string=order_data.dishString,
-                restaurant_url=order_data.restaurantURL,
-                delivery_address=order_data.deliveryDetails.deliveryAddress,
-                delivery_status=order_data.deliveryDetails.deliveryStatus,
-                delivery_message=order_data.deliveryDetails.deliveryMessage,
-                delivery_label=order_data.deliveryDetails.deliveryLabel
-            )
-            order.account = account
-            models.append(order)
-        
-        return models
+        yield [account]
+        
+        for orders in chunked(secured_data.orders, self.stream_batch_size):
+            yield [
+                ZomatoOrder(
+                    order_id=order_data.orderId,
+                    account_id=account.account_id,
+                    total_cost=order_data.totalCost,
+                    dish_string=order_data.dishString,
+                    restaurant_url=order_data.restaurantURL,
+                    delivery_address=order_data.deliveryDetails.deliveryAddress,
+                    delivery_status=order_data.deliveryDetails.deliveryStatus,
+                    delivery_message=order_data.deliveryDetails.deliveryMessage,
+                    delivery_label=order_data.deliveryDetails.deliveryLabel
+                )
+                for order_data in orders
+            ]
     
-    def _process_uber_contribution(self, contribution) -> List[Base]:
+    def _uber_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Uber contribution."""
-        models = []
         secured_data = UberSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = UberAccount(
+            account_id=self.next_key(UberAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             user_id=secured_data.userid,
             username=secured_data.username
         )
-        models.append(account)
-        
-        for trip_data in secured_data.trips:
-            trip = UberTrip(
-                account_id=None,
-                begin_trip_time=trip_data.beginTripTime,
-                dropoff_time=trip_data.dropoffTime,
-                pickup_address=trip_data.pickupAddress,
-                dropoff_address=trip_data.dropoffAddress,
-                fare=trip_data.fare,
-                vehicle_type=trip_data.vehicleType
-            )
-            trip.account = account
-            models.append(trip)
-        
-        return models
+        yield [account]
+        
+        for trips in chunked(secured_data.trips, self.stream_batch_size):
+            yield [
+                UberTrip(
+                    account_id=account.account_id,
+                    begin_trip_time=trip_data.beginTripTime,
+                    dropoff_time=trip_data.dropoffTime,
+                    pickup_address=trip_data.pickupAddress,
+                    dropoff_address=trip_data.dropoffAddress,
+                    fare=trip_data.fare,
+                    vehicle_type=trip_data.vehicleType
+                )
+                for trip_data in trips
+            ]
     
-    def _process_linkedin_contribution(self, contribution) -> List[Base]:
+    def _linkedin_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process LinkedIn contribution."""
-        models = []
         secured_data = LinkedInSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = LinkedinAccount(
+            account_id=self.next_key(LinkedinAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             linkedin_user_data=secured_data.linkedinUserData
         )
-        models.append(account)
-        
-        for connection_data in secured_data.connectionsList:
-            connection = LinkedinConnection(
-                account_id=None,
-                name=connection_data.name,
-                headline=connection_data.headline,
-                url=connection_data.url,
-                pfp=connection_data.pfp
-            )
-            connection.account = account
-            models.append(connection)
-        
-        return models
+        yield [account]
+        
+        for connections in chunked(secured_data.connectionsList, self.stream_batch_size):
+            yield [
+                LinkedinConnection(
+                    account_id=account.account_id,
+                    name=connection_data.name,
+                    headline=connection_data.headline,
+                    url=connection_data.url,
+                    pfp=connection_data.pfp
+                )
+                for connection_data in connections
+            ]
     
-    def _process_spotify_contribution(self, contribution) -> List[Base]:
+    def _spotify_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Spotify contribution."""
-        models = []
         secured_data = SpotifySecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = SpotifyAccount(
+            account_id=self.next_key(SpotifyAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             username=secured_data.username
         )
-        models.append(account)
+        yield [account]
         
-        # Process playlists
-        for playlist_data in secured_data.userPlaylists:
-            playlist = SpotifyPlaylist(
-                playlist_id=playlist_data.playlistId,
-                account_id=None,
-                playlist_name=playlist_data.playlistName,
-                playlist_owner=playlist_data.playlistOwner
-            )
-            playlist.account = account
-            models.append(playlist)
+        # Process playlists, each batch followed by the tracks of its playlists
+        for playlists in chunked(secured_data.userPlaylists, self.stream_batch_size):
+            yield [
+                SpotifyPlaylist(
+                    playlist_id=playlist_data.playlistId,
+                    account_id=account.account_id,
+                    playlist_name=playlist_data.playlistName,
+                    playlist_owner=playlist_data.playlistOwner
+                )
+                for playlist_data in playlists
+            ]
             
-            # Process tracks in playlist
-            for track_data in playlist_data.tracks:
-                track = SpotifyTrack(
+            tracks = (
+                SpotifyTrack(
                     track_id=track_data.trackId,
                     playlist_id=playlist_data.playlistId,
                     track_name=track_data.trackName
                 )
-                track.playlist = playlist
-                models.append(track)
-        
-        # Process recently played tracks
-        for recent_track in secured_data.recentlyPlayed:
-            recently_played = SpotifyRecentlyPlayed(
-                account_id=None,
-                track_name=recent_track.trackName,
-                track_id=recent_track.trackId
+                for playlist_data in playlists
+                for track_data in playlist_data.tracks
             )
-            recently_played.account = account
-            models.append(recently_played)
+            yield from chunked(tracks, self.stream_batch_size)
         
-        return models
+        # Process recently played tracks
+        for recent_tracks in chunked(secured_data.recentlyPlayed, self.stream_batch_size):
+            yield [
+                SpotifyRecentlyPlayed(
+                    account_id=account.account_id,
+                    track_name=recent_track.trackName,
+                    track_id=recent_track.trackId
+                )
+                for recent_track in recent_tracks
+            ]
     
-    def _process_netflix_contribution(self, contribution) -> List[Base]:
+    def _netflix_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Netflix contribution."""
-        models = []
         secured_data = NetflixSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = NetflixAccount(
+            account_id=self.next_key(NetflixAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             profile_name=secured_data.profileName,
             user_id=secured_data.userId
         )
-        models.append(account)
-        
-        for favorite_item in secured_data.favorites:
-            favorite = NetflixFavorite(
-                account_id=None,
-                favorite_item=favorite_item
-            )
-            favorite.account = account
-            models.append(favorite)
+        yield [account]
         
-        return models
+        for favorites in chunked(secured_data.favorites, self.stream_batch_size):
+            yield [
+                NetflixFavorite(
+                    account_id=account.account_id,
+                    favorite_item=favorite_item
+                )
+                for favorite_item in favorites
+            ]
     
-    def _process_prime_video_contribution(self, contribution) -> List[Base]:
+    def _prime_video_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Prime Video contribution."""
-        models = []
         secured_data = PrimeVideoSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = PrimeVideoAccount(
+            account_id=self.next_key(PrimeVideoAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             profile_name=secured_data.profileName,
             user_id=secured_data.userId
         )
-        models.append(account)
-        
-        for date, watched_items in secured_data.watchHistory.items():
-            watch_history = PrimeVideoWatchHistory(
-                account_id=None,
-                watch_date=date,
-                watched_items=watched_items
-            )
-            watch_history.account = account
-            models.append(watch_history)
-        
-        return models
+        yield [account]
+        
+        for history in chunked(secured_data.watchHistory.items(), self.stream_batch_size):
+            yield [
+                PrimeVideoWatchHistory(
+                    account_id=account.account_id,
+                    watch_date=date,
+                    watched_items=watched_items
+                )
+                for date, watched_items in history
+            ]
     
-    def _process_twitch_contribution(self, contribution) -> List[Base]:
+    def _twitch_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Twitch contribution."""
-        models = []
         secured_data = TwitchSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = TwitchAccount(
+            account_id=self.next_key(TwitchAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
@@ -298,16 +482,15 @@ class MultiProviderTransformer(DataTransformer):
             bio=secured_data.bio,
             socials=secured_data.socials
         )
-        models.append(account)
-        
-        return models
+        yield [account]
     
-    def _process_twitter_contribution(self, contribution) -> List[Base]:
+    def _twitter_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Twitter contribution."""
-        models = []
         secured_data = TwitterSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = TwitterAccount(
+            account_id=self.next_key(TwitterAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
@@ -317,16 +500,15 @@ class MultiProviderTransformer(DataTransformer):
             posts=secured_data.posts,
             user_description=secured_data.userDescription
         )
-        models.append(account)
-        
-        return models
+        yield [account]
     
-    def _process_reddit_contribution(self, contribution) -> List[Base]:
+    def _reddit_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Reddit contribution."""
-        models = []
         secured_data = RedditSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = RedditAccount(
+            account_id=self.next_key(RedditAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
@@ -338,97 +520,44 @@ class MultiProviderTransformer(DataTransformer):
             post_karma=secured_data.karma.postKarma,
             comment_karma=secured_data.karma.commentKarma
         )
-        models.append(account)
-        
-        for post_data in secured_data.posts:
-            post = RedditPost(
-                post_id=post_data.id,
-                account_id=None,
-                title=post_data.title
-            )
-            post.account = account
-            models.append(post)
-        
-        return models
+        yield [account]
+        
+        for posts in chunked(secured_data.posts, self.stream_batch_size):
+            yield [
+                RedditPost(
+                    post_id=post_data.id,
+                    account_id=account.account_id,
+                    title=post_data.title
+                )
+                for post_data in posts
+            ]
     
-    def _process_steam_contribution(self, contribution) -> List[Base]:
+    def _steam_batches(self, contribution, contribution_id: int) -> Iterator[List[Base]]:
         """Process Steam contribution."""
-        models = []
         secured_data = SteamSecuredSharedData.model_validate(contribution.securedSharedData)
         
         account = SteamAccount(
+            account_id=self.next_key(SteamAccount),
+            contribution_id=contribution_id,
             data_type=contribution.type,
             witnesses=contribution.witnesses,
             account_username=contribution.AccountUsername,
             user_id=secured_data.userId
         )
-        models.append(account)
-        
-        for game_name in secured_data.ownedGames:
-            game = SteamGame(
-                account_id=None,
-                game_name=game_name
-            )
-            game.account = account
-            models.append(game)
-        
-        return models
-    
-    # Legacy methods for backward compatibility
-    def _process_zomato_contribution(self, contribution_data) -> List[Base]:
-        """Process a single Zomato contribution (legacy method)."""
-        models = []
-        
-        account = ZomatoAccount(
-            data_type=contribution_data.type,
-            witnesses=contribution_data.witnesses,
-            account_username=contribution_data.AccountUsername,
-            user_id=contribution_data.securedSharedData.userid
-        )
-        models.append(account)
-        
-        for order_data in contribution_data.securedSharedData.orders:
-            order = ZomatoOrder(
-                order_id=order_data.orderId,
-                account_id=None,
-                total_cost=order_data.totalCost,
-                dish_string=order_data.dishString,
-                restaurant_url=order_data.restaurantURL,
-                delivery_address=order_data.deliveryDetails.deliveryAddress,
-                delivery_status=order_data.deliveryDetails.deliveryStatus,
-                delivery_message=order_data.deliveryDetails.deliveryMessage,
-                delivery_label=order_data.deliveryDetails.deliveryLabel
-            )
-            order.account = account
-            models.append(order)
+        yield [account]
         
-        return models
+        for games in chunked(secured_data.ownedGames, self.stream_batch_size):
+            yield [
+                SteamGame(
+                    account_id=account.account_id,
+                    game_name=game_name
+                )
+                for game_name in games
+            ]
+
+
+class _ChunkTransformer(MultiProviderTransformer):
+    """The contribution transforms of MultiProviderTransformer, run in a worker without a database."""
     
-    def _process_legacy_zomato_data(self, zomato_data) -> List[Base]:
-        """Process legacy Zomato data structure."""
-        models = []
-        
-        account = ZomatoAccount(
-            data_type=zomato_data.type,
-            witnesses=zomato_data.witnesses,
-            account_username=zomato_data.AccountUsername,
-            user_id=zomato_data.securedSharedData.userid
-        )
-        models.append(account)
-        
-        for order_data in zomato_data.securedSharedData.orders:
-            order = ZomatoOrder(
-                order_id=order_data.orderId,
-                account_id=None,
-                total_cost=order_data.totalCost,
-                dish_string=order_data.dishString,
-                restaurant_url=order_data.restaurantURL,
-                delivery_address=order_data.deliveryDetails.deliveryAddress,
-                delivery_status=order_data.deliveryDetails.deliveryStatus,
-                delivery_message=order_data.deliveryDetails.deliveryMessage,
-                delivery_label=order_data.deliveryDetails.deliveryLabel
-            )
-            order.account = account
-            models.append(order)
-        
-        return models
+    def __init__(self):
+        super().__init__(None)
@@ -0,0 +1,75 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+from sqlalchemy import MetaData
+from refiner.models.refined import Base
+from refiner.utils.date import parse_epoch
+from refiner.utils.number import parse_count, parse_money
+
+
+def _normalize_money(key: str, values: List[str]) -> Dict[str, list]:
+    parsed = [parse_money(value) for value in values]
+    return {
+        f"{key}_minor": [minor for minor, _ in parsed],
+        f"{key}_currency": [currency for _, currency in parsed],
+    }
+
+
+def _normalize_timestamp(key: str, values: List[str]) -> Dict[str, list]:
+    return {f"{key}_epoch": [parse_epoch(value) if value else None for value in values]}
+
+
+def _normalize_count(key: str, values: List[str]) -> Dict[str, list]:
+    return {f"{key}_count": [parse_count(value) for value in values]}
+
+
+# Normalization kinds: column values of a batch -> typed sibling columns
+NORMALIZERS: Dict[str, Callable[[str, List[str]], Dict[str, list]]] = {
+    'money': _normalize_money,
+    'timestamp': _normalize_timestamp,
+    'count': _normalize_count,
+}
+
+
+class ColumnNormalizer:
+    """
+    Batched parsing of string columns into typed columns.
+
+    Columns marked with info={'normalize': <kind>} are parsed column by column over a
+    whole batch of models into their typed siblings (<column>_minor/_currency for money,
+    <column>_epoch for timestamps, <column>_count for counts). The raw string column is
+    kept or cleared depending on keep_raw.
+    """
+
+    def __init__(self, keep_raw: bool = True, metadata: MetaData = Base.metadata):
+        self.keep_raw = keep_raw
+        self.failures = 0
+
+        # Normalized columns per table: list of (attribute key, kind)
+        self.columns: Dict[str, List[Tuple[str, str]]] = {}
+        for table in metadata.sorted_tables:
+            normalized = [(column.key, column.info['normalize']) for column in table.columns
+                          if 'normalize' in column.info]
+            if normalized:
+                self.columns[table.name] = normalized
+
+    def normalize(self, models: List[Base]) -> None:
+        """Parse the normalized columns of the given models in place."""
+        by_table = defaultdict(list)
+        for model in models:
+            if model.__table__.name in self.columns:
+                by_table[model.__table__.name].append(model)
+
+        for table_name, table_models in by_table.items():
+            for key, kind in self.columns[table_name]:
+                values = [getattr(model, key) for model in table_models]
+                targets = NORMALIZERS[kind](key, values)
+                for target, parsed in targets.items():
+                    for model, value in zip(table_models, parsed):
+                        setattr(model, target, value)
+
+                # The first target (amount, epoch or count) is only empty when parsing failed
+                primary = next(iter(targets.values()))
+                self.failures += sum(1 for value, raw in zip(primary, values) if value is None and raw is not None)
+                if not self.keep_raw:
+                    for model in table_models:
+                        setattr(model, key, None)
@@ -0,0 +1,141 @@
+import copy
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import MetaData
+from refiner.models.refined import Base
+from refiner.utils.pii import mask_value, pseudonymize, scrub_text
+
+POLICIES = ('hmac', 'mask', 'scrub', 'drop', 'keep')
+
+
+def parse_policies(value: Optional[str]) -> Dict[Tuple[str, str], str]:
+    """
+    Parse policy overrides of the form "table.column=policy,table.column=policy".
+
+    Args:
+        value: Override string, e.g. "uber_trips.pickup_address=drop,linkedin_connections.url=keep"
+
+    Returns:
+        Mapping of (table, column) to policy
+    """
+    overrides = {}
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        column, _, policy = entry.partition('=')
+        table_name, _, column_name = column.strip().partition('.')
+        policy = policy.strip()
+        if not table_name or not column_name or policy not in POLICIES:
+            raise ValueError(f"Invalid PII policy '{entry}', expected table.column=<{'|'.join(POLICIES)}>")
+        overrides[(table_name, column_name)] = policy
+    return overrides
+
+
+class PiiRedactor:
+    """
+    Batched PII redaction between transform and write.
+
+    Columns marked with info={'pii': <policy>} (or named in the overrides) are redacted column by
+    column over a whole batch of models:
+        hmac  - keyed HMAC-SHA256 pseudonym, stable for a given key
+        mask  - keep the shape of the value (email domain, URL host, first/last character)
+        scrub - replace emails, URLs and phone numbers inside free text
+        drop  - remove the value (empty string for NOT NULL columns)
+        keep  - leave the value untouched
+    Every policy function is memoized with an LRU cache, so a value repeated across many rows
+    is only processed once. The redactor pickles without its caches, so it can be sent to the worker
+    processes of parallel transforms, which redact the rows they produce (see transform_chunk).
+    """
+
+    def __init__(self, key: str, overrides: Dict[Tuple[str, str], str] = None,
+                 cache_size: int = 65536, metadata: MetaData = Base.metadata):
+        self.key = key.encode() if isinstance(key, str) else key
+        self.cache_size = cache_size
+        self.values = 0
+        self.seconds = 0.0
+        # Cache statistics of the copies that ran in worker processes, see merge
+        self.worker_cache_hits = 0
+        self.worker_cache_misses = 0
+
+        # Redacted columns per table: list of (attribute key, policy, nullable)
+        overrides = overrides or {}
+        self.columns: Dict[str, List[Tuple[str, str, bool]]] = {}
+        for table in metadata.sorted_tables:
+            redacted = []
+            for column in table.columns:
+                policy = overrides.get((table.name, column.name), column.info.get('pii'))
+                if policy and policy != 'keep':
+                    redacted.append((column.key, policy, column.nullable))
+            if redacted:
+                self.columns[table.name] = redacted
+        self._build_caches()
+
+    def _build_caches(self) -> None:
+        key = self.key
+        self.functions = {
+            'hmac': lru_cache(maxsize=self.cache_size)(lambda value: pseudonymize(value, key)),
+            'mask': lru_cache(maxsize=self.cache_size)(mask_value),
+            'scrub': lru_cache(maxsize=self.cache_size)(scrub_text),
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['functions']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._build_caches()
+
+    def copy(self) -> 'PiiRedactor':
+        """A redactor with the same key and columns, and its own empty caches and counters."""
+        redactor = copy.copy(self)
+        redactor.values = 0
+        redactor.seconds = 0.0
+        redactor.worker_cache_hits = 0
+        redactor.worker_cache_misses = 0
+        return redactor
+
+    def merge(self, stats: Dict[str, Any]) -> None:
+        """Add the stats() of a copy that redacted rows elsewhere, e.g. in a worker process."""
+        self.values += stats["values"]
+        self.seconds += stats["seconds"]
+        self.worker_cache_hits += stats["cache_hits"]
+        self.worker_cache_misses += stats["cache_misses"]
+
+    def redact(self, models: List[Base]) -> None:
+        """Redact the PII columns of the given models in place."""
+        start = time.perf_counter()
+        by_table = defaultdict(list)
+        for model in models:
+            if model.__table__.name in self.columns:
+                by_table[model.__table__.name].append(model)
+
+        for table_name, table_models in by_table.items():
+            for key, policy, nullable in self.columns[table_name]:
+                values = [getattr(model, key) for model in table_models]
+                if policy == 'drop':
+                    redacted = [None if nullable else '' for _ in values]
+                else:
+                    function = self.functions[policy]
+                    redacted = [function(value) if isinstance(value, str) else value for value in values]
+                for model, value in zip(table_models, redacted):
+                    setattr(model, key, value)
+                self.values += len(values)
+
+        self.seconds += time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Any]:
+        """Throughput and cache effectiveness of the redaction stage."""
+        hits = sum(function.cache_info().hits for function in self.functions.values()) + self.worker_cache_hits
+        misses = sum(function.cache_info().misses for function in self.functions.values()) + self.worker_cache_misses
+        return {
+            "values": self.values,
+            "seconds": round(self.seconds, 6),
+            "values_per_second": round(self.values / self.seconds) if self.seconds else None,
+            "cache_hits": hits,
+            "cache_misses": misses,
+        }
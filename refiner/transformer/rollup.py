@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import MetaData, Table, Column, ForeignKey, Integer, PrimaryKeyConstraint, insert
+from refiner.models.refined import Base
+
+ROLLUP_TABLE_PREFIX = "rollup_"
+
+# Aggregate steps: (running total, value) -> new total, ignoring NULLs like the SQL aggregates
+AGGREGATES = {
+    'count': lambda total, value: total + 1,
+    'sum': lambda total, value: total if value is None else value if total is None else total + value,
+    'min': lambda total, value: total if value is None else value if total is None else min(total, value),
+    'max': lambda total, value: total if value is None else value if total is None else max(total, value),
+}
+
+
+class RollupSpec:
+    """One summary table: measures aggregated over the rows of a source table, per group."""
+
+    def __init__(self, source: Table, name: str, group_by: Tuple[str, ...], measures: Dict[str, Tuple[str, Optional[str]]]):
+        self.source = source
+        self.group_by = group_by
+        # (rollup column, aggregate, source column) in declaration order
+        self.measures = [(column, function, key) for column, (function, key) in measures.items()]
+
+        columns = []
+        for key in group_by:
+            source_column = source.c[key]
+            foreign_keys = [ForeignKey(foreign_key.column) for foreign_key in source_column.foreign_keys]
+            # Group columns such as currencies may be NULL, unlike usual primary key columns
+            columns.append(Column(key, source_column.type, *foreign_keys, nullable=source_column.nullable))
+        for column, function, key in self.measures:
+            if function == 'count':
+                columns.append(Column(column, Integer, nullable=False))
+            else:
+                columns.append(Column(column, source.c[key].type, nullable=True))
+        self.table = Table(
+            f"{ROLLUP_TABLE_PREFIX}{name}", MetaData(), *columns, PrimaryKeyConstraint(*group_by)
+        )
+
+
+class RollupBuilder:
+    """
+    Summary tables maintained while the load runs.
+
+    Tables declaring info={'rollup': {'name': ..., 'group_by': (...), 'measures': {...}}} get a
+    rollup_<name> table with one row per group (usually per account) holding counts, sums and
+    first/last values of their rows. Aggregates are updated in memory as every batch is written,
+    so the source tables are never scanned again, and the rollup rows are bulk inserted once at
+    the end. Group columns keep the foreign keys of their source columns, so the rollup rows
+    follow their account into shards.
+    """
+
+    def __init__(self, metadata: MetaData = Base.metadata):
+        self.specs: Dict[str, List[RollupSpec]] = {}
+        for table in metadata.sorted_tables:
+            rollup = table.info.get('rollup')
+            if rollup:
+                self.specs.setdefault(table.name, []).append(RollupSpec(
+                    table, rollup['name'], tuple(rollup['group_by']), rollup['measures']
+                ))
+        # Rollup table name -> group values -> aggregate values
+        self.groups: Dict[str, Dict[tuple, list]] = {
+            spec.table.name: {} for specs in self.specs.values() for spec in specs
+        }
+
+    @property
+    def tables(self) -> List[Table]:
+        return [spec.table for specs in self.specs.values() for spec in specs]
+
+    def create_tables(self, connection) -> None:
+        for table in self.tables:
+            table.create(connection)
+
+    def observe(self, models: List[Base]) -> None:
+        """Fold the given models into the aggregates of their table's rollups."""
+        for model in models:
+            for spec in self.specs.get(model.__table__.name, ()):
+                groups = self.groups[spec.table.name]
+                group = tuple(getattr(model, key) for key in spec.group_by)
+                totals = groups.get(group)
+                if totals is None:
+                    totals = groups[group] = [0 if function == 'count' else None for _, function, _ in spec.measures]
+                for position, (_, function, key) in enumerate(spec.measures):
+                    totals[position] = AGGREGATES[function](totals[position], getattr(model, key) if key else None)
+
+    def write(self, connection) -> None:
+        """Bulk insert the rollup rows, in group order."""
+        for specs in self.specs.values():
+            for spec in specs:
+                groups = self.groups[spec.table.name]
+                rows: List[Dict[str, Any]] = []
+                for group in sorted(groups, key=lambda values: tuple((value is not None, value) for value in values)):
+                    row = dict(zip(spec.group_by, group))
+                    row.update((column, total) for (column, _, _), total in zip(spec.measures, groups[group]))
+                    rows.append(row)
+                if rows:
+                    connection.execute(insert(spec.table), rows)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of rows per rollup table."""
+        return {name: len(groups) for name, groups in self.groups.items()}
@@ -0,0 +1,87 @@
+from typing import Any, Dict, List, Optional
+from refiner.models.refined import Base
+from refiner.tracing import StatementTracer
+from refiner.transformer.columnar import ColumnarExporter
+from refiner.transformer.dictionary import DictionaryEncoder
+from refiner.transformer.flatten import JsonFlattener
+from refiner.transformer.fts import FullTextIndexer
+from refiner.transformer.normalize import ColumnNormalizer
+from refiner.transformer.redact import PiiRedactor
+from refiner.transformer.rollup import RollupBuilder
+
+
+class BatchStages:
+    """
+    The stages a transformer runs over every batch of models on its way to the database.
+
+    Before each commit, in order: normalizer (always on), redactor, rollups (rows must carry their
+    group keys, see next_key), dictionary and flattener. After each commit, columnar appends the
+    committed rows to the Parquet side-output. The tracer records the statements sent to the
+    database, and full_text builds the FTS5 indexes in finalize(). A stage set to None is disabled.
+    """
+
+    def __init__(self, normalizer: Optional[ColumnNormalizer] = None, redactor: Optional[PiiRedactor] = None,
+                 rollups: Optional[RollupBuilder] = None, dictionary: Optional[DictionaryEncoder] = None,
+                 flattener: Optional[JsonFlattener] = None, full_text: Optional[FullTextIndexer] = None,
+                 columnar: Optional[ColumnarExporter] = None, tracer: Optional[StatementTracer] = None):
+        self.normalizer = normalizer or ColumnNormalizer()
+        self.redactor = redactor
+        self.rollups = rollups
+        self.dictionary = dictionary
+        self.flattener = flattener
+        self.full_text = full_text
+        self.columnar = columnar
+        self.tracer = tracer
+        if columnar:
+            # Encoded columns are exported with their decoded values
+            columnar.dictionary = dictionary
+
+    def prepare(self, models: List[Base]) -> None:
+        """
+        Run the stages that only depend on the rows themselves (normalization and PII redaction) over
+        the given models. They run where the rows are produced when that is a worker process (see
+        transform_chunk), and in the writer otherwise.
+        """
+        self.normalizer.normalize(models)
+        if self.redactor:
+            self.redactor.redact(models)
+
+    def row_stages(self) -> 'BatchStages':
+        """
+        Copies of the stages run by prepare(), with their own counters, to send to worker processes.
+        The other stages hold the state of the whole job and only run in the writer.
+        """
+        return BatchStages(
+            normalizer=ColumnNormalizer(keep_raw=self.normalizer.keep_raw),
+            redactor=self.redactor.copy() if self.redactor else None
+        )
+
+    def row_stats(self) -> Dict[str, Any]:
+        """Counters of the stages run by prepare(), for merge()."""
+        stats: Dict[str, Any] = {"normalization_failures": self.normalizer.failures}
+        if self.redactor:
+            stats["pii_redaction"] = self.redactor.stats()
+        return stats
+
+    def merge(self, stats: Dict[str, Any]) -> None:
+        """Add the row_stats() of copies that ran in a worker process."""
+        self.normalizer.failures += stats["normalization_failures"]
+        if self.redactor and "pii_redaction" in stats:
+            self.redactor.merge(stats["pii_redaction"])
+
+    def metrics(self) -> Dict[str, Any]:
+        """Statistics of the enabled stages, as reported in the job metrics."""
+        metrics: Dict[str, Any] = {"normalization_failures": self.normalizer.failures}
+        if self.dictionary:
+            metrics["dictionary"] = self.dictionary.stats()
+        if self.flattener:
+            metrics["flattened_rows"] = self.flattener.rows_written
+        if self.redactor:
+            metrics["pii_redaction"] = self.redactor.stats()
+        if self.rollups:
+            metrics["rollups"] = self.rollups.stats()
+        if self.full_text:
+            metrics["full_text"] = self.full_text.stats()
+        if self.columnar:
+            metrics["columnar"] = self.columnar.stats()
+        return metrics
@@ -0,0 +1,75 @@
+from sqlalchemy import Boolean, Float, Integer, LargeBinary, Numeric, Table
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateColumn, CreateTable
+
+# Column types allowed in STRICT tables, by SQLAlchemy type
+STRICT_TYPES = (
+    ((Integer, Boolean), "INTEGER"),
+    ((Float, Numeric), "REAL"),
+    ((LargeBinary,), "BLOB"),
+)
+
+
+def strict_type(column_type) -> str:
+    """Storage class a column type is declared with in a STRICT table (anything else is stored as TEXT)."""
+    for types, name in STRICT_TYPES:
+        if isinstance(column_type, types):
+            return name
+    return "TEXT"
+
+
+def without_rowid(table: Table) -> bool:
+    return not table.dialect_options["sqlite"]["with_rowid"]
+
+
+def strict(table: Table) -> bool:
+    return bool(table.dialect_options["sqlite"]["strict"])
+
+
+class CreateStrictColumn(CreateColumn):
+    """Column definition in a STRICT table, declared with the column's storage class."""
+
+
+class CreateStorageTable(CreateTable):
+    """CREATE TABLE with the table's storage options, see create_table."""
+
+    def __init__(self, element: Table, keep_rowid: bool = False):
+        super().__init__(element)
+        self.keep_rowid = keep_rowid and without_rowid(element)
+        if strict(element):
+            self.columns = [CreateStrictColumn(column) for column in element.columns]
+
+
+def create_table(table: Table, keep_rowid: bool = False) -> CreateTable:
+    """
+    CREATE TABLE statement for a table with its storage options.
+
+    Tables declare them as SQLite dialect options in their __table_args__: sqlite_with_rowid=False
+    stores the rows in the primary key's B-tree (WITHOUT ROWID) and sqlite_strict=True enforces
+    the column types (STRICT). keep_rowid creates a WITHOUT ROWID table as a rowid table instead
+    (e.g. for a full-text index).
+    """
+    return CreateStorageTable(table, keep_rowid)
+
+
+@compiles(CreateStrictColumn)
+def _create_strict_column(create, compiler, **kw):
+    # STRICT tables only accept INTEGER, REAL, TEXT, BLOB and ANY, not e.g. VARCHAR, DATETIME or JSON
+    spec = compiler.visit_create_column(create, **kw)
+    if spec is None:
+        return spec
+    column = create.element
+    declared = compiler.dialect.type_compiler_instance.process(column.type, type_expression=column)
+    name = compiler.preparer.format_column(column)
+    return spec.replace(f"{name} {declared}", f"{name} {strict_type(column.type)}", 1)
+
+
+@compiles(CreateStorageTable)
+def _create_storage_table(create, compiler, **kw):
+    # SQLite keeps the whitespace after the table options in sqlite_master, and so in schema.json
+    statement = compiler.visit_create_table(create, **kw).rstrip()
+    options = compiler.post_create_table(create.element)
+    if not create.keep_rowid or not options:
+        return statement
+    # The table options end the statement, after the column list
+    return statement[:-len(options)] + ("\n STRICT" if strict(create.element) else "")
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from refiner.models.refined import Base, ZomatoAccount, ZomatoOrder
 from refiner.transformer.base_transformer import DataTransformer
@@ -32,7 +32,9 @@ class ZomatoTransformer(DataTransformer):
             # Process each contribution sequentially
             for contribution in input_data.contributions:
                 if contribution.type == "ZOMATO":
-                    models.extend(self._process_zomato_contribution(contribution))
+                    models.extend(self._process_zomato_contribution(
+                        contribution, (input_data.walletAddress, input_data.claimDate)
+                    ))
         else:
             # Old data structure for backward compatibility
             zomato_data = ZomatoData.model_validate(data)
@@ -40,20 +42,23 @@ class ZomatoTransformer(DataTransformer):
         
         return models
     
-    def _process_zomato_contribution(self, contribution_data) -> List[Base]:
+    def _process_zomato_contribution(self, contribution_data, claim: Optional[Tuple[str, str]] = None) -> List[Base]:
         """
         Process a single Zomato contribution sequentially.
         
         Args:
             contribution_data: Zomato contribution data
+            claim: (walletAddress, claimDate) of the claim the contribution belongs to, if any
             
         Returns:
             List of SQLAlchemy model instances for this contribution
         """
-        models = []
+        models = self.contribution_rows(contribution_data, claim)
+        contribution_id = models[-1].contribution_id
         
         # Create Zomato account instance (without redundant date/wallet fields)
         account = ZomatoAccount(
+            contribution_id=contribution_id,
             data_type=contribution_data.type,
             witnesses=contribution_data.witnesses,
             account_username=contribution_data.AccountUsername,
@@ -90,10 +95,12 @@ class ZomatoTransformer(DataTransformer):
         Returns:
             List of SQLAlchemy model instances
         """
-        models = []
+        models = self.contribution_rows(zomato_data)
+        contribution_id = models[-1].contribution_id
         
         # Create Zomato account instance (without redundant date/wallet fields)
         account = ZomatoAccount(
+            contribution_id=contribution_id,
             data_type=zomato_data.type,
             witnesses=zomato_data.witnesses,
             account_username=zomato_data.AccountUsername,
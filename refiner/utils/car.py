@@ -0,0 +1,203 @@
+import base64
+import hashlib
+from typing import BinaryIO, Iterator, List, Tuple, Union
+
+# Multicodecs and layout parameters (the same defaults as `ipfs add --raw-leaves --cid-version=1`)
+CODEC_RAW = 0x55
+CODEC_DAG_PB = 0x70
+MULTIHASH_SHA2_256 = 0x12
+CHUNK_SIZE = 262144
+MAX_LINKS = 174
+
+UNIXFS_FILE = 2
+
+# CBOR major types used in the CAR header
+CBOR_BYTES = 2
+CBOR_ARRAY = 4
+
+Source = Union[str, bytes]
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def read_varint(stream: BinaryIO) -> int:
+    """Read an unsigned varint from a stream, or -1 at the end of the stream."""
+    value, shift = 0, 0
+    while True:
+        byte = stream.read(1)
+        if not byte:
+            return -1
+        value |= (byte[0] & 0x7f) << shift
+        if not byte[0] & 0x80:
+            return value
+        shift += 7
+
+
+def _cbor_head(major: int, length: int) -> bytes:
+    """CBOR initial byte(s) of an item of the given major type and length (or value)."""
+    if length < 24:
+        return bytes([major << 5 | length])
+    for info, size in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if length < 1 << (8 * size):
+            return bytes([major << 5 | info]) + length.to_bytes(size, 'big')
+    raise ValueError(f"CBOR length {length} is too large")
+
+
+def _read_cbor_head(data: bytes, position: int) -> Tuple[int, int]:
+    """Length (or value) of the CBOR item at position, and the position after its head."""
+    info = data[position] & 0x1f
+    if info < 24:
+        return info, position + 1
+    size = 1 << (info - 24)
+    return int.from_bytes(data[position + 1:position + 1 + size], 'big'), position + 1 + size
+
+
+def make_cid(codec: int, block: bytes) -> bytes:
+    """Binary CIDv1 of a block, hashed with SHA2-256."""
+    digest = hashlib.sha256(block).digest()
+    return _varint(1) + _varint(codec) + _varint(MULTIHASH_SHA2_256) + _varint(len(digest)) + digest
+
+
+def cid_to_str(cid: bytes) -> str:
+    """Base32 multibase string of a binary CID, as printed by IPFS tooling."""
+    return "b" + base64.b32encode(cid).decode().lower().rstrip("=")
+
+
+def _field(number: int, value: Union[int, bytes]) -> bytes:
+    """Protobuf field: varint for ints, length-delimited for bytes."""
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def _file_node(links: List[Tuple[bytes, int, int]]) -> bytes:
+    """dag-pb node of a UnixFS file whose children are given as (cid, cumulative size, file size)."""
+    unixfs = _field(1, UNIXFS_FILE) + _field(3, sum(size for _, _, size in links))
+    for _, _, size in links:
+        unixfs += _field(4, size)
+    # dag-pb puts the links before the data
+    node = b""
+    for cid, tsize, _ in links:
+        node += _field(2, _field(1, cid) + _field(2, b"") + _field(3, tsize))
+    return node + _field(1, unixfs)
+
+
+def _chunks(source: Source) -> Iterator[bytes]:
+    if isinstance(source, bytes):
+        for start in range(0, max(len(source), 1), CHUNK_SIZE):
+            yield source[start:start + CHUNK_SIZE]
+        return
+    with open(source, 'rb') as f:
+        chunk = f.read(CHUNK_SIZE)
+        yield chunk
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def file_dag(source: Source) -> Tuple[bytes, List[Tuple[bytes, bytes]]]:
+    """
+    Lay out a file (path or bytes) as a balanced UnixFS DAG with raw leaves.
+
+    Leaves are only hashed here; their data is read again when the CAR is written, so the file
+    is never held in memory.
+
+    Returns:
+        Root CID and the (cid, block) pairs of the intermediate nodes, root last
+    """
+    level = []
+    for chunk in _chunks(source):
+        level.append((make_cid(CODEC_RAW, chunk), len(chunk), len(chunk)))
+
+    nodes = []
+    while len(level) > 1:
+        parents = []
+        for start in range(0, len(level), MAX_LINKS):
+            links = level[start:start + MAX_LINKS]
+            block = _file_node(links)
+            cid = make_cid(CODEC_DAG_PB, block)
+            nodes.append((cid, block))
+            parents.append((cid, len(block) + sum(tsize for _, tsize, _ in links), sum(size for _, _, size in links)))
+        level = parents
+    return level[0][0], nodes
+
+
+def _car_header(roots: List[bytes]) -> bytes:
+    """DAG-CBOR {"roots": [...], "version": 1}, with CIDs as tag 42 byte strings."""
+    header = b"\xa2" + b"\x65roots" + _cbor_head(CBOR_ARRAY, len(roots))
+    for cid in roots:
+        value = b"\x00" + cid
+        header += b"\xd8\x2a" + _cbor_head(CBOR_BYTES, len(value)) + value
+    header += b"\x67version\x01"
+    return _varint(len(header)) + header
+
+
+def write_car(output: BinaryIO, sources: List[Source]) -> List[str]:
+    """
+    Write the given files (paths or bytes) as the roots of a single CARv1 archive.
+
+    Returns:
+        The CID of every source, in order
+    """
+    dags = [file_dag(source) for source in sources]
+    output.write(_car_header([root for root, _ in dags]))
+
+    seen = set()
+
+    def write_block(cid: bytes, block: bytes) -> None:
+        if cid in seen:
+            return
+        seen.add(cid)
+        output.write(_varint(len(cid) + len(block)) + cid + block)
+
+    for source, (_, nodes) in zip(sources, dags):
+        for chunk in _chunks(source):
+            write_block(make_cid(CODEC_RAW, chunk), chunk)
+        for cid, block in nodes:
+            write_block(cid, block)
+
+    return [cid_to_str(root) for root, _ in dags]
+
+
+def read_car(stream: BinaryIO) -> Tuple[List[str], List[Tuple[bytes, bytes]]]:
+    """
+    Read a CARv1 archive written by write_car, checking every block against its CID.
+
+    Returns:
+        Root CIDs and the (cid, block) pairs
+    """
+    header = stream.read(read_varint(stream))
+    roots = []
+    count, position = _read_cbor_head(header, header.index(b"roots") + 5)
+    for _ in range(count):
+        # Tag 42, then a byte string holding a 0x00 prefix and the binary CID
+        length, position = _read_cbor_head(header, position + 2)
+        roots.append(cid_to_str(header[position + 1:position + length]))
+        position += length
+
+    blocks = []
+    while True:
+        length = read_varint(stream)
+        if length < 0:
+            break
+        entry = stream.read(length)
+        # CIDv1 prefix: version, codec, hash function, digest length
+        prefix = 4 if entry[1] < 0x80 else 5
+        digest_length = entry[prefix - 1]
+        cid, block = entry[:prefix + digest_length], entry[prefix + digest_length:]
+        if hashlib.sha256(block).digest() != cid[prefix:]:
+            raise ValueError(f"Block {cid_to_str(cid)} does not match its CID")
+        blocks.append((cid, block))
+    return roots, blocks
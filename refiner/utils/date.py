@@ -1,8 +1,32 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
 
 
 def parse_timestamp(timestamp):
     """Parse a timestamp to a datetime object."""
     if isinstance(timestamp, int):
         return datetime.fromtimestamp(timestamp / 1000.0)
-    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
\ No newline at end of file
+    return datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+
+@lru_cache(maxsize=65536)
+def parse_epoch(timestamp: str) -> Optional[int]:
+    """
+    Parse an ISO 8601 timestamp to integer epoch seconds.
+    Timestamps without an offset are taken as UTC. Results are cached, as the same
+    timestamps tend to repeat within a contribution.
+    
+    Args:
+        timestamp: ISO 8601 timestamp, e.g. "2025-07-15T08:15:00Z"
+        
+    Returns:
+        Epoch seconds, or None if the timestamp cannot be parsed
+    """
+    try:
+        parsed = datetime.fromisoformat(timestamp.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
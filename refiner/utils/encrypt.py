@@ -1,35 +1,323 @@
-import pgpy
-from pgpy.constants import CompressionAlgorithm, HashAlgorithm
+import base64
+import hashlib
 import os
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import pgpy
+from cryptography.hazmat.primitives.ciphers import Cipher, modes
+from pgpy.constants import CompressionAlgorithm, HashAlgorithm, SymmetricKeyAlgorithm
+from pgpy.packet.packets import IntegrityProtectedSKEDataV1, SKESessionKeyV4
 from refiner.config import settings
 
+# Bytes read, and at most decompressed, per step when decrypting a file as a stream
+DECRYPT_CHUNK_BYTES = 1024 * 1024
+ARMOR_BEGIN = b"-----BEGIN PGP MESSAGE-----"
+# OpenPGP packet tags (RFC 4880, section 4.3)
+SKESK_TAG, COMPRESSED_TAG, LITERAL_TAG, SEIPD_TAG = 3, 8, 11, 18
+# Modification detection code packet closing integrity protected data: 0xd3 0x14 and a SHA-1 digest
+MDC_HEADER = b"\xd3\x14"
+MDC_LENGTH = len(MDC_HEADER) + 20
+
+
+class _Stream:
+    """Exact-size reads over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = iter(chunks)
+        self.buffer = b""
+
+    def _fill(self) -> None:
+        while not self.buffer:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                raise ValueError("Truncated OpenPGP message")
+            self.buffer = chunk
+
+    def read(self, size: int) -> bytes:
+        """The next size bytes."""
+        data = b""
+        for chunk in self.body(size):
+            data += chunk
+        return data
+
+    def body(self, length: int) -> Iterator[bytes]:
+        """The next length bytes, in chunks."""
+        while length > 0:
+            self._fill()
+            data, self.buffer = self.buffer[:length], self.buffer[length:]
+            length -= len(data)
+            yield data
+
+    def rest(self) -> Iterator[bytes]:
+        """Everything left, in chunks."""
+        if self.buffer:
+            yield self.buffer
+            self.buffer = b""
+        yield from self.chunks
+
+
+def _dearmor(file_path: str, chunk_size: int) -> Iterator[bytes]:
+    """The binary OpenPGP data of a file, decoding its ASCII armor (if any) on the fly."""
+    with open(file_path, 'rb') as f:
+        start = f.read(len(ARMOR_BEGIN))
+        if start != ARMOR_BEGIN:
+            yield start
+            yield from iter(lambda: f.read(chunk_size), b"")
+            return
+
+        f.readline()
+        # Armor headers end with an empty line
+        for line in f:
+            if not line.strip():
+                break
+        encoded = b""
+        for line in f:
+            line = line.strip()
+            # The body ends with the checksum line ("=XXXX") or the END line
+            if line.startswith(b"=") or line.startswith(b"-----"):
+                break
+            encoded += line
+            if len(encoded) >= chunk_size:
+                # Decode whole 4-character groups only
+                cut = len(encoded) - len(encoded) % 4
+                yield base64.b64decode(encoded[:cut])
+                encoded = encoded[cut:]
+        if encoded:
+            yield base64.b64decode(encoded)
+
+
+def _packet_header(stream: _Stream) -> Tuple[int, Optional[int]]:
+    """Tag and body length of the next packet; the length is None for an old-format packet running to the end."""
+    first = stream.read(1)[0]
+    if not first & 0x80:
+        raise ValueError("Invalid OpenPGP packet header")
+    if first & 0x40:
+        tag = first & 0x3f
+        octet = stream.read(1)[0]
+        if octet < 192:
+            return tag, octet
+        if octet < 224:
+            return tag, ((octet - 192) << 8) + stream.read(1)[0] + 192
+        if octet == 255:
+            return tag, int.from_bytes(stream.read(4), 'big')
+        raise ValueError("OpenPGP partial body lengths are not supported")
+    tag, length_type = (first >> 2) & 0x0f, first & 0x03
+    if length_type == 3:
+        return tag, None
+    return tag, int.from_bytes(stream.read(1 << length_type), 'big')
+
+
+def _decompress(chunks: Iterator[bytes], algorithm: int, chunk_size: int) -> Iterator[bytes]:
+    """Decompress the data of a compressed data packet, at most chunk_size bytes at a time."""
+    if algorithm == CompressionAlgorithm.Uncompressed:
+        yield from chunks
+        return
+    if algorithm == CompressionAlgorithm.ZIP:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    elif algorithm == CompressionAlgorithm.ZLIB:
+        decompressor = zlib.decompressobj()
+    else:
+        raise ValueError(f"Unsupported OpenPGP compression algorithm {algorithm}")
+    try:
+        for chunk in chunks:
+            while chunk:
+                data = decompressor.decompress(chunk, chunk_size)
+                chunk = decompressor.unconsumed_tail
+                if data:
+                    yield data
+        data = decompressor.flush()
+    except zlib.error as e:
+        raise ValueError(f"Corrupt OpenPGP compressed data: {e}") from e
+    if data:
+        yield data
+
+
+class EncryptionContext:
+    """
+    Symmetric encryption with a key derived once per job.
+
+    The iterated and salted S2K derivation from the passphrase is deliberately expensive, so it
+    runs once when the context is created. Every artifact is then written as a standard OpenPGP
+    message: a symmetric-key session key packet carrying the same S2K parameters without an
+    encrypted session key (the derived key is the session key), followed by integrity protected
+    data with its own random prefix. decrypt_file and any OpenPGP tool open these with the passphrase.
+    The context pickles with its derived key, so worker processes never repeat the derivation.
+    The SHA-256 digest of every encrypted file's plaintext is kept for round-trip verification.
+    """
+
+    def __init__(self, passphrase: str, cipher: SymmetricKeyAlgorithm = SymmetricKeyAlgorithm.AES256,
+                 hash: HashAlgorithm = HashAlgorithm.SHA512):
+        self.passphrase = passphrase
+        self.cipher = cipher
+        self.hash = hash
+        self.salt = os.urandom(8)
+        self.count = hash.tuned_count
+        self.artifacts = 0
+        self.digests: Dict[str, str] = {}
+
+        start = time.perf_counter()
+        self.key = self._session_key_packet().s2k.derive_key(passphrase)
+        self.derive_seconds = time.perf_counter() - start
+
+    def _session_key_packet(self) -> SKESessionKeyV4:
+        skesk = SKESessionKeyV4()
+        skesk.s2k.usage = 255
+        skesk.s2k.specifier = 3
+        skesk.s2k.halg = self.hash
+        skesk.s2k.encalg = self.cipher
+        skesk.s2k.count = self.count
+        skesk.s2k.salt = bytearray(self.salt)
+        skesk.update_hlen()
+        return skesk
+
+    def encrypt_bytes(self, data: bytes, compression: CompressionAlgorithm = CompressionAlgorithm.ZLIB) -> bytes:
+        """Encrypt a buffer into an ASCII armored OpenPGP message."""
+        literal = pgpy.PGPMessage.new(data, compression=compression)
+        skedata = IntegrityProtectedSKEDataV1()
+        skedata.encrypt(self.key, self.cipher, literal.__bytes__())
+        message = pgpy.PGPMessage() | self._session_key_packet()
+        message |= skedata
+        self.artifacts += 1
+        return str(message).encode()
+
+    def encrypt_file(self, file_path: str, output_path: str = None,
+                     compression: CompressionAlgorithm = CompressionAlgorithm.ZLIB) -> str:
+        """Encrypt a file, see encrypt_file."""
+        if output_path is None:
+            output_path = f"{file_path}.pgp"
+
+        with open(file_path, 'rb') as f:
+            buffer = f.read()
+
+        with open(output_path, 'wb') as f:
+            f.write(self.encrypt_bytes(buffer, compression))
+        self.digests[output_path] = hashlib.sha256(buffer).hexdigest()
 
-def encrypt_file(encryption_key: str, file_path: str, output_path: str = None) -> str:
+        return output_path
+
+    def adopt(self, file_path: str, output_path: str) -> bool:
+        """
+        Take over an artifact encrypted earlier (e.g. by an interrupted job) instead of encrypting
+        the file again, if it decrypts to the file's current contents.
+
+        Returns:
+            Whether the artifact was adopted; its plaintext digest is then recorded as for encrypt_file
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DECRYPT_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        plaintext = hashlib.sha256()
+        try:
+            for chunk in self.decrypt_chunks(output_path):
+                plaintext.update(chunk)
+        except (OSError, ValueError):
+            return False
+        digest = digest.hexdigest()
+        if plaintext.hexdigest() != digest:
+            return False
+        self.digests[output_path] = digest
+        return True
+
+    def _decrypt_chunks(self, chunks: Iterator[bytes], length: int) -> Iterator[bytes]:
+        """Decrypt the length bytes of integrity protected data, checking its MDC once the last chunk is read."""
+        block_size = self.cipher.block_size // 8
+        decryptor = Cipher(self.cipher.cipher(self.key), modes.CFB(b"\x00" * block_size)).decryptor()
+        decrypted = _Stream(decryptor.update(chunk) for chunk in chunks)
+        # The random prefix repeats its last two bytes, which tells a wrong key apart early
+        prefix = decrypted.read(block_size + 2)
+        if prefix[block_size - 2:block_size] != prefix[block_size:]:
+            raise ValueError("OpenPGP message was not encrypted with this key")
+        mdc = hashlib.sha1(prefix)
+        for data in decrypted.body(length - len(prefix) - MDC_LENGTH):
+            mdc.update(data)
+            yield data
+        trailer = decrypted.read(MDC_LENGTH)
+        mdc.update(MDC_HEADER)
+        if trailer != MDC_HEADER + mdc.digest():
+            raise ValueError("OpenPGP modification detection code mismatch")
+
+    def decrypt_chunks(self, encrypted_path: str, chunk_size: int = DECRYPT_CHUNK_BYTES) -> Iterator[bytes]:
+        """
+        Decrypt a file encrypted by this context, yielding its plaintext in chunks.
+
+        The message is never held in memory: the armor, the encrypted data and the compressed data
+        are decoded as a stream. The integrity check
+        runs when the last chunk has been read, so the plaintext is only verified once the
+        iterator is exhausted.
+
+        Raises:
+            ValueError: If the file is not a message of this context or fails its integrity check
+        """
+        stream = _Stream(_dearmor(encrypted_path, chunk_size))
+        tag, length = _packet_header(stream)
+        # The session key packet of this context: S2K parameters and no encrypted session key
+        own = bytes([4, self.cipher, 3, self.hash]) + self.salt + bytes([self.count])
+        if tag != SKESK_TAG or length is None or stream.read(length) != own:
+            raise ValueError(f"{encrypted_path} was not encrypted by this context")
+        tag, length = _packet_header(stream)
+        if tag != SEIPD_TAG or length is None or stream.read(1) != b"\x01":
+            raise ValueError(f"{encrypted_path} has no integrity protected data")
+
+        packets = _Stream(self._decrypt_chunks(stream.body(length - 1), length - 1))
+        inner = packets
+        tag, length = _packet_header(inner)
+        if tag == COMPRESSED_TAG:
+            algorithm = inner.read(1)[0]
+            data = inner.body(length - 1) if length is not None else inner.rest()
+            inner = _Stream(_decompress(data, algorithm, chunk_size))
+            tag, length = _packet_header(inner)
+        if tag != LITERAL_TAG or length is None:
+            raise ValueError(f"{encrypted_path} has no literal data")
+        # Format, file name and date precede the contents
+        name_length = inner.read(2)[1]
+        inner.read(name_length + 4)
+        yield from inner.body(length - 6 - name_length)
+        # Reading past the packets runs the integrity check
+        if any(inner.rest()) or any(packets.rest()):
+            raise ValueError(f"{encrypted_path} has unexpected data after its literal data")
+
+    def stats(self) -> Dict[str, Any]:
+        """Cost of the key derivation and number of artifacts encrypted with it."""
+        return {
+            "derive_seconds": round(self.derive_seconds, 6),
+            "artifacts": self.artifacts,
+        }
+
+
+def encrypt_file(encryption_key: str, file_path: str, output_path: str = None,
+                 compression: CompressionAlgorithm = CompressionAlgorithm.ZLIB) -> str:
     """Symmetrically encrypts a file with an encryption key.
 
+    Derives the key for this file only; use an EncryptionContext to encrypt several artifacts.
+
     Args:
         encryption_key: The passphrase to encrypt with
         file_path: Path to the file to encrypt
         output_path: Optional path to save encrypted file (defaults to file_path + .pgp)
+        compression: Compression algorithm applied before encryption
 
     Returns:
         Path to encrypted file
     """
-    if output_path is None:
-        output_path = f"{file_path}.pgp"
-    
-    with open(file_path, 'rb') as f:
-        buffer = f.read()
-    
-    message = pgpy.PGPMessage.new(buffer, compression=CompressionAlgorithm.ZLIB)
-    encrypted_message = message.encrypt(
-        passphrase=encryption_key, hash=HashAlgorithm.SHA512
-    )
-    
-    with open(output_path, 'wb') as f:
-        f.write(str(encrypted_message).encode())
-    
-    return output_path
+    return EncryptionContext(encryption_key).encrypt_file(file_path, output_path, compression)
+
+
+def decrypt_bytes(encryption_key: str, encrypted_data: bytes) -> bytes:
+    """Symmetrically decrypts a message held in memory with an encryption key.
+
+    Args:
+        encryption_key: The passphrase to decrypt with
+        encrypted_data: The encrypted message
+
+    Returns:
+        Decrypted contents
+    """
+    message = pgpy.PGPMessage.from_blob(encrypted_data)
+    content = message.decrypt(encryption_key).message
+    return content.encode() if isinstance(content, str) else bytes(content)
 
 
 def decrypt_file(encryption_key: str, file_path: str, output_path: str = None) -> str:
@@ -52,11 +340,8 @@ def decrypt_file(encryption_key: str, file_path: str, output_path: str = None) -
     with open(file_path, 'rb') as f:
         encrypted_data = f.read()
     
-    message = pgpy.PGPMessage.from_blob(encrypted_data)
-    decrypted_message = message.decrypt(encryption_key)
-    
     with open(output_path, 'wb') as f:
-        f.write(decrypted_message.message)
+        f.write(decrypt_bytes(encryption_key, encrypted_data))
     
     return output_path
 
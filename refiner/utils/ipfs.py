@@ -1,46 +1,41 @@
-import json
-import logging
 import os
-import requests
+from contextlib import nullcontext
+from typing import Any, List, Tuple
 from refiner.config import settings
+from refiner.utils.pinning import get_backend
+from refiner.utils.resumable import get_uploader
 
-PINATA_FILE_API_ENDPOINT = "https://api.pinata.cloud/pinning/pinFileToIPFS"
-PINATA_JSON_API_ENDPOINT = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
+# Shared across processes by the batch runner to bound concurrent uploads over all jobs
+_upload_slots = None
 
-def upload_json_to_ipfs(data):
+def limit_uploads(slots) -> None:
     """
-    Uploads JSON data to IPFS using Pinata API.
-    :param data: JSON data to upload (dictionary or list)
-    :return: IPFS hash
+    Bound concurrent uploads with a semaphore (e.g. a multiprocessing.Semaphore shared by worker processes).
+    :param slots: Semaphore acquired around every upload, or None for no limit
     """
-    if not settings.PINATA_API_KEY or not settings.PINATA_API_SECRET:
-        raise Exception("Error: Pinata IPFS API credentials not found, please check your environment variables")
-
-    headers = {
-        "Content-Type": "application/json",
-        "pinata_api_key": settings.PINATA_API_KEY,
-        "pinata_secret_api_key": settings.PINATA_API_SECRET
-    }
+    global _upload_slots
+    _upload_slots = slots
 
-    try:
-        response = requests.post(
-            PINATA_JSON_API_ENDPOINT,
-            data=json.dumps(data),
-            headers=headers
-        )
-        response.raise_for_status()
+def _upload_slot():
+    return _upload_slots if _upload_slots is not None else nullcontext()
 
-        result = response.json()
-        logging.info(f"Successfully uploaded JSON to IPFS with hash: {result['IpfsHash']}")
-        return result['IpfsHash']
+def _resumable(file_path: str) -> bool:
+    """Whether a file goes through the resumable upload (RESUMABLE_UPLOAD_URL) instead of the pinning backend."""
+    return bool(settings.RESUMABLE_UPLOAD_URL) and os.path.getsize(file_path) >= settings.RESUMABLE_UPLOAD_THRESHOLD
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"An error occurred while uploading JSON to IPFS: {e}")
-        raise e
+def upload_json_to_ipfs(data):
+    """
+    Uploads JSON data to IPFS using the configured pinning backend (PINNING_BACKEND).
+    :param data: JSON data to upload (dictionary or list)
+    :return: IPFS hash
+    """
+    with _upload_slot():
+        return get_backend().upload_json(data)
 
 def upload_file_to_ipfs(file_path=None):
     """
-    Uploads a file to IPFS using Pinata API (https://pinata.cloud/)
+    Uploads a file to IPFS using the configured pinning backend (PINNING_BACKEND), or in resumable
+    chunks to RESUMABLE_UPLOAD_URL when it is at least RESUMABLE_UPLOAD_THRESHOLD bytes.
     :param file_path: Path to the file to upload (defaults to encrypted database)
     :return: IPFS hash
     """
@@ -50,34 +45,29 @@ def upload_file_to_ipfs(file_path=None):
     
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
-        
-    if not settings.PINATA_API_KEY or not settings.PINATA_API_SECRET:
-        raise Exception("Error: Pinata IPFS API credentials not found, please check your environment variables")
 
-    headers = {
-        "pinata_api_key": settings.PINATA_API_KEY,
-        "pinata_secret_api_key": settings.PINATA_API_SECRET
-    }
+    with _upload_slot():
+        if _resumable(file_path):
+            return get_uploader().upload(file_path)
+        return get_backend().upload_file(file_path)
+
+def upload_artifacts_to_ipfs(data: Any, file_paths: List[str]) -> Tuple[str, List[str]]:
+    """
+    Uploads JSON data (the schema) together with files, in a single import when the backend supports it.
+    :param data: JSON data to upload
+    :param file_paths: Paths of the files to upload
+    :return: IPFS hash of the JSON data and of every file
+    """
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
 
-    try:
-        with open(file_path, 'rb') as file:
-            files = {
-                'file': file
-            }
-            response = requests.post(
-                PINATA_FILE_API_ENDPOINT,
-                files=files,
-                headers=headers
-            )
-        
-        response.raise_for_status()
-        result = response.json()
-        logging.info(f"Successfully uploaded file to IPFS with hash: {result['IpfsHash']}")
-        return result['IpfsHash']
+    if any(_resumable(file_path) for file_path in file_paths):
+        # Large files are uploaded on their own, in resumable chunks
+        return upload_json_to_ipfs(data), [upload_file_to_ipfs(file_path) for file_path in file_paths]
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"An error occurred while uploading file to IPFS: {e}")
-        raise e
+    with _upload_slot():
+        return get_backend().upload_artifacts(data, file_paths)
 
 # Test with: python -m refiner.utils.ipfs
 if __name__ == "__main__":
@@ -85,6 +75,6 @@ if __name__ == "__main__":
     print(f"File uploaded to IPFS with hash: {ipfs_hash}")
     print(f"Access at: {settings.IPFS_GATEWAY_URL}/{ipfs_hash}")
 
-    ipfs_hash = upload_json_to_ipfs()
+    ipfs_hash = upload_json_to_ipfs({"name": "test"})
     print(f"JSON uploaded to IPFS with hash: {ipfs_hash}")
-    print(f"Access at: {settings.IPFS_GATEWAY_URL}/{ipfs_hash}")
\ No newline at end of file
+    print(f"Access at: {settings.IPFS_GATEWAY_URL}/{ipfs_hash}")
@@ -0,0 +1,82 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+from typing import Optional, Tuple
+
+MONEY_PATTERN = re.compile(
+    r'^\s*(?P<prefix>[A-Za-z]{3}|[^\d\s.,+-]+)?\s*(?P<amount>[+-]?[\d,]*\.?\d+)\s*(?P<suffix>[A-Za-z]{3}|[^\d\s.,]+)?\s*$'
+)
+COUNT_PATTERN = re.compile(r'^\s*(?P<number>[\d,]*\.?\d+)\s*(?P<suffix>[KkMmBb])?\+?\s*$')
+
+CURRENCY_SYMBOLS = {
+    '$': 'USD',
+    '€': 'EUR',
+    '£': 'GBP',
+    '₹': 'INR',
+    '¥': 'JPY',
+    'Rs': 'INR',
+}
+
+# Currencies whose minor unit is not 1/100 of the major unit
+CURRENCY_EXPONENTS = {
+    'JPY': 0,
+    'KRW': 0,
+    'VND': 0,
+    'BHD': 3,
+    'KWD': 3,
+}
+
+COUNT_SUFFIXES = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}
+
+
+@lru_cache(maxsize=65536)
+def parse_money(value: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Parse a money string into an integer amount of minor units and a currency code.
+    
+    Args:
+        value: Money string, e.g. "23.75 USD", "$23.75", "₹250" or "25.99"
+        
+    Returns:
+        Tuple of (amount in minor units, ISO currency code or None), or (None, None) if unparseable
+    """
+    match = MONEY_PATTERN.match(value) if isinstance(value, str) else None
+    if not match:
+        return None, None
+
+    currency = match.group('prefix') or match.group('suffix')
+    if currency:
+        currency = CURRENCY_SYMBOLS.get(currency, currency.upper())
+
+    try:
+        amount = Decimal(match.group('amount').replace(',', ''))
+    except InvalidOperation:
+        return None, None
+
+    exponent = CURRENCY_EXPONENTS.get(currency, 2)
+    minor = int((amount * (10 ** exponent)).to_integral_value(rounding=ROUND_HALF_UP))
+    return minor, currency
+
+
+@lru_cache(maxsize=65536)
+def parse_count(value: str) -> Optional[int]:
+    """
+    Parse a human-formatted count into an integer.
+    
+    Args:
+        value: Count string, e.g. "1234", "1,234", "1.2K" or "3M"
+        
+    Returns:
+        The count, or None if unparseable
+    """
+    if isinstance(value, int):
+        return value
+    match = COUNT_PATTERN.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+
+    number = Decimal(match.group('number').replace(',', ''))
+    suffix = match.group('suffix')
+    if suffix:
+        number *= COUNT_SUFFIXES[suffix.upper()]
+    return int(number)
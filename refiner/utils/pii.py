@@ -1,4 +1,14 @@
 import hashlib
+import hmac
+import re
+from urllib.parse import urlsplit
+
+EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+URL_PATTERN = re.compile(r'\b(?:https?://|www\.)[^\s<>"\']+', re.IGNORECASE)
+PHONE_PATTERN = re.compile(r'(?<!\w)\+?\d[\d\s().-]{7,}\d(?!\w)')
+
+MASK_CHAR = '*'
+
 
 def mask_email(email: str) -> str:
     """
@@ -16,4 +26,65 @@ def mask_email(email: str) -> str:
     local_part, domain = email.split('@', 1)
     hashed_local = hashlib.md5(local_part.encode()).hexdigest()
     
-    return f"{hashed_local}@{domain}" 
\ No newline at end of file
+    return f"{hashed_local}@{domain}"
+
+
+def pseudonymize(value: str, key: bytes) -> str:
+    """
+    Replace a value with a keyed HMAC-SHA256 pseudonym.
+    The same value and key always give the same pseudonym, so joins and counts still work.
+    
+    Args:
+        value: The value to pseudonymize
+        key: Secret HMAC key
+        
+    Returns:
+        32 hex characters identifying the value
+    """
+    return hmac.new(key, value.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def mask_value(value: str) -> str:
+    """
+    Mask a value while keeping its shape.
+    Emails keep their domain, URLs keep their host and first path segment,
+    anything else keeps its first and last character.
+    
+    Args:
+        value: The value to mask
+        
+    Returns:
+        Masked value
+    """
+    if not value:
+        return value
+
+    if EMAIL_PATTERN.fullmatch(value):
+        return mask_email(value)
+
+    if URL_PATTERN.match(value):
+        parts = urlsplit(value if '://' in value else f"https://{value}")
+        segments = [segment for segment in parts.path.split('/') if segment]
+        path = '/'.join(segments[:1] + [MASK_CHAR * 3 for _ in segments[1:]])
+        return f"{parts.scheme}://{parts.netloc}/{path}" if path else f"{parts.scheme}://{parts.netloc}"
+
+    if len(value) <= 2:
+        return MASK_CHAR * len(value)
+    return value[0] + MASK_CHAR * (len(value) - 2) + value[-1]
+
+
+def scrub_text(text: str) -> str:
+    """
+    Replace emails, URLs and phone numbers inside free text with placeholders.
+    
+    Args:
+        text: Free text such as a bio
+        
+    Returns:
+        Text with [email], [url] and [phone] placeholders
+    """
+    if not text:
+        return text
+    text = EMAIL_PATTERN.sub('[email]', text)
+    text = URL_PATTERN.sub('[url]', text)
+    return PHONE_PATTERN.sub('[phone]', text)
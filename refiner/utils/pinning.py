@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Any, List, Tuple
+
+import requests
+
+from refiner.config import settings
+from refiner.utils.car import Source, write_car
+
+PINATA_FILE_API_ENDPOINT = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+PINATA_JSON_API_ENDPOINT = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
+
+
+class PinningBackend:
+    """
+    Where refinement artifacts are uploaded and pinned.
+    Backends implement upload_json and upload_file; those that can pin several artifacts in a
+    single request also override upload_artifacts.
+    """
+
+    name = None
+
+    def upload_json(self, data: Any) -> str:
+        """Upload and pin JSON data, returning its IPFS hash."""
+        raise NotImplementedError("Backends must implement upload_json")
+
+    def upload_file(self, file_path: str) -> str:
+        """Upload and pin a file, returning its IPFS hash."""
+        raise NotImplementedError("Backends must implement upload_file")
+
+    def upload_artifacts(self, data: Any, file_paths: List[str]) -> Tuple[str, List[str]]:
+        """
+        Upload and pin the JSON data (the schema) together with the given files.
+
+        Returns:
+            IPFS hash of the JSON data and of every file, in order
+        """
+        return self.upload_json(data), [self.upload_file(file_path) for file_path in file_paths]
+
+
+class PinataBackend(PinningBackend):
+    """Pinata cloud pinning service (https://pinata.cloud/)."""
+
+    name = "pinata"
+
+    def _headers(self) -> dict:
+        if not settings.PINATA_API_KEY or not settings.PINATA_API_SECRET:
+            raise Exception("Error: Pinata IPFS API credentials not found, please check your environment variables")
+        return {
+            "pinata_api_key": settings.PINATA_API_KEY,
+            "pinata_secret_api_key": settings.PINATA_API_SECRET
+        }
+
+    def upload_json(self, data: Any) -> str:
+        headers = {"Content-Type": "application/json", **self._headers()}
+
+        try:
+            response = requests.post(
+                PINATA_JSON_API_ENDPOINT,
+                data=json.dumps(data),
+                headers=headers
+            )
+            response.raise_for_status()
+
+            result = response.json()
+            logging.info(f"Successfully uploaded JSON to IPFS with hash: {result['IpfsHash']}")
+            return result['IpfsHash']
+
+        except requests.exceptions.RequestException as e:
+            logging.error(f"An error occurred while uploading JSON to IPFS: {e}")
+            raise e
+
+    def upload_file(self, file_path: str) -> str:
+        headers = self._headers()
+
+        try:
+            with open(file_path, 'rb') as file:
+                files = {
+                    'file': file
+                }
+                response = requests.post(
+                    PINATA_FILE_API_ENDPOINT,
+                    files=files,
+                    headers=headers
+                )
+
+            response.raise_for_status()
+            result = response.json()
+            logging.info(f"Successfully uploaded file to IPFS with hash: {result['IpfsHash']}")
+            return result['IpfsHash']
+
+        except requests.exceptions.RequestException as e:
+            logging.error(f"An error occurred while uploading file to IPFS: {e}")
+            raise e
+
+
+class KuboBackend(PinningBackend):
+    """
+    Local IPFS node, through the Kubo HTTP RPC API.
+
+    Artifacts are laid out as UnixFS files (raw leaves, CIDv1) and written into a single CAR
+    archive with locally computed CIDs, which the node imports and pins in one dag/import request.
+    The CIDs returned by the node are checked against the local ones.
+    """
+
+    name = "kubo"
+
+    def __init__(self, api_url: str = None, work_dir: str = None):
+        self.api_url = (api_url or settings.KUBO_API_URL).rstrip("/")
+        self.work_dir = work_dir or settings.OUTPUT_DIR
+
+    def _import(self, sources: List[Source]) -> List[str]:
+        # Uploads run concurrently (shards, columnar files), so every import gets its own archive
+        with tempfile.NamedTemporaryFile(dir=self.work_dir, prefix="artifacts-", suffix=".car", delete=False) as car:
+            car_path = car.name
+            cids = write_car(car, sources)
+
+        try:
+            with open(car_path, 'rb') as car:
+                response = requests.post(
+                    f"{self.api_url}/api/v0/dag/import",
+                    params={"pin-roots": "true"},
+                    files={"file": car}
+                )
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logging.error(f"An error occurred while importing into the IPFS node: {e}")
+            raise e
+        finally:
+            os.remove(car_path)
+
+        # One JSON object per line, one line per pinned root
+        pinned = set()
+        for line in response.text.splitlines():
+            root = json.loads(line).get("Root") if line.strip() else None
+            if root:
+                if root.get("PinErrorMsg"):
+                    raise Exception(f"Error: IPFS node failed to pin {root['Cid']['/']}: {root['PinErrorMsg']}")
+                pinned.add(root["Cid"]["/"])
+        missing = [cid for cid in cids if cid not in pinned]
+        if missing:
+            raise Exception(f"Error: IPFS node did not pin {', '.join(missing)}")
+
+        logging.info(f"Imported {len(cids)} artifact(s) into the IPFS node: {', '.join(cids)}")
+        return cids
+
+    def upload_json(self, data: Any) -> str:
+        return self._import([json.dumps(data).encode()])[0]
+
+    def upload_file(self, file_path: str) -> str:
+        return self._import([file_path])[0]
+
+    def upload_artifacts(self, data: Any, file_paths: List[str]) -> Tuple[str, List[str]]:
+        cids = self._import([json.dumps(data).encode()] + list(file_paths))
+        return cids[0], cids[1:]
+
+
+BACKENDS = {backend.name: backend for backend in (PinataBackend, KuboBackend)}
+
+
+def get_backend(name: str = None) -> PinningBackend:
+    """Create the pinning backend selected by PINNING_BACKEND."""
+    name = name or settings.PINNING_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PINNING_BACKEND: {name}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
@@ -0,0 +1,25 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+
+def ordered_map(function: Callable, arguments: Iterable[tuple], workers: int) -> Iterator[Any]:
+    """
+    Run function(*args) for every argument tuple in a process pool, yielding the results in order.
+
+    At most two tasks per worker are in flight, so the arguments are consumed lazily and memory
+    stays bounded however many there are. With a single worker everything runs in this process.
+    """
+    if workers <= 1:
+        for args in arguments:
+            yield function(*args)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for args in arguments:
+            in_flight.append(pool.submit(function, *args))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,50 @@
+import hashlib
+import hmac
+import json
+import os
+from typing import Any, Dict, Optional
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_key(encryption_key: str, content_digest: str, variant: str = "") -> str:
+    """
+    Cache key of a refinement: an HMAC of the plaintext digest (and output variant, e.g. sharding)
+    under the encryption key, so an entry only matches artifacts encrypted with the same key and the
+    cache file reveals neither the key nor the content digest.
+    """
+    message = f"{content_digest}:{variant}".encode()
+    return hmac.new(encryption_key.encode(), message, hashlib.sha256).hexdigest()
+
+
+class RefinementCache:
+    """JSON file of previously pinned refinements, keyed by content_key."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """The recorded output of a previous refinement with the same key, if any."""
+        return self._load().get(key)
+
+    def store(self, key: str, entry: Dict[str, Any]) -> None:
+        """Record the output of a refinement, replacing the file atomically."""
+        entries = self._load()
+        entries[key] = entry
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,210 @@
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+import requests
+
+TUS_VERSION = "1.0.0"
+# Upload state is kept next to the uploaded file
+STATE_SUFFIX = ".upload.json"
+
+
+def state_path(file_path: str) -> str:
+    return f"{file_path}{STATE_SUFFIX}"
+
+
+def _fingerprint(file_path: str) -> Dict[str, int]:
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def pending_upload(file_path: str) -> bool:
+    """Whether an unfinished resumable upload of this exact file (same size and mtime) was recorded."""
+    try:
+        with open(state_path(file_path), 'r') as f:
+            return json.load(f).get("fingerprint") == _fingerprint(file_path)
+    except (OSError, ValueError):
+        return False
+
+
+class ResumableUploader:
+    """
+    Resumable uploads over the tus protocol (https://tus.io/protocols/resumable-upload, 1.0.0).
+
+    A file is split into up to `parts` byte ranges that are uploaded concurrently as partial
+    uploads, each in PATCH requests of chunk_size bytes, and joined by a final upload (the tus
+    concatenation extension). Servers without that extension get a single upload. The offset of
+    every part is saved to <file>.upload.json after each chunk: a failed request continues from the
+    offset the server reports, and a restarted job uploading the same file continues where the
+    previous one stopped. The server reports the CID of a completed upload in an Upload-Cid header.
+    """
+
+    def __init__(self, endpoint: str, chunk_size: int = 8 * 1024 * 1024, parts: int = 4, retries: int = 3,
+                 headers: Optional[Dict[str, str]] = None):
+        self.endpoint = endpoint
+        self.chunk_size = chunk_size
+        self.parts = max(1, parts)
+        self.retries = retries
+        self.headers = {"Tus-Resumable": TUS_VERSION, **(headers or {})}
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def _request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        response = requests.request(method, url, headers={**self.headers, **(headers or {})}, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def _concatenation(self) -> bool:
+        try:
+            response = self._request("OPTIONS", self.endpoint)
+        except requests.exceptions.RequestException:
+            return False
+        extensions = response.headers.get("Tus-Extension", "")
+        return "concatenation" in [extension.strip() for extension in extensions.split(",")]
+
+    def _create(self, length: int, metadata: Dict[str, str], partial: bool) -> str:
+        headers = {
+            "Upload-Length": str(length),
+            "Upload-Metadata": ",".join(
+                f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in metadata.items()
+            ),
+        }
+        if partial:
+            headers["Upload-Concat"] = "partial"
+        response = self._request("POST", self.endpoint, headers)
+        return urljoin(self.endpoint, response.headers["Location"])
+
+    def _save(self, file_path: str, state: Dict[str, Any]) -> None:
+        temporary = f"{state_path(file_path)}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(state, f)
+        os.replace(temporary, state_path(file_path))
+
+    def _load(self, file_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(state_path(file_path), 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("fingerprint") != _fingerprint(file_path) or state.get("endpoint") != self.endpoint:
+            return None
+        return state
+
+    def _resume_part(self, part: Dict[str, Any]) -> None:
+        """Take a part's offset from the server, or start the part again if the server lost it."""
+        try:
+            response = self._request("HEAD", part["url"])
+            part["offset"] = int(response.headers["Upload-Offset"])
+        except requests.exceptions.RequestException as e:
+            logging.warning(f"Upload {part['url']} cannot be resumed ({e}), uploading the part again")
+            part["url"] = None
+            part["offset"] = 0
+
+    def _upload_part(self, file_path: str, state: Dict[str, Any], part: Dict[str, Any]) -> Optional[str]:
+        """Send the rest of a part in chunks, returning the CID if the server reports one on completion."""
+        cid = None
+        failures = 0
+        with open(file_path, 'rb') as f:
+            while part["offset"] < part["length"]:
+                f.seek(part["start"] + part["offset"])
+                chunk = f.read(min(self.chunk_size, part["length"] - part["offset"]))
+                try:
+                    response = self._request("PATCH", part["url"], {
+                        "Upload-Offset": str(part["offset"]),
+                        "Content-Type": "application/offset+octet-stream",
+                    }, data=chunk)
+                except requests.exceptions.RequestException as e:
+                    failures += 1
+                    if failures > self.retries:
+                        raise
+                    delay = 2 ** (failures - 1)
+                    logging.warning(f"Chunk at {part['offset']} of {part['url']} failed ({e}), resuming in {delay}s")
+                    time.sleep(delay)
+                    self._resume_part(part)
+                    if part["url"] is None:
+                        raise
+                    continue
+                failures = 0
+                part["offset"] = int(response.headers["Upload-Offset"])
+                cid = response.headers.get("Upload-Cid") or cid
+                with self._lock:
+                    self.bytes_sent += len(chunk)
+                    self._save(file_path, state)
+        return cid
+
+    def upload(self, file_path: str) -> str:
+        """
+        Upload a file, continuing a recorded upload of the same file if there is one.
+
+        Returns:
+            CID of the uploaded file
+        """
+        size = os.path.getsize(file_path)
+        metadata = {"filename": os.path.basename(file_path)}
+        state = self._load(file_path)
+        if state is not None:
+            for part in state["parts"]:
+                if part["url"] and part["offset"] < part["length"]:
+                    self._resume_part(part)
+            done = sum(part["offset"] for part in state["parts"])
+            logging.info(f"Resuming upload of {file_path} at {done} of {size} bytes")
+        else:
+            count = self.parts if size > self.chunk_size and self._concatenation() else 1
+            part_size = -(-size // count) if size else 0
+            starts = range(0, size, part_size) if size else [0]
+            state = {
+                "endpoint": self.endpoint,
+                "fingerprint": _fingerprint(file_path),
+                "parts": [
+                    {"url": None, "start": start, "length": min(part_size, size - start), "offset": 0}
+                    for start in starts
+                ],
+            }
+
+        parts: List[Dict[str, Any]] = state["parts"]
+        partial = len(parts) > 1
+        for part in parts:
+            if part["url"] is None:
+                part["url"] = self._create(part["length"], metadata, partial)
+        self._save(file_path, state)
+
+        with ThreadPoolExecutor(max_workers=len(parts)) as pool:
+            cids = list(pool.map(lambda part: self._upload_part(file_path, state, part), parts))
+
+        if partial:
+            response = self._request("POST", self.endpoint, {
+                "Upload-Concat": "final;" + " ".join(part["url"] for part in parts),
+                "Upload-Metadata": f"filename {base64.b64encode(metadata['filename'].encode()).decode()}",
+            })
+            cid = response.headers.get("Upload-Cid")
+            url = urljoin(self.endpoint, response.headers["Location"])
+        else:
+            cid = cids[0]
+            url = parts[0]["url"]
+        if not cid:
+            # The completing request may have been lost; the server keeps the CID of a completed upload
+            cid = self._request("HEAD", url).headers.get("Upload-Cid")
+        if not cid:
+            raise Exception(f"Error: upload server did not report a CID for {file_path}")
+
+        os.remove(state_path(file_path))
+        logging.info(f"Uploaded {file_path} in {len(parts)} part(s) with hash: {cid}")
+        return cid
+
+
+def get_uploader() -> ResumableUploader:
+    """Create the resumable uploader configured by the RESUMABLE_UPLOAD_* settings."""
+    from refiner.config import settings
+
+    headers = {"Authorization": f"Bearer {settings.RESUMABLE_UPLOAD_TOKEN}"} if settings.RESUMABLE_UPLOAD_TOKEN else {}
+    return ResumableUploader(
+        settings.RESUMABLE_UPLOAD_URL, settings.RESUMABLE_CHUNK_SIZE, settings.RESUMABLE_PARALLEL_PARTS,
+        settings.UPLOAD_RETRIES, headers
+    )
+
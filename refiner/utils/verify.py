@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Any, Dict
+
+from refiner.utils.encrypt import EncryptionContext
+
+
+def open_database_bytes(data: bytes) -> sqlite3.Connection:
+    """Open a SQLite database image held in memory, without writing it to disk."""
+    conn = sqlite3.connect(":memory:")
+    conn.deserialize(data)
+    return conn
+
+
+def quick_check(conn: sqlite3.Connection) -> str:
+    """Run PRAGMA quick_check over an open database."""
+    return "; ".join(row[0] for row in conn.execute("PRAGMA quick_check"))
+
+
+def verify_encrypted_file(encryption: EncryptionContext, encrypted_path: str,
+                          check_database: bool = True) -> Dict[str, Any]:
+    """
+    Check that an encrypted artifact decrypts back to the plaintext it was encrypted from.
+
+    The artifact is decrypted as a stream with the context's derived key (see
+    EncryptionContext.decrypt_chunks) and its SHA-256 digest is compared against the digest
+    recorded at encryption. Optionally the plaintext is kept and the database image is opened in
+    memory for a PRAGMA quick_check. Nothing decrypted is written to disk.
+
+    Args:
+        encryption: Context that encrypted the artifact
+        encrypted_path: Path to the encrypted artifact
+        check_database: Run PRAGMA quick_check over the decrypted database
+
+    Returns:
+        Verification result with the plaintext size, digest and elapsed time
+
+    Raises:
+        ValueError: If the artifact does not round-trip or the database check fails
+    """
+    start = time.perf_counter()
+    expected = encryption.digests.get(encrypted_path)
+    if expected is None:
+        raise ValueError(f"No plaintext digest recorded for {encrypted_path}")
+
+    digest = hashlib.sha256()
+    plaintext = bytearray() if check_database else None
+    size = 0
+    for chunk in encryption.decrypt_chunks(encrypted_path):
+        digest.update(chunk)
+        size += len(chunk)
+        if plaintext is not None:
+            plaintext += chunk
+
+    digest = digest.hexdigest()
+    if digest != expected:
+        raise ValueError(f"Verification failed for {encrypted_path}: plaintext digest mismatch")
+
+    result = {
+        "path": os.path.basename(encrypted_path),
+        "bytes": size,
+        "sha256": digest,
+    }
+    if plaintext is not None:
+        conn = open_database_bytes(plaintext)
+        try:
+            status = quick_check(conn)
+        finally:
+            conn.close()
+        if status != "ok":
+            raise ValueError(f"Verification failed for {encrypted_path}: quick_check returned {status}")
+        result["quick_check"] = status
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    return result
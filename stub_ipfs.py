@@ -0,0 +1,219 @@
+import email
+import io
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from refiner.utils.car import CODEC_RAW, _chunks, cid_to_str, file_dag, make_cid, read_car, read_varint
+
+# Path of the tus (resumable upload) endpoint
+TUS_PATH = "/files/"
+
+
+def _fields(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """Length-delimited fields of a protobuf message (other wire types are skipped)."""
+    stream = io.BytesIO(data)
+    while True:
+        key = read_varint(stream)
+        if key < 0:
+            return
+        if key & 7 == 2:
+            yield key >> 3, stream.read(read_varint(stream))
+        else:
+            read_varint(stream)
+
+
+class StubIpfsServer:
+    """
+    In-process stand-in for a Kubo node's HTTP RPC API, for the upload tests and offline runs.
+
+    Implements POST /api/v0/dag/import: the CAR archive is parsed, every block is checked against
+    its CID and the roots are reported as pinned. cat() reassembles an imported UnixFS file.
+
+    Also serves resumable uploads under /files/ (tus 1.0.0 with the creation and concatenation
+    extensions). A completed upload is laid out as a UnixFS file, pinned and its CID reported in
+    an Upload-Cid header. Setting fail_after_bytes makes the PATCH that crosses that many received
+    bytes store only the bytes up to it and fail, as an interrupted connection would.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        # CID -> (codec, block)
+        self.blocks: Dict[str, Tuple[int, bytes]] = {}
+        self.pins = set()
+        self.requests = 0
+        # Upload id -> {"length", "data", "partial", "cid"}
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.received = 0
+        self.fail_after_bytes: Optional[int] = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                self.send_header("Tus-Resumable", "1.0.0")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _upload(self) -> Optional[Dict[str, Any]]:
+                path = urlparse(self.path).path
+                upload = stub.uploads.get(path[len(TUS_PATH):]) if path.startswith(TUS_PATH) else None
+                if upload is None:
+                    self.send_error(404)
+                return upload
+
+            def do_OPTIONS(self):
+                self._reply(204, {
+                    "Tus-Version": "1.0.0",
+                    "Tus-Extension": "creation,concatenation",
+                })
+
+            def do_HEAD(self):
+                upload = self._upload()
+                if upload is None:
+                    return
+                headers = {"Upload-Offset": str(len(upload["data"])), "Upload-Length": str(upload["length"]),
+                           "Cache-Control": "no-store"}
+                if upload["cid"]:
+                    headers["Upload-Cid"] = upload["cid"]
+                self._reply(200, headers)
+
+            def do_PATCH(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                upload = self._upload()
+                if upload is None:
+                    return
+                if self.headers.get("Content-Type") != "application/offset+octet-stream":
+                    self.send_error(415)
+                    return
+                if int(self.headers.get("Upload-Offset", -1)) != len(upload["data"]):
+                    self.send_error(409, "Upload-Offset does not match")
+                    return
+                if len(upload["data"]) + len(body) > upload["length"]:
+                    self.send_error(400, "Upload exceeds Upload-Length")
+                    return
+                with stub._lock:
+                    limit = stub.fail_after_bytes
+                    if limit is not None and stub.received + len(body) > limit:
+                        kept = max(limit - stub.received, 0)
+                        upload["data"] += body[:kept]
+                        stub.received += kept
+                        stub.fail_after_bytes = None
+                        self.send_error(500, "Connection interrupted")
+                        return
+                    stub.received += len(body)
+                upload["data"] += body
+                headers = {"Upload-Offset": str(len(upload["data"]))}
+                if len(upload["data"]) == upload["length"] and not upload["partial"]:
+                    headers["Upload-Cid"] = stub._complete(upload, bytes(upload["data"]))
+                self._reply(204, headers)
+
+            def _create(self):
+                concat = self.headers.get("Upload-Concat", "")
+                if concat.startswith("final;"):
+                    parts = []
+                    for url in concat[len("final;"):].split():
+                        part = stub.uploads.get(urlparse(url).path[len(TUS_PATH):])
+                        if part is None or not part["partial"] or len(part["data"]) < part["length"]:
+                            self.send_error(400, f"Partial upload {url} is not complete")
+                            return
+                        parts.append(bytes(part["data"]))
+                    data = b"".join(parts)
+                    upload = {"length": len(data), "data": bytearray(data), "partial": False, "cid": None}
+                    stub._complete(upload, data)
+                else:
+                    upload = {"length": int(self.headers["Upload-Length"]), "data": bytearray(),
+                              "partial": concat == "partial", "cid": None}
+                upload_id = str(next(stub._ids))
+                stub.uploads[upload_id] = upload
+                headers = {"Location": f"{TUS_PATH}{upload_id}"}
+                if upload["cid"]:
+                    headers["Upload-Cid"] = upload["cid"]
+                self._reply(201, headers)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if urlparse(self.path).path == TUS_PATH:
+                    self._create()
+                    return
+                if urlparse(self.path).path != "/api/v0/dag/import":
+                    self.send_error(404)
+                    return
+                stub.requests += 1
+                message = email.message_from_bytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+                )
+                car = next(part for part in message.get_payload()).get_payload(decode=True)
+                try:
+                    roots, blocks = read_car(io.BytesIO(car))
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                for cid, block in blocks:
+                    stub.blocks[cid_to_str(cid)] = (cid[1], block)
+                lines = []
+                for root in roots:
+                    stub.pins.add(root)
+                    lines.append(json.dumps({"Root": {"Cid": {"/": root}, "PinErrorMsg": ""}}))
+                payload = ("\n".join(lines) + "\n").encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StubIpfsServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _complete(self, upload: Dict[str, Any], data: bytes) -> str:
+        """Store a completed upload as a UnixFS file with raw leaves and pin it."""
+        root, nodes = file_dag(data)
+        for chunk in _chunks(data):
+            self.blocks[cid_to_str(make_cid(CODEC_RAW, chunk))] = (CODEC_RAW, chunk)
+        for cid, block in nodes:
+            self.blocks[cid_to_str(cid)] = (cid[1], block)
+        upload["cid"] = cid_to_str(root)
+        self.pins.add(upload["cid"])
+        return upload["cid"]
+
+    def cat(self, cid: str) -> bytes:
+        """Reassemble the contents of an imported UnixFS file."""
+        codec, block = self.blocks[cid]
+        # Raw leaves are the file data itself
+        if codec == CODEC_RAW:
+            return block
+        content = b""
+        for number, link in _fields(block):
+            if number == 2:
+                child = next(value for field, value in _fields(link) if field == 1)
+                content += self.cat(cid_to_str(child))
+        return content
+
+
+# Run a stub node with: python stub_ipfs.py [port]
+if __name__ == "__main__":
+    import sys
+    import time
+
+    with StubIpfsServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 5001) as server:
+        print(f"Stub IPFS node listening on {server.url}")
+        while True:
+            time.sleep(3600)
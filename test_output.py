@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+
+# Settings are read from the environment when refiner.config is first imported
+os.environ.setdefault('REFINEMENT_ENCRYPTION_KEY', '0x1234')
+
+from datetime import datetime
+from refiner.inspector import inspect_database
+from refiner.models.refined import set_job_timestamp
+from refiner.planner import BatchSizer, JobPlan
+from refiner.sharding import split_database
+from refiner.transformer.multi_provider_transformer import MultiProviderTransformer
+from refiner.utils.encrypt import EncryptionContext, decrypt_file
+from refiner.utils.refinement_cache import file_digest
+from refiner.utils.verify import verify_encrypted_file
+
+INPUT_FILES = ['input/multi_provider_sample.json', 'input/zomato_sample.json']
+
+
+def build_database(db_path: str, batch_size: int = 1000, deterministic: bool = False) -> str:
+    """Refine the sample inputs into db_path, committing batch_size models at a time."""
+    set_job_timestamp(datetime(1970, 1, 1))
+    plan = JobPlan(batch_size=batch_size, max_batch_size=batch_size)
+    transformer = MultiProviderTransformer(db_path, batch_sizer=BatchSizer(plan), deterministic=deterministic)
+    for input_file in INPUT_FILES:
+        with open(input_file, 'r') as f:
+            transformer.process(json.load(f))
+    transformer.finalize()
+    return db_path
+
+
+def table_counts(db_path: str) -> dict:
+    """Rows per table, as reported by the inspector."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {table: report["rows"] for table, report in inspect_database(conn)["tables"].items()}
+    finally:
+        conn.close()
+
+
+def test_shard_row_counts():
+    with tempfile.TemporaryDirectory() as output_dir:
+        db_path = build_database(os.path.join(output_dir, 'db.libsql'))
+        source = table_counts(db_path)
+        shards = split_database(db_path, "rows", 10)
+        assert len(shards) > 1
+
+        accounts = {}
+        for shard_path, rows in shards:
+            counts = table_counts(shard_path)
+            # The reported row count is the number of rows in the shard
+            assert rows == sum(counts.values())
+            for table, count in counts.items():
+                if table.endswith('_accounts') and count:
+                    accounts[table] = accounts.get(table, 0) + count
+
+        # Every account is in exactly one shard
+        assert accounts == {table: count for table, count in source.items() if table.endswith('_accounts') and count}
+
+
+def test_encryption_round_trip():
+    with tempfile.TemporaryDirectory() as output_dir:
+        db_path = build_database(os.path.join(output_dir, 'db.libsql'))
+        encryption = EncryptionContext(os.environ['REFINEMENT_ENCRYPTION_KEY'])
+        encrypted_path = encryption.encrypt_file(db_path)
+
+        decrypted_path = decrypt_file(encryption.passphrase, encrypted_path)
+        with open(db_path, 'rb') as f:
+            plaintext = f.read()
+        with open(decrypted_path, 'rb') as f:
+            assert f.read() == plaintext
+        assert b"".join(encryption.decrypt_chunks(encrypted_path)) == plaintext
+
+        result = verify_encrypted_file(encryption, encrypted_path)
+        assert result["sha256"] == hashlib.sha256(plaintext).hexdigest()
+        assert result["quick_check"] == "ok"
+
+
+def test_deterministic_build():
+    with tempfile.TemporaryDirectory() as output_dir:
+        digests = {
+            file_digest(build_database(os.path.join(output_dir, f'db-{batch_size}.libsql'), batch_size, True))
+            for batch_size in (1, 7, 1000)
+        }
+        # The database bytes do not depend on the batch size
+        assert len(digests) == 1
+
+
+if __name__ == "__main__":
+    test_shard_row_counts()
+    test_encryption_round_trip()
+    test_deterministic_build()
+    print('Output checks passed')
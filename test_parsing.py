@@ -0,0 +1,41 @@
+from refiner.utils.date import parse_epoch
+from refiner.utils.number import parse_count, parse_money
+
+
+def test_parse_money():
+    assert parse_money("23.75 USD") == (2375, "USD")
+    assert parse_money("$1,234.50") == (123450, "USD")
+    assert parse_money("₹250") == (25000, "INR")
+    assert parse_money("¥1200") == (1200, "JPY")
+    # An amount without a currency is still parsed, with minor units of 1/100
+    assert parse_money("45.50") == (4550, None)
+    assert parse_money("abc") == (None, None)
+    assert parse_money("") == (None, None)
+    assert parse_money(None) == (None, None)
+
+
+def test_parse_count():
+    assert parse_count("1234") == 1234
+    assert parse_count("1,234") == 1234
+    assert parse_count("1.2K") == 1200
+    assert parse_count("3M") == 3_000_000
+    assert parse_count("10k+") == 10_000
+    assert parse_count(42) == 42
+    assert parse_count("abc") is None
+    assert parse_count(None) is None
+
+
+def test_parse_epoch():
+    assert parse_epoch("2025-07-15T08:15:00Z") == 1752567300
+    # Timestamps without an offset are taken as UTC
+    assert parse_epoch("2025-07-15T08:15:00") == 1752567300
+    assert parse_epoch("2025-07-15T10:15:00+02:00") == 1752567300
+    assert parse_epoch("abc") is None
+    assert parse_epoch(None) is None
+
+
+if __name__ == "__main__":
+    test_parse_money()
+    test_parse_count()
+    test_parse_epoch()
+    print('Parsing checks passed')
@@ -0,0 +1,83 @@
+import itertools
+import time
+from refiner.pipeline import Pipeline
+
+
+def test_pipeline_order():
+    pipeline = Pipeline(queue_size=2)
+    pipeline.source("read", range(100))
+    pipeline.stage("double", lambda items: (item * 2 for item in items))
+    results = []
+    pipeline.run("write", results.extend)
+
+    assert results == [item * 2 for item in range(100)]
+    stats = pipeline.stats()["stages"]
+    assert stats["read"]["items"] == stats["double"]["items"] == stats["write"]["items"] == 100
+
+
+def test_stage_error_is_raised():
+    def fail(items):
+        for item in items:
+            if item == 5:
+                raise ValueError("bad item")
+            yield item
+
+    pipeline = Pipeline(queue_size=2).source("read", range(100)).stage("check", fail)
+    results = []
+    try:
+        pipeline.run("write", results.extend)
+    except ValueError as e:
+        assert str(e) == "bad item"
+    else:
+        raise AssertionError("The stage's exception was not raised by run()")
+    # Items before the failing one were still delivered, in order
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_sink_error_stops_stages():
+    def sink(items):
+        for item in items:
+            if item == 3:
+                raise RuntimeError("write failed")
+
+    # The source never ends, so run() only returns if the stage threads are stopped
+    pipeline = Pipeline(queue_size=2).source("read", itertools.count())
+    try:
+        pipeline.run("write", sink)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("The sink's exception was not raised by run()")
+
+
+def test_backpressure():
+    produced = []
+
+    def source():
+        for item in range(100):
+            produced.append(item)
+            yield item
+
+    def sink(items):
+        next(items)
+        time.sleep(0.3)
+        # The source may hold one item and fill the queue, but no more
+        seen.append(len(produced))
+        for _ in items:
+            pass
+
+    seen = []
+    pipeline = Pipeline(queue_size=1).source("read", source())
+    pipeline.run("write", sink)
+
+    assert seen[0] <= 1 + pipeline.queue_size + 1
+    assert len(produced) == 100
+    assert pipeline.stats()["stages"]["read"]["blocked_seconds"] > 0
+
+
+if __name__ == "__main__":
+    test_pipeline_order()
+    test_stage_error_is_raised()
+    test_sink_error_stops_stages()
+    test_backpressure()
+    print('Pipeline checks passed')
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Settings are read from the environment when refiner.config is first imported
+os.environ.setdefault('REFINEMENT_ENCRYPTION_KEY', '0x1234')
+
+import requests
+from refiner.utils.car import cid_to_str, file_dag, read_car, write_car
+from refiner.utils.pinning import KuboBackend
+from refiner.utils.resumable import ResumableUploader, pending_upload
+from stub_ipfs import TUS_PATH, StubIpfsServer
+
+
+def write_random_file(directory: str, name: str, size: int) -> tuple:
+    path = os.path.join(directory, name)
+    data = os.urandom(size)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path, data
+
+
+def test_car_roots():
+    # CBOR encodes array lengths from 24 up with extra length bytes
+    for count in (1, 23, 24, 300):
+        sources = [f"artifact {index}".encode() for index in range(count)]
+        archive = io.BytesIO()
+        cids = write_car(archive, sources)
+        archive.seek(0)
+        roots, _ = read_car(archive)
+        assert roots == cids
+
+
+def test_kubo_import():
+    with StubIpfsServer() as server, tempfile.TemporaryDirectory() as work_dir:
+        backend = KuboBackend(server.url, work_dir)
+        file_path, content = write_random_file(work_dir, "artifact.bin", 3 * 1024 * 1024 + 17)
+
+        schema = {"name": "test", "schema": "CREATE TABLE t (id INTEGER);"}
+        schema_hash, (file_hash,) = backend.upload_artifacts(schema, [file_path])
+        # The schema and the file are pinned in a single import
+        assert server.requests == 1
+        assert server.cat(file_hash) == content
+        assert json.loads(server.cat(schema_hash)) == schema
+        assert not [name for name in os.listdir(work_dir) if name.endswith(".car")]
+
+
+def test_concurrent_kubo_imports():
+    with StubIpfsServer() as server, tempfile.TemporaryDirectory() as work_dir:
+        backend = KuboBackend(server.url, work_dir)
+        files = [write_random_file(work_dir, f"shard-{index}.bin", 1024 * 1024 + index) for index in range(8)]
+
+        # Shards and columnar files are uploaded from a thread pool
+        with ThreadPoolExecutor(4) as pool:
+            cids = list(pool.map(backend.upload_file, [path for path, _ in files]))
+
+        assert [server.cat(cid) for cid in cids] == [data for _, data in files]
+        assert not [name for name in os.listdir(work_dir) if name.endswith(".car")]
+
+
+def test_resumed_upload():
+    with StubIpfsServer() as server, tempfile.TemporaryDirectory() as directory:
+        path, data = write_random_file(directory, "artifact.bin", 3 * 1024 * 1024 + 12345)
+        expected = cid_to_str(file_dag(data)[0])
+
+        # A request fails midway and the first job gives up: the saved state lets the next one continue
+        server.fail_after_bytes = 1024 * 1024
+        try:
+            ResumableUploader(server.url + TUS_PATH, 256 * 1024, parts=3, retries=0).upload(path)
+        except requests.exceptions.HTTPError:
+            pass
+        else:
+            raise AssertionError("The interrupted upload did not fail")
+        assert pending_upload(path)
+
+        uploader = ResumableUploader(server.url + TUS_PATH, 256 * 1024, parts=3)
+        server.fail_after_bytes = server.received + 300 * 1024
+        cid = uploader.upload(path)
+        assert cid == expected
+        assert server.cat(cid) == data
+        assert not pending_upload(path)
+        # Only the bytes the server had not stored yet were sent again
+        assert uploader.bytes_sent < len(data)
+
+
+if __name__ == "__main__":
+    test_car_roots()
+    test_kubo_import()
+    test_concurrent_kubo_imports()
+    test_resumed_upload()
+    print('Upload checks passed')